@@ -1,10 +1,36 @@
 from pathlib import Path
 
 from dotenv import load_dotenv
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify
 
 from config import get_config
-from extensions import init_cors, init_jwt, init_rate_limiter, init_supabase
+from extensions import (
+    cache,
+    init_cache,
+    init_cors,
+    init_jwt,
+    init_rate_limiter,
+    init_supabase,
+    supabase_pool_stats,
+)
+from services.analytics_rollup import analytics_rollup
+from services.compression import response_compressor
+from services.entity_cache import init_entity_caches
+from services.events import feed_events
+from services.feed_snapshot import feed_snapshots
+from services.gazetteer import gazetteer
+from services.geofence import venue_geofences
+from services.liked_cache import liked_posts
+from services.load_shedding import CRITICAL, load_shedder, priority
+from services.login_tracker import last_logins
+from services.metrics import admin_token_ok, collect_metrics, register_metrics
+from services.profiler import request_profiler
+from services.query_trace import query_tracer
+from services.resilience import init_breakers, resilience_stats
+from services.single_flight import single_flight_stats
+from services.supabase_jwt import supabase_tokens
+from services.tiers import tier_resolver
+from services.trending import trending
 from blueprints.auth import bp as auth_bp
 from blueprints.venues import bp as venues_bp
 from blueprints.posts import bp as posts_bp
@@ -26,6 +52,38 @@ def create_app() -> Flask:
     init_jwt(app)
     init_cors(app)
     init_rate_limiter(app)
+    init_cache(app)
+
+    # In-process services
+    feed_snapshots.init_app(app)
+    venue_geofences.init_app(app)
+    trending.init_app(app)
+    liked_posts.init_app(app)
+    init_entity_caches(app)
+    last_logins.init_app(app)
+    supabase_tokens.init_app(app)
+    feed_events.init_app(app)
+    analytics_rollup.init_app(app)
+    load_shedder.init_app(app)
+    init_breakers(app)
+    gazetteer.init_app(app)
+    request_profiler.init_app(app)
+    query_tracer.init_app(app)
+    response_compressor.init_app(app)
+    tier_resolver.init_app(app)
+
+    register_metrics("supabase_pool", supabase_pool_stats)
+    register_metrics("cache", cache.stats)
+    register_metrics("last_login_buffer", lambda: {"pending": last_logins.pending_count()})
+    register_metrics("supabase_tokens", supabase_tokens.stats)
+    register_metrics("feed_events", feed_events.stats)
+    register_metrics("load_shedder", load_shedder.stats)
+    register_metrics("external_providers", resilience_stats)
+    register_metrics("gazetteer", gazetteer.stats)
+    register_metrics("single_flight", single_flight_stats)
+    register_metrics("queries", query_tracer.stats)
+    register_metrics("compression", response_compressor.stats)
+    register_metrics("tiers", tier_resolver.stats)
 
     # Blueprints
     app.register_blueprint(auth_bp, url_prefix="/api/auth")
@@ -35,9 +93,41 @@ def create_app() -> Flask:
     app.register_blueprint(locations_bp, url_prefix="/api/locations")
 
     @app.get("/api/health")
+    @priority(CRITICAL)
     def health():
         return jsonify({"status": "ok"}), 200
 
+    @app.get("/api/metrics")
+    def metrics():
+        if not admin_token_ok():
+            return jsonify({"error": "Forbidden"}), 403
+        return jsonify(collect_metrics()), 200
+
+    @app.get("/api/admin/profiles")
+    def list_profiles():
+        if not admin_token_ok():
+            return jsonify({"error": "Forbidden"}), 403
+        return jsonify({
+            "enabled": request_profiler.enabled,
+            "profiles": request_profiler.list_profiles(),
+        }), 200
+
+    @app.get("/api/admin/profiles/<int:profile_id>")
+    def download_profile(profile_id: int):
+        """Collapsed stacks ("frame;frame;frame count"), for flamegraph.pl or speedscope."""
+        if not admin_token_ok():
+            return jsonify({"error": "Forbidden"}), 403
+        profile = request_profiler.get_profile(profile_id)
+        if profile is None:
+            return jsonify({"error": "Profile not found"}), 404
+        return Response(
+            profile.folded(),
+            mimetype="text/plain",
+            headers={
+                "Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'
+            },
+        )
+
     return app
 
 
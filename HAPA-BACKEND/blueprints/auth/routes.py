@@ -13,7 +13,11 @@ from flask_jwt_extended import (
 from extensions import get_supabase, limiter
 from models.otp_code import create_otp
 from models.user import create_user, normalize_phone, user_to_dict
+from services.entity_cache import user_cache
+from services.load_shedding import CRITICAL, priority
+from services.login_tracker import last_logins
 from services.sms import generate_otp_code, send_otp
+from services.supabase_jwt import InvalidSupabaseToken, supabase_tokens
 from blueprints.auth import bp
 
 def get_phone_for_limiter():
@@ -23,6 +27,7 @@ def get_phone_for_limiter():
     return request.remote_addr
 
 @bp.post("/request-otp")
+@priority(CRITICAL)
 @limiter.limit("3 per 15 minute", key_func=get_phone_for_limiter)
 def request_otp():
     data = request.get_json() or {}
@@ -49,6 +54,7 @@ def request_otp():
 
 
 @bp.post("/verify-otp")
+@priority(CRITICAL)
 @limiter.limit("10 per minute")
 def verify_otp():
     data = request.get_json() or {}
@@ -122,11 +128,10 @@ def verify_otp():
         inserted_rows = getattr(insert_resp, "data", None) or []
         user_doc = inserted_rows[0] if inserted_rows else new_user
     else:
-        supabase.table("users").update(
-            {"last_login_at": datetime.utcnow().isoformat()}
-        ).eq("id", user_doc["id"]).execute()
+        last_logins.touch(user_doc["id"])
 
     user_id = str(user_doc["id"])
+    user_cache.invalidate(user_id)
     claims = {"role": user_doc.get("role", "venue_owner")}
 
     access_token = create_access_token(identity=user_id, additional_claims=claims)
@@ -150,6 +155,7 @@ def verify_otp():
 
 
 @bp.post("/refresh")
+@priority(CRITICAL)
 @jwt_required(refresh=True)
 def refresh():
     identity = get_jwt_identity()
@@ -160,22 +166,14 @@ def refresh():
 
 
 @bp.get("/me")
+@priority(CRITICAL)
 @jwt_required()
 def me():
     user_id = get_jwt_identity()
     if not user_id:
         return jsonify({"error": "Not authenticated"}), 401
 
-    supabase = get_supabase()
-    resp = (
-        supabase.table("users")
-        .select("*")
-        .eq("id", user_id)
-        .limit(1)
-        .execute()
-    )
-    users = resp.data or []
-    user_doc = users[0] if users else None
+    user_doc = user_cache.get(user_id)
 
     if not user_doc:
         return jsonify({"error": "User not found"}), 404
@@ -184,6 +182,7 @@ def me():
 
 
 @bp.post("/login-supabase")
+@priority(CRITICAL)
 @limiter.limit("20 per minute")
 def login_supabase():
     """
@@ -198,13 +197,10 @@ def login_supabase():
 
     supabase = get_supabase()
 
-    # 1. Verify the token with Supabase Auth
+    # 1. Verify the token (locally when the signing key is known, else via Supabase Auth)
     try:
-        user_resp = supabase.auth.get_user(access_token)
-        sb_user = user_resp.user
-        if not sb_user:
-             return jsonify({"error": "Invalid Supabase token"}), 401
-    except Exception as e:
+        sb_user = supabase_tokens.verify(access_token)
+    except InvalidSupabaseToken as e:
         print(f"Supabase auth check failed: {e}")
         return jsonify({"error": "Invalid Supabase token"}), 401
     
@@ -224,10 +220,8 @@ def login_supabase():
     
     if existing_users:
         user_doc = existing_users[0]
-        # Update last login
-        supabase.table("users").update(
-            {"last_login_at": datetime.now(timezone.utc).isoformat()}
-        ).eq("id", user_id).execute()
+        # Update last login (buffered, flushed in bulk)
+        last_logins.touch(user_id)
     else:
         # 3. Create user in public.users if not exists
         role = "anonymous" if is_anon else "authenticated"
@@ -242,6 +236,8 @@ def login_supabase():
         inserted_rows = getattr(insert_resp, "data", None) or []
         user_doc = inserted_rows[0] if inserted_rows else new_user
 
+    user_cache.invalidate(user_id)
+
     # 4. Issue Flask JWTs
     claims = {"role": user_doc.get("role", "anonymous")}
     
@@ -1,39 +1,175 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from math import cos, radians, sqrt
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
 
-from flask import jsonify, request
+from flask import Response, current_app, jsonify, request, stream_with_context
 
 from flask_jwt_extended import get_jwt_identity, jwt_required
 
 from extensions import get_supabase, limiter
 from models.post import post_to_dict
 from models.venue import venue_to_dict
+from services.compression import response_compressor
+from services.events import cells_around, feed_events
+from services.facets import FacetIndex
+from services.feed_snapshot import CitySnapshot, feed_snapshots, parse_timestamp
+from services.liked_cache import liked_posts
+from services.load_shedding import STREAM, priority
+from services.single_flight import SingleFlight
+from services.tiers import tier_resolver
+from services.trending import trending
+from services.working_hours import filter_open, minute_of_week
 from blueprints.discover import bp
 
+_feed_reads = SingleFlight("feed")
 
-@bp.get("/feed")
-@jwt_required(optional=True)
-@limiter.limit("60 per minute")
-def feed():
+
+def _selected_facets() -> Dict[str, List[str]]:
+    """`category` and `type` query params; repeatable or comma-separated."""
+    selected: Dict[str, List[str]] = {}
+    for param, facet in (("category", "categories"), ("type", "types")):
+        values = [
+            part.strip()
+            for raw in request.args.getlist(param)
+            for part in raw.split(",")
+            if part.strip()
+        ]
+        if values:
+            selected[facet] = values
+    return selected
+
+
+def _facet_search(
+    venues: List[Dict[str, Any]],
+    snapshot: Optional[CitySnapshot],
+    selected: Dict[str, List[str]],
+) -> Tuple[List[Dict[str, Any]], Dict[str, List[Dict[str, Any]]]]:
     """
-    Discovery feed near a location.
-    Query params:
-      - lat, lng, radius_km (optional)
+    Narrow `venues` (kept in their current order) to the selected categories
+    and types, and count facets over them. Snapshots reuse their prebuilt
+    index; live results get a throwaway one.
     """
-    supabase = get_supabase()
-    lat = request.args.get("lat", type=float)
-    lng = request.args.get("lng", type=float)
-    radius_km = request.args.get("radius_km", default=10, type=float)
+    if snapshot is not None:
+        index = snapshot.facet_index()
+        base = None if len(venues) == len(index) else index.mask_for(venues)
+    else:
+        index, base = FacetIndex(venues), None
+    matches, counts = index.search(selected, base)
+    if not selected:
+        return venues, counts
+    keep = {id(v) for v in matches}
+    return [v for v in venues if id(v) in keep], counts
 
-    # Fetch venues
-    venues_resp = supabase.table("venues").select("*").execute()
-    venues_list: List[Dict[str, Any]] = venues_resp.data or []
 
+def _open_filter_minute() -> Tuple[Optional[int], Optional[str]]:
+    """
+    Venue-local minute of the week from `open_now=true` or `open_at=<ISO>`
+    (naive timestamps are venue-local). (None, None) when no filter is asked for.
+    """
+    tz = ZoneInfo(current_app.config.get("VENUE_TIMEZONE", "Africa/Kampala"))
+    open_at = request.args.get("open_at", "").strip()
+    if open_at:
+        try:
+            at = datetime.fromisoformat(open_at.replace("Z", "+00:00"))
+        except ValueError:
+            return None, "open_at must be an ISO 8601 timestamp"
+        return minute_of_week(at, tz), None
+    if request.args.get("open_now", "").strip().lower() in ("1", "true", "yes"):
+        return minute_of_week(datetime.now(timezone.utc), tz), None
+    return None, None
+
+
+def _feed_delta(
+    supabase, venues_list: List[Dict[str, Any]], since: datetime, now: datetime
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[str]]:
+    """
+    Changes to the feed for these venues after `since`:
+    venues updated, posts created, and ids of posts that expired or were deleted.
+    """
+    since_iso = since.isoformat()
+    now_iso = now.isoformat()
+
+    changed_venues = []
+    for v in venues_list:
+        updated_at = parse_timestamp(v.get("updated_at"))
+        if updated_at is None or updated_at > since:
+            changed_venues.append(v)
+
+    venue_ids = [v["id"] for v in venues_list]
+    if not venue_ids:
+        return changed_venues, [], []
+
+    new_posts = (
+        supabase.table("posts")
+        .select("*")
+        .in_("venue_id", venue_ids)
+        .gt("created_at", since_iso)
+        .gt("expires_at", now_iso)
+        .order("created_at", desc=True)
+        .limit(100)
+        .execute()
+    ).data or []
+
+    expired = (
+        supabase.table("posts")
+        .select("id")
+        .in_("venue_id", venue_ids)
+        .gt("expires_at", since_iso)
+        .lte("expires_at", now_iso)
+        .execute()
+    ).data or []
 
+    deleted = (
+        supabase.table("post_tombstones")
+        .select("post_id")
+        .in_("venue_id", venue_ids)
+        .gt("deleted_at", since_iso)
+        .execute()
+    ).data or []
 
+    removed_ids = sorted({str(p["id"]) for p in expired} | {str(t["post_id"]) for t in deleted})
+    return changed_venues, new_posts, removed_ids
+
+
+def _load_feed(
+    lat: Optional[float],
+    lng: Optional[float],
+    radius_km: float,
+    city: str,
+    area: str,
+    since: Optional[datetime],
+    request_time: datetime,
+    open_minute: Optional[int] = None,
+    selected: Optional[Dict[str, List[str]]] = None,
+    snapshot: Optional[CitySnapshot] = None,
+) -> Dict[str, Any]:
+    """
+    The user-independent part of the feed: venues, posts, facets and delta
+    removals, from `snapshot` when given and live otherwise.
+    """
+    supabase = get_supabase()
+
+    # Overlap the next window slightly so rows committed during this request aren't missed.
+    # A snapshot is only as new as its reads, so its watermark is theirs (and
+    # the same for every request it serves).
+    overlap = timedelta(seconds=current_app.config.get("DELTA_FEED_OVERLAP_SECONDS", 5))
+    read_time = snapshot.as_of if snapshot is not None and snapshot.as_of else request_time
+    watermark = (read_time - overlap).isoformat()
+
+    # Fetch venues
+    if snapshot is not None:
+        venues_list: List[Dict[str, Any]] = list(snapshot.venues)
+    else:
+        venues_query = supabase.table("venues").select("*")
+        if city:
+            venues_query = venues_query.eq("city", city)
+        if area:
+            venues_query = venues_query.eq("area", area)
+        venues_resp = venues_query.execute()
+        venues_list = venues_resp.data or []
 
     # If a location is provided, filter/sort by approximate distance in Python
     if lat is not None and lng is not None:
@@ -49,18 +185,30 @@ def feed():
             return sqrt(x * x + y * y)
 
         venues_list = sorted(venues_list, key=haversine_approx)
-        # Rough filter by radius: keep first N that are within radius_km
+        # Rough filter by radius: keep the ones within radius_km
         # 1 radian on Earth ~ 6371 km
         max_rad = radius_km / 6371.0
-        venues_list = [v for v in venues_list if haversine_approx(v) <= max_rad][:50]
-    else:
-        venues_list = venues_list[:50]
+        venues_list = [v for v in venues_list if haversine_approx(v) <= max_rad]
+
+    # Open-hours and category/type filters apply before the page is cut
+    if open_minute is not None:
+        venues_list = filter_open(venues_list, open_minute)
+    # Deltas too, or a filtered client would be sent upserts it never asked for
+    venues_list, facets = _facet_search(venues_list, snapshot, selected or {})
+    venues_list = venues_list[:50]
 
     # Fetch posts for these venues
     venue_ids = [v["id"] for v in venues_list]
     posts_list: List[Dict[str, Any]] = []
     now = datetime.utcnow().isoformat()
-    if venue_ids:
+    removed_post_ids: List[str] = []
+    if since is not None:
+        venues_list, posts_list, removed_post_ids = _feed_delta(
+            supabase, venues_list, since, request_time
+        )
+    elif snapshot is not None:
+        posts_list = snapshot.posts_for(venue_ids, limit=100)
+    elif venue_ids:
         posts_resp = (
             supabase.table("posts")
             .select("*")
@@ -72,12 +220,104 @@ def feed():
         )
         posts_list = posts_resp.data or []
 
-    return jsonify(
-        {
-            "venues": [venue_to_dict(v) for v in venues_list],
-            "posts": [post_to_dict(p) for p in posts_list],
-        }
-    ), 200
+    return {
+        "venues": venues_list,
+        # One batched lookup for the page instead of a tier/boost RPC per venue
+        "tiers": tier_resolver.resolve(v["id"] for v in venues_list),
+        "posts": posts_list,
+        "removed_post_ids": removed_post_ids,
+        "watermark": watermark,
+        "facets": facets,
+    }
+
+
+@bp.get("/feed")
+@jwt_required(optional=True)
+@limiter.limit("60 per minute")
+def feed():
+    """
+    Discovery feed near a location.
+    Query params:
+      - lat, lng, radius_km (optional)
+      - city, area (optional) – served from the per-city snapshot when one is fresh
+      - since (optional) – watermark from a previous response; only changes are returned
+      - open_now=true or open_at=<ISO timestamp> (optional) – only venues open then, and their posts
+      - category, type (optional, repeatable or comma-separated) – any of the
+        values within one facet, all facets together; counts come back in `facets`
+    """
+    lat = request.args.get("lat", type=float)
+    lng = request.args.get("lng", type=float)
+    radius_km = request.args.get("radius_km", default=10, type=float)
+    city = request.args.get("city", "").strip()
+    area = request.args.get("area", "").strip()
+    since_param = request.args.get("since", "").strip()
+
+    request_time = datetime.now(timezone.utc)
+    since = parse_timestamp(since_param) if since_param else None
+    if since_param and since is None:
+        return jsonify({"error": "since must be an ISO 8601 timestamp"}), 400
+    open_minute, open_error = _open_filter_minute()
+    if open_error:
+        return jsonify({"error": open_error}), 400
+
+    # Watermarks older than the tombstone/post horizon cannot be patched: send everything
+    max_age = timedelta(hours=current_app.config.get("DELTA_FEED_MAX_AGE_HOURS", 24))
+    reset = since is not None and request_time - since > max_age
+    if reset:
+        since = None
+
+    # Deltas must see rows newer than any snapshot, so they always query live
+    snapshot = feed_snapshots.get(city, area or None) if city and since is None else None
+    user_id = get_jwt_identity()
+    liked_post_ids = liked_posts.liked_ids(user_id) if user_id else set()
+
+    # Identical concurrent feed requests share one set of Supabase queries
+    selected = _selected_facets()
+    key = (
+        f"{lat}:{lng}:{radius_km}:{city}:{area}:{since.isoformat() if since else ''}"
+        f":{open_minute}:{sorted((f, sorted(v)) for f, v in selected.items())}"
+    )
+
+    # A snapshot feed is the same bytes for everyone who liked none of its
+    # posts: serialize and compress it once per snapshot build
+    body_key = ("feed", snapshot.built_at, key) if snapshot is not None and not reset else None
+    if body_key is not None:
+        entry = response_compressor.cached_body(body_key)
+        if entry is not None and not (liked_post_ids & entry.meta):
+            return response_compressor.respond(entry)
+
+    shared = _feed_reads.do(
+        key,
+        lambda: _load_feed(
+            lat, lng, radius_km, city, area, since, request_time, open_minute, selected,
+            snapshot,
+        ),
+    )
+    venues_list = shared["venues"]
+    posts_list = shared["posts"]
+    removed_post_ids = shared["removed_post_ids"]
+    watermark = shared["watermark"]
+    post_ids = frozenset(str(p["id"]) for p in posts_list)
+
+    # Annotate is_liked without mutating rows shared with the snapshot and other requests
+    payload: Dict[str, Any] = {
+        "venues": [venue_to_dict(v, shared["tiers"].get(str(v["id"]))) for v in venues_list],
+        "posts": [
+            post_to_dict({**p, "is_liked": str(p["id"]) in liked_post_ids})
+            for p in posts_list
+        ],
+        "watermark": watermark,
+        "delta": since is not None,
+        "facets": shared["facets"],
+    }
+    if since is not None:
+        payload["removed_post_ids"] = removed_post_ids
+    if reset:
+        payload["reset"] = True
+    if body_key is not None and not (liked_post_ids & post_ids):
+        entry = response_compressor.cache_body(body_key, jsonify(payload).get_data(), post_ids)
+        return response_compressor.respond(entry)
+    return jsonify(payload), 200
 
 
 @bp.get("/search")
@@ -89,11 +329,46 @@ def search():
       - q (search term)
       - city
       - area
+      - open_now=true or open_at=<ISO timestamp> (optional)
+      - category, type (optional, repeatable or comma-separated)
+    Facet counts for the result set are returned in `facets`.
     """
     supabase = get_supabase()
     q = request.args.get("q", "").strip()
     city = request.args.get("city", "").strip()
     area = request.args.get("area", "").strip()
+    open_minute, open_error = _open_filter_minute()
+    if open_error:
+        return jsonify({"error": open_error}), 400
+    selected = _selected_facets()
+
+    snapshot = feed_snapshots.get(city, area or None) if city else None
+    if snapshot is not None:
+        # Same answer for everyone until the next build: serialize and compress once
+        body_key = (
+            "search", snapshot.built_at, q.lower(), city, area, open_minute,
+            tuple(sorted((f, tuple(sorted(v))) for f, v in selected.items())),
+        )
+        entry = response_compressor.cached_body(body_key)
+        if entry is not None:
+            return response_compressor.respond(entry)
+        needle = q.lower()
+        venues_list = [
+            v for v in snapshot.venues
+            if not needle
+            or needle in (v.get("name") or "").lower()
+            or needle in (v.get("type") or "").lower()
+        ]
+        if open_minute is not None:
+            venues_list = filter_open(venues_list, open_minute)
+        venues_list, facets = _facet_search(venues_list, snapshot, selected)
+        venues_list = venues_list[:50]
+        tiers = tier_resolver.resolve(v["id"] for v in venues_list)
+        body = jsonify({
+            "venues": [venue_to_dict(v, tiers.get(str(v["id"]))) for v in venues_list],
+            "facets": facets,
+        }).get_data()
+        return response_compressor.respond(response_compressor.cache_body(body_key, body))
 
     query = supabase.table("venues").select("*")
 
@@ -109,9 +384,87 @@ def search():
         # which PostgREST treats as delimiters.
         query = query.or_(f'name.ilike."%{q}%",type.ilike."%{q}%"')
 
-    resp = query.limit(50).execute()
+    # Open-hours and facet filtering happen here, so look further ahead to still fill a page
+    filtered = open_minute is not None or bool(selected)
+    resp = query.limit(500 if filtered else 50).execute()
     venues_list = resp.data or []
+    if open_minute is not None:
+        venues_list = filter_open(venues_list, open_minute)
+    venues_list, facets = _facet_search(venues_list, None, selected)
+    venues_list = venues_list[:50]
+    tiers = tier_resolver.resolve(v["id"] for v in venues_list)
+
+    return jsonify({
+        "venues": [venue_to_dict(v, tiers.get(str(v["id"]))) for v in venues_list],
+        "facets": facets,
+    }), 200
+
+
+
+
+@bp.get("/trending")
+@limiter.limit("60 per minute")
+def trending_now():
+    """
+    What is hot right now, from sliding-window view/like/share/walk-in counters.
+    Query params:
+      - city (optional; all cities when omitted)
+      - kind: venue | post | all (default all)
+      - limit (default 10)
+    """
+    city = request.args.get("city", "").strip() or None
+    kind = request.args.get("kind", "all").strip().lower()
+    limit = min(max(request.args.get("limit", default=10, type=int), 1), trending.top_k)
+
+    if kind not in ("venue", "post", "all"):
+        return jsonify({"error": "kind must be 'venue', 'post' or 'all'"}), 400
+
+    payload: Dict[str, Any] = {"city": city}
+    if kind in ("venue", "all"):
+        payload["venues"] = trending.leaders(city, "venue", limit)
+    if kind in ("post", "all"):
+        payload["posts"] = trending.leaders(city, "post", limit)
+
+    return jsonify(payload), 200
+
+
+@bp.get("/stream")
+@priority(STREAM)
+@limiter.limit("30 per minute")
+def stream():
+    """
+    Server-sent events for new vibes.
+    Query params (at least one):
+      - lat, lng – location; subscribes to the surrounding cells
+      - venue_ids – comma-separated venue ids
+    Events: new_post, post_deleted, metrics_changed
+    503 with Retry-After when the worker already holds SSE_MAX_STREAMS streams.
+    """
+    lat = request.args.get("lat", type=float)
+    lng = request.args.get("lng", type=float)
+    venue_ids = {v.strip() for v in request.args.get("venue_ids", "").split(",") if v.strip()}
 
-    return jsonify({"venues": [venue_to_dict(v) for v in venues_list]}), 200
+    max_venues = current_app.config.get("SSE_MAX_VENUE_IDS", 100)
+    if len(venue_ids) > max_venues:
+        return jsonify({"error": f"at most {max_venues} venue_ids"}), 400
 
+    cells = cells_around(lat, lng) if lat is not None and lng is not None else set()
+    if not cells and not venue_ids:
+        return jsonify({"error": "lat/lng or venue_ids is required"}), 400
 
+    sub = feed_events.subscribe(cells, venue_ids)
+    if sub is None:
+        # Streams hold a worker thread each; past the cap, keep the rest for requests
+        resp = jsonify({"error": "Too many open streams, try again later"})
+        resp.headers["Retry-After"] = "30"
+        return resp, 503
+    body = feed_events.stream(
+        sub,
+        heartbeat_seconds=current_app.config.get("SSE_HEARTBEAT_SECONDS", 20),
+        max_seconds=current_app.config.get("SSE_MAX_STREAM_SECONDS", 600),
+    )
+    return Response(
+        stream_with_context(body),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
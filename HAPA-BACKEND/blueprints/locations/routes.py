@@ -4,6 +4,7 @@ from typing import Any, Dict, List
 
 from flask import jsonify, request
 
+from services.gazetteer import gazetteer
 from services.maps import GoogleMapsClient
 from extensions import get_supabase
 from blueprints.locations import bp
@@ -13,7 +14,8 @@ from blueprints.locations import bp
 def suggest_locations():
     """
     Lightweight location suggestions for city/area/search inputs.
-    Uses Google Places Text Search under the hood.
+    Answers from the local gazetteer (known cities, areas and venue
+    addresses); falls back to Google Places Text Search when it has no match.
     Query params:
       - q: free text input
       - lat, lng (optional): for biasing results near the user
@@ -25,8 +27,16 @@ def suggest_locations():
     lat = request.args.get("lat", type=float)
     lng = request.args.get("lng", type=float)
 
+    try:
+        suggestions = gazetteer.suggest(q, lat=lat, lng=lng, limit=5)
+    except Exception as e:
+        print(f"Gazetteer lookup failed: {e}")
+        suggestions = []
+    if suggestions:
+        return jsonify({"suggestions": suggestions, "source": "local"}), 200
+
     maps_client = GoogleMapsClient()
     suggestions = maps_client.search_places(q, lat=lat, lng=lng, limit=5)
 
-    return jsonify({"suggestions": suggestions}), 200
+    return jsonify({"suggestions": suggestions, "source": "google"}), 200
 
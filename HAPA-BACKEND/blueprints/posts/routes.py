@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 from typing import Any, Dict, List
@@ -9,8 +10,20 @@ from flask_jwt_extended import get_jwt, get_jwt_identity, jwt_required
 
 from extensions import get_supabase, limiter
 from models.post import create_post, post_to_dict
+from services.entity_cache import venue_cache
+from services.events import feed_events
+from services.liked_cache import liked_posts
+from services.load_shedding import ANALYTICS, priority
+from services.single_flight import SingleFlight
+from services.trending import trending
 from blueprints.posts import bp
 
+# Concurrent reads of the same post / venue story share one Supabase query.
+_post_reads = SingleFlight("post")
+_venue_post_reads = SingleFlight("venue_posts")
+# Event fan-out may need a venue/post lookup; keep it off the request path.
+_publish_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="feed-publish")
+
 
 def _require_venue_owner():
     claims = get_jwt()
@@ -19,6 +32,38 @@ def _require_venue_owner():
     return True
 
 
+def _publish_now(event: str, data: Dict[str, Any], venue_id: str | None, post_id: str | None) -> None:
+    try:
+        if not venue_id and post_id:
+            venue_id = trending.venue_for_post(post_id)
+            if not venue_id:
+                resp = get_supabase().table("posts").select("venue_id").eq("id", post_id).limit(1).execute()
+                if not resp.data:
+                    return
+                venue_id = str(resp.data[0]["venue_id"])
+                trending.register_post(post_id, venue_id)
+        if not venue_id:
+            return
+        venue = venue_cache.get(venue_id) or {}
+        feed_events.publish(
+            event, data, venue_id=venue_id, lat=venue.get("lat"), lng=venue.get("lng")
+        )
+    except Exception as e:
+        print(f"[events] Failed to publish {event} for venue {venue_id}: {e}")
+
+
+def _publish(
+    event: str, data: Dict[str, Any], venue_id: str | None = None, post_id: str | None = None
+) -> None:
+    """
+    Fan a feed event out to SSE subscribers of the venue and its location cell.
+    Runs in the background; the venue is looked up from `post_id` when not given.
+    """
+    if not venue_id and not post_id:
+        return
+    _publish_pool.submit(_publish_now, event, data, venue_id, post_id)
+
+
 @bp.post("/")
 @jwt_required()
 @limiter.limit("30 per hour")
@@ -59,6 +104,9 @@ def create_post_route():
     insert_resp = supabase.table("posts").insert(post_row).execute()
     inserted_rows: List[Dict[str, Any]] = insert_resp.data or []
     created = inserted_rows[0] if inserted_rows else post_row
+    if created.get("id"):
+        trending.register_post(created["id"], venue["id"])
+    _publish("new_post", {"post": post_to_dict(created)}, str(venue["id"]))
 
     return jsonify({"post": post_to_dict(created)}), 201
 
@@ -66,86 +114,61 @@ def create_post_route():
 @bp.get("/venue/<venue_id>")
 @jwt_required(optional=True)
 def get_posts_for_venue(venue_id: str):
-    supabase = get_supabase()
-    now = datetime.utcnow().isoformat()
-    resp = (
-        supabase.table("posts")
-        .select("*")
-        .eq("venue_id", venue_id)
-        .gt("expires_at", now)
-        .order("created_at", desc=True)
-        .execute()
-    )
-    posts = resp.data or []
-    
-    # Check for likes if user is logged in
-    user_id = get_jwt_identity()
-    if user_id:
-        liked_post_ids = set()
-        # Optimization: Fetch likes for these posts only? 
-        # For simplicity, fetch all user's post likes or just for these posts.
-        # Let's fetch for these posts.
-        post_ids = [p["id"] for p in posts]
-        if post_ids:
-            likes_resp = (
-                supabase.table("post_likes")
-                .select("post_id")
-                .eq("user_id", user_id)
-                .in_("post_id", post_ids)
-                .execute()
-            )
-            for row in (likes_resp.data or []):
-                liked_post_ids.add(row["post_id"])
-        
-        for p in posts:
-            p["is_liked"] = p["id"] in liked_post_ids
+    def load() -> List[Dict[str, Any]]:
+        now = datetime.utcnow().isoformat()
+        resp = (
+            get_supabase()
+            .table("posts")
+            .select("*")
+            .eq("venue_id", venue_id)
+            .gt("expires_at", now)
+            .order("created_at", desc=True)
+            .execute()
+        )
+        return resp.data or []
 
-    return jsonify({"posts": [post_to_dict(p) for p in posts]}), 200
+    posts = _venue_post_reads.do(venue_id, load)
+
+    # Check for likes if user is logged in (on copies: the rows are shared)
+    user_id = get_jwt_identity()
+    liked_post_ids = liked_posts.liked_ids(user_id) if user_id else None
+    return jsonify({
+        "posts": [
+            post_to_dict(p if liked_post_ids is None else {**p, "is_liked": str(p["id"]) in liked_post_ids})
+            for p in posts
+        ]
+    }), 200
 
 
 @bp.get("/<post_id>")
 @jwt_required(optional=True)
 def get_post(post_id: str):
     """Get a single post (story/vibe) by id, including basic venue info."""
-    supabase = get_supabase()
 
-    post_resp = (
-        supabase.table("posts")
-        .select("*")
-        .eq("id", post_id)
-        .limit(1)
-        .execute()
-    )
-    posts = post_resp.data or []
+    def load() -> List[Dict[str, Any]]:
+        post_resp = (
+            get_supabase()
+            .table("posts")
+            .select("*")
+            .eq("id", post_id)
+            .limit(1)
+            .execute()
+        )
+        return post_resp.data or []
+
+    posts = _post_reads.do(post_id, load)
     if not posts:
         return jsonify({"error": "Post not found"}), 404
-    post = posts[0]
 
-    # Check is_liked
+    # Check is_liked (on a copy: the row is shared with concurrent requests)
     user_id = get_jwt_identity()
+    post = dict(posts[0])
     if user_id:
-        like_check = (
-            supabase.table("post_likes")
-            .select("post_id")
-            .eq("user_id", user_id)
-            .eq("post_id", post_id)
-            .limit(1)
-            .execute()
-        )
-        if like_check.data:
-            post["is_liked"] = True
+        post["is_liked"] = str(post["id"]) in liked_posts.liked_ids(user_id)
 
-    venue_resp = (
-        supabase.table("venues")
-        .select("*")
-        .eq("id", post["venue_id"])
-        .limit(1)
-        .execute()
-    )
-    venues = venue_resp.data or []
+    venue = venue_cache.get(post["venue_id"]) if post.get("venue_id") else None
     venue_payload = None
-    if venues:
-        venue = venues[0]
+    if venue:
         venue_payload = {
             "id": str(venue["id"]),
             "name": venue.get("name"),
@@ -171,15 +194,40 @@ def toggle_like_post(post_id: str):
             {"target_post_id": post_id, "target_user_id": user_id}
         ).execute()
         
-        # resp.data is the new metrics json
-        new_metrics = resp.data or {"likes": 0, "views": 0}
-        return jsonify({"metrics": new_metrics}), 200
+        # resp.data is the new metrics json plus the state the toggle produced
+        new_metrics = dict(resp.data or {"likes": 0, "views": 0})
+        is_liked = new_metrics.pop("is_liked", None)
+        venue_id = new_metrics.pop("venue_id", None)
+        if is_liked is None:
+            # Function predates migration 31: read the state back
+            like_resp = (
+                supabase.table("post_likes")
+                .select("post_id")
+                .eq("post_id", post_id)
+                .eq("user_id", user_id)
+                .limit(1)
+                .execute()
+            )
+            is_liked = bool(like_resp.data)
+        if venue_id:
+            trending.register_post(post_id, str(venue_id))
+        liked_posts.invalidate(user_id)
+        if is_liked:
+            trending.record_post(post_id, "likes")
+        _publish(
+            "metrics_changed",
+            {"post_id": post_id, "metrics": new_metrics},
+            str(venue_id) if venue_id else None,
+            post_id,
+        )
+        return jsonify({"metrics": new_metrics, "is_liked": is_liked}), 200
     except Exception as e:
         print(f"Error toggling post like: {e}")
         return jsonify({"error": "Failed to toggle like"}), 500
 
 
 @bp.post("/<post_id>/view")
+@priority(ANALYTICS)
 @jwt_required(optional=True)
 @limiter.limit("60 per minute")
 def track_view_post(post_id: str):
@@ -191,6 +239,12 @@ def track_view_post(post_id: str):
             "track_post_view", 
             {"target_post_id": post_id, "viewer_user_id": user_id}
         ).execute()
+        trending.record_post(post_id, "views")
+        _publish(
+            "metrics_changed",
+            {"post_id": post_id, "delta": {"views": 1}},
+            post_id=post_id,
+        )
         return jsonify({"success": True}), 200
     except Exception as e:
         print(f"Error tracking post view: {e}")
@@ -257,6 +311,7 @@ def delete_post(post_id: str):
             .execute()
         )
         print(f"Delete response: {delete_resp}")
+        _publish("post_deleted", {"post_id": post_id}, post.get("venue_id"))
         
         return jsonify({"success": True}), 200
     except Exception as e:
@@ -265,6 +320,7 @@ def delete_post(post_id: str):
 
 
 @bp.post("/<post_id>/share")
+@priority(ANALYTICS)
 @jwt_required(optional=True)
 @limiter.limit("20 per minute")
 def share_post(post_id: str):
@@ -304,6 +360,7 @@ def share_post(post_id: str):
             "increment_post_shares",
             {"target_post_id": post_id, "target_venue_id": venue_id}
         ).execute()
+        trending.record_post(post_id, "shares", venue_id=venue_id)
         return jsonify({"success": True}), 200
     except Exception as e:
         print(f"[share] Error incrementing share for post {post_id}: {e}")
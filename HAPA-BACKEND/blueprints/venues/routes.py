@@ -1,13 +1,26 @@
 from __future__ import annotations
 
-from datetime import datetime
-from typing import Any, Dict, List
-
-from flask import jsonify, request
+import csv
+import io
+import json
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional
+from zoneinfo import ZoneInfo
+
+from flask import Response, current_app, jsonify, request, stream_with_context
 from flask_jwt_extended import get_jwt, get_jwt_identity, jwt_required
 
 from extensions import get_supabase, limiter
 from models.venue import create_venue, venue_to_dict
+from services.analytics_rollup import venue_timeseries
+from services.entity_cache import venue_cache
+from services.feed_snapshot import parse_timestamp
+from services.geofence import venue_geofences
+from services.load_shedding import ANALYTICS, STREAM, priority
+from services.tiers import tier_resolver
+from services.trending import trending
+from services.working_hours import stored_intervals
 from blueprints.venues import bp
 
 
@@ -67,11 +80,14 @@ def create_venue_route():
         address=address,
     )
     if working_hours:
+        venue_row["open_intervals"] = stored_intervals(working_hours)
         venue_row["working_hours"] = working_hours
 
     insert_resp = supabase.table("venues").insert(venue_row).execute()
     inserted_rows: List[Dict[str, Any]] = insert_resp.data or []
     created = inserted_rows[0] if inserted_rows else venue_row
+    if created.get("id"):
+        venue_cache.set(created["id"], created)
 
     return jsonify({"venue": venue_to_dict(created)}), 201
 
@@ -123,30 +139,251 @@ def get_my_venue():
         "walkins_count": venue_doc.get("walkins_count", 0),
     }
 
-    return jsonify({"venue": venue_to_dict(venue_doc)}), 200
+    state = tier_resolver.resolve([venue_doc["id"]]).get(str(venue_doc["id"]))
+    return jsonify({"venue": venue_to_dict(venue_doc, state)}), 200
 
 
-@bp.get("/<venue_id>")
-def get_venue(venue_id: str):
+def _owner_venue_id(supabase, user_id: str) -> Optional[str]:
+    resp = (
+        supabase.table("venues")
+        .select("id")
+        .eq("owner_id", user_id)
+        .limit(1)
+        .execute()
+    )
+    venues = resp.data or []
+    return str(venues[0]["id"]) if venues else None
+
+
+EXPORT_COLUMNS = [
+    "post_id",
+    "created_at",
+    "expires_at",
+    "media_type",
+    "caption",
+    "views",
+    "likes",
+    "shares",
+    "walkins_while_live",
+]
+
+
+def _keyset_pages(query_factory, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Page through rows ordered by (created_at, id) without OFFSET.
+    `query_factory()` must return a fresh filtered query builder.
+    """
+    last = None
+    while True:
+        query = query_factory()
+        if last is not None:
+            ts, row_id = last
+            query = query.or_(
+                f'created_at.gt."{ts}",and(created_at.eq."{ts}",id.gt.{row_id})'
+            )
+        rows = (
+            query.order("created_at").order("id").limit(batch_size).execute()
+        ).data or []
+        if not rows:
+            return
+        yield rows
+        if len(rows) < batch_size:
+            return
+        last = (rows[-1]["created_at"], rows[-1]["id"])
+
+
+def _walkin_times(
+    supabase, venue_id: str, since: str, batch_size: int
+) -> Iterator[float]:
+    """Epoch seconds of the venue's walk-ins from `since` on, oldest first."""
+
+    def walkins_query():
+        return (
+            supabase.table("walkin_logs")
+            .select("id, created_at")
+            .eq("venue_id", venue_id)
+            .gte("created_at", since)
+        )
+
+    for logs in _keyset_pages(walkins_query, batch_size):
+        for w in logs:
+            yield parse_timestamp(w["created_at"]).timestamp()
+
+
+def _export_rows(supabase, venue_id: str, batch_size: int) -> Iterator[Dict[str, Any]]:
+    """
+    One dict per post of the venue, oldest first, with walk-ins during its
+    live window.
+
+    Posts and walk-ins are both read in created_at order with their own
+    keyset cursors and merged as they go: only the walk-ins between the
+    current post's start and the latest end seen so far are held in memory.
+    """
+
+    def posts_query():
+        return (
+            supabase.table("posts")
+            .select("id, created_at, expires_at, media_type, caption, metrics")
+            .eq("venue_id", venue_id)
+        )
+
+    walkins: Optional[Iterator[float]] = None
+    upcoming: Optional[float] = None  # next walk-in not yet buffered
+    buffered: List[float] = []
+    head = 0  # buffered[:head] are older than the current post
+    for posts in _keyset_pages(posts_query, batch_size):
+        for p in posts:
+            m = p.get("metrics") or {}
+            start = parse_timestamp(p["created_at"]).timestamp()
+            end = parse_timestamp(p["expires_at"]).timestamp()
+            if walkins is None:
+                walkins = _walkin_times(supabase, venue_id, p["created_at"], batch_size)
+                upcoming = next(walkins, None)
+            while upcoming is not None and upcoming <= end:
+                buffered.append(upcoming)
+                upcoming = next(walkins, None)
+            head = bisect_left(buffered, start, head)
+            if head > batch_size and head * 2 > len(buffered):
+                del buffered[:head]
+                head = 0
+            yield {
+                "post_id": str(p["id"]),
+                "created_at": p.get("created_at"),
+                "expires_at": p.get("expires_at"),
+                "media_type": p.get("media_type"),
+                "caption": p.get("caption"),
+                "views": m.get("views", 0),
+                "likes": m.get("likes", 0),
+                "shares": m.get("shares", 0),
+                "walkins_while_live": bisect_right(buffered, end, head) - head,
+            }
+
+
+def _as_csv(rows: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    yield buf.getvalue()
+
+
+def _as_ndjson(rows: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(row) + "\n"
+
+
+@bp.get("/me/export")
+@priority(STREAM)
+@jwt_required()
+@limiter.limit("5 per minute")
+def export_my_venue_posts():
+    """
+    Stream per-post analytics for the owner's venue.
+
+    Query params:
+        format: 'csv' (default) | 'ndjson'
+
+    Posts are read in keyset-paginated batches and written out as they
+    arrive, so memory use does not grow with the venue's history.
+    """
+    if not _require_venue_owner():
+        return jsonify({"error": "Forbidden"}), 403
+
+    fmt = request.args.get("format", "csv").lower()
+    if fmt not in ("csv", "ndjson"):
+        return jsonify({"error": "format must be 'csv' or 'ndjson'"}), 400
+
     supabase = get_supabase()
+    venue_id = _owner_venue_id(supabase, get_jwt_identity())
+    if venue_id is None:
+        return jsonify({"error": "No venue found for this owner"}), 404
+
+    batch_size = current_app.config.get("EXPORT_BATCH_SIZE", 500)
+    rows = _export_rows(supabase, venue_id, batch_size)
+    if fmt == "csv":
+        body, mimetype = _as_csv(rows), "text/csv"
+    else:
+        body, mimetype = _as_ndjson(rows), "application/x-ndjson"
+
+    filename = f"hapa-posts-{venue_id}-{datetime.utcnow():%Y%m%d}.{fmt}"
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@bp.get("/me/analytics")
+@jwt_required()
+@limiter.limit("30 per minute")
+def my_venue_analytics():
+    """
+    Hourly or daily analytics for the owner's venue, read from the rollups.
+
+    Query params:
+        from, to: ISO timestamps (default: the last 7 days)
+        granularity: 'hour' (default) | 'day' (midnight to midnight in VENUE_TIMEZONE)
+        post_id: restrict to one of the venue's posts
+    """
+    if not _require_venue_owner():
+        return jsonify({"error": "Forbidden"}), 403
+
+    granularity = request.args.get("granularity", "hour")
+    if granularity not in ("hour", "day"):
+        return jsonify({"error": "granularity must be 'hour' or 'day'"}), 400
+
+    now = datetime.now(timezone.utc)
+    end = parse_timestamp(request.args.get("to")) if request.args.get("to") else now
+    start = (
+        parse_timestamp(request.args.get("from"))
+        if request.args.get("from")
+        else end - timedelta(days=7)
+    )
+    if start is None or end is None:
+        return jsonify({"error": "from and to must be ISO timestamps"}), 400
+    if start >= end:
+        return jsonify({"error": "from must be before to"}), 400
+    max_days = current_app.config.get("ANALYTICS_MAX_RANGE_DAYS", 92)
+    if end - start > timedelta(days=max_days):
+        return jsonify({"error": f"Range is limited to {max_days} days"}), 400
+
+    supabase = get_supabase()
+    venue_id = _owner_venue_id(supabase, get_jwt_identity())
+    if venue_id is None:
+        return jsonify({"error": "No venue found for this owner"}), 404
+
     try:
-        resp = (
-            supabase.table("venues")
-            .select("*")
-            .eq("id", venue_id)
-            .limit(1)
-            .execute()
+        data = venue_timeseries(
+            venue_id,
+            start,
+            end,
+            granularity,
+            post_id=request.args.get("post_id"),
+            tz=ZoneInfo(current_app.config.get("VENUE_TIMEZONE", "Africa/Kampala")),
         )
+    except Exception as e:
+        print(f"Error reading venue analytics: {e}")
+        return jsonify({"error": "Failed to load analytics"}), 500
+    return jsonify({"venue_id": venue_id, **data}), 200
+
+
+@bp.get("/<venue_id>")
+def get_venue(venue_id: str):
+    try:
+        doc = venue_cache.get(venue_id)
     except Exception as e:
         print(f"Error fetching venue: {e}")
         return jsonify({"error": "Failed to fetch venue"}), 500
 
-    venues = resp.data or []
-    doc = venues[0] if venues else None
     if not doc:
         return jsonify({"error": "Venue not found"}), 404
 
-    return jsonify({"venue": venue_to_dict(doc)}), 200
+    state = tier_resolver.resolve([venue_id]).get(str(venue_id))
+    return jsonify({"venue": venue_to_dict(doc, state)}), 200
 
 
 @bp.patch("/<venue_id>")
@@ -177,6 +414,9 @@ def update_venue(venue_id: str):
         if field in data:
             updates[field] = data[field]
 
+    if "working_hours" in updates:
+        updates["open_intervals"] = stored_intervals(updates["working_hours"])
+
     if any(key in data for key in ["address", "city", "area"]):
         address_str = (
             updates.get("address")
@@ -201,10 +441,15 @@ def update_venue(venue_id: str):
     )
     refreshed_venues = refreshed.data or []
     updated = refreshed_venues[0] if refreshed_venues else existing
+    if refreshed_venues:
+        venue_cache.set(venue_id, updated)
+    else:
+        venue_cache.invalidate(venue_id)
     return jsonify({"venue": venue_to_dict(updated)}), 200
 
 
 @bp.post("/<venue_id>/view")
+@priority(ANALYTICS)
 @jwt_required(optional=True)
 @limiter.limit("60 per minute")
 def track_view(venue_id: str):
@@ -216,6 +461,7 @@ def track_view(venue_id: str):
             "track_venue_view",
             {"target_venue_id": venue_id, "viewer_user_id": user_id}
         ).execute()
+        trending.record_venue(venue_id, "views")
         return jsonify({"success": True}), 200
     except Exception as e:
         print(f"Error tracking view: {e}")
@@ -223,6 +469,7 @@ def track_view(venue_id: str):
 
 
 @bp.post("/<venue_id>/walkin")
+@priority(ANALYTICS)
 @jwt_required(optional=True)
 @limiter.limit("10 per minute")
 def log_walkin(venue_id: str):
@@ -273,6 +520,8 @@ def log_walkin(venue_id: str):
         ).execute()
 
         outcome = result.data  # 'logged' | 'skipped'
+        if outcome == "logged":
+            trending.record_venue(venue_id, "walkins")
         return jsonify({"result": outcome}), 200
 
     except Exception as e:
@@ -280,3 +529,81 @@ def log_walkin(venue_id: str):
         # Non-critical analytics call — silently return 200 to avoid
         # disrupting the user action that triggered it (e.g., Directions tap)
         return jsonify({"result": "error"}), 200
+
+
+@bp.post("/walkins")
+@priority(ANALYTICS)
+@jwt_required()
+@limiter.limit("10 per minute")
+def log_walkins_from_pings():
+    """
+    Detect proximity walk-ins from a batch of location pings.
+
+    Body:
+        pings (list): [{"lat": float, "lng": float, "at": ISO timestamp}, ...]
+
+    A venue counts as walked into when at least WALKIN_MIN_DWELL_PINGS pings
+    fall inside its geofence, the first and last WALKIN_MIN_DWELL_MINUTES
+    apart; a ping passing by is not a visit. `log_venue_walkin` is then
+    called once per venue with source 'proximity' and the caller's user id,
+    so the same 3-hour per-user dedup applies as for single walk-ins.
+
+    Returns:
+        200  {"results": {"<venue_id>": "logged" | "skipped" | "error"}}
+        400  {"error": "..."}   — missing or malformed pings
+    """
+    user_id = get_jwt_identity()
+    supabase = get_supabase()
+
+    data = request.get_json() or {}
+    raw_pings = data.get("pings")
+    max_pings = current_app.config.get("WALKIN_BATCH_MAX_PINGS", 50)
+
+    if not isinstance(raw_pings, list) or not raw_pings:
+        return jsonify({"error": "pings must be a non-empty list"}), 400
+    if len(raw_pings) > max_pings:
+        return jsonify({"error": f"at most {max_pings} pings per batch"}), 400
+
+    pings = []
+    for ping in raw_pings:
+        try:
+            lat = float(ping["lat"])
+            lng = float(ping["lng"])
+        except (KeyError, TypeError, ValueError):
+            return jsonify({"error": "each ping needs numeric lat and lng"}), 400
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            return jsonify({"error": "ping coordinates out of range"}), 400
+        at = parse_timestamp(ping.get("at"))
+        if at is None:
+            return jsonify({"error": "each ping needs an ISO 8601 'at' timestamp"}), 400
+        pings.append((lat, lng, at.timestamp()))
+
+    try:
+        venue_ids = venue_geofences.dwelled_venues(
+            pings,
+            min_pings=current_app.config.get("WALKIN_MIN_DWELL_PINGS", 2),
+            min_seconds=current_app.config.get("WALKIN_MIN_DWELL_MINUTES", 5) * 60,
+        )
+    except Exception as e:
+        print(f"[walkin] Error matching pings against geofences: {e}")
+        return jsonify({"results": {}}), 200
+
+    results: Dict[str, Any] = {}
+    for venue_id in sorted(venue_ids):
+        try:
+            result = supabase.rpc(
+                "log_venue_walkin",
+                {
+                    "p_venue_id": venue_id,
+                    "p_user_id": user_id,
+                    "p_source": "proximity",
+                }
+            ).execute()
+            results[venue_id] = result.data
+            if result.data == "logged":
+                trending.record_venue(venue_id, "walkins")
+        except Exception as e:
+            print(f"[walkin] Error logging walk-in for venue {venue_id}: {e}")
+            results[venue_id] = "error"
+
+    return jsonify({"results": results}), 200
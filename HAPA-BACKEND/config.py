@@ -17,6 +17,21 @@ class Config:
     # Supabase
     SUPABASE_URL = os.getenv("SUPABASE_URL", "")
     SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY", "")
+    # Local verification of Supabase Auth access tokens (login-supabase)
+    SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET", "")
+    SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+    SUPABASE_JWKS_TTL_SECONDS = int(os.getenv("SUPABASE_JWKS_TTL_SECONDS", "3600"))
+    SUPABASE_TOKEN_CACHE_MAX = int(os.getenv("SUPABASE_TOKEN_CACHE_MAX", "10000"))
+
+    # Supabase HTTP transport (per worker process, shared by all threads)
+    SUPABASE_POOL_MAX_CONNECTIONS = int(os.getenv("SUPABASE_POOL_MAX_CONNECTIONS", "20"))
+    SUPABASE_POOL_MAX_KEEPALIVE = int(os.getenv("SUPABASE_POOL_MAX_KEEPALIVE", "10"))
+    SUPABASE_POOL_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_POOL_KEEPALIVE_EXPIRY", "30"))
+    SUPABASE_HTTP2 = os.getenv("SUPABASE_HTTP2", "true").lower() == "true"
+    SUPABASE_CONNECT_TIMEOUT = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "5"))
+    SUPABASE_READ_TIMEOUT = float(os.getenv("SUPABASE_READ_TIMEOUT", "10"))
+    SUPABASE_WRITE_TIMEOUT = float(os.getenv("SUPABASE_WRITE_TIMEOUT", "10"))
+    SUPABASE_POOL_TIMEOUT = float(os.getenv("SUPABASE_POOL_TIMEOUT", "2"))
 
     # JWT
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "change-me-in-production")
@@ -33,6 +48,124 @@ class Config:
     RATELIMIT_DEFAULT = "100 per minute"
     RATELIMIT_STORAGE_URL = os.getenv("RATELIMIT_STORAGE_URL", "memory://")
 
+    # Delta feed (?since=watermark)
+    DELTA_FEED_MAX_AGE_HOURS = int(os.getenv("DELTA_FEED_MAX_AGE_HOURS", "24"))
+    DELTA_FEED_OVERLAP_SECONDS = int(os.getenv("DELTA_FEED_OVERLAP_SECONDS", "5"))
+
+    # Requests one worker process serves at once (same env vars as gunicorn.conf.py)
+    WORKER_CONCURRENCY = (
+        int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "2000"))
+        if os.getenv("GUNICORN_WORKER_CLASS", "gthread") == "gevent"
+        else int(os.getenv("GUNICORN_THREADS", "8"))
+    )
+
+    # Server-sent feed events (/api/discover/stream)
+    # Open streams per worker; each holds a thread under gthread, so keep most for requests
+    SSE_MAX_STREAMS = int(os.getenv("SSE_MAX_STREAMS", str(max(1, WORKER_CONCURRENCY // 4))))
+    SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "20"))
+    SSE_MAX_STREAM_SECONDS = float(os.getenv("SSE_MAX_STREAM_SECONDS", "600"))
+    SSE_MAX_PENDING_EVENTS = int(os.getenv("SSE_MAX_PENDING_EVENTS", "100"))
+    SSE_MAX_VENUE_IDS = int(os.getenv("SSE_MAX_VENUE_IDS", "100"))
+
+    # Owner analytics export
+    EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+
+    # Adaptive concurrency limit / load shedding (per worker process)
+    # The limit moves between a fraction of WORKER_CONCURRENCY and all of it:
+    # anything above what the worker can run at once would never shed.
+    LOAD_SHED_ENABLED = os.getenv("LOAD_SHED_ENABLED", "true").lower() == "true"
+    LOAD_SHED_MAX_LIMIT = int(os.getenv("LOAD_SHED_MAX_LIMIT", str(WORKER_CONCURRENCY)))
+    LOAD_SHED_INITIAL_LIMIT = int(os.getenv("LOAD_SHED_INITIAL_LIMIT", str(LOAD_SHED_MAX_LIMIT)))
+    LOAD_SHED_MIN_FRACTION = float(os.getenv("LOAD_SHED_MIN_FRACTION", "0.25"))
+    LOAD_SHED_ANALYTICS_SHARE = float(os.getenv("LOAD_SHED_ANALYTICS_SHARE", "0.5"))
+    LOAD_SHED_QUEUE_TARGET_MS = float(os.getenv("LOAD_SHED_QUEUE_TARGET_MS", "100"))
+    LOAD_SHED_DEFER_WORKERS = int(os.getenv("LOAD_SHED_DEFER_WORKERS", "2"))
+    LOAD_SHED_DEFER_MAX = int(os.getenv("LOAD_SHED_DEFER_MAX", "1000"))
+
+    # Circuit breakers for Google Maps and Africa's Talking
+    # (timeouts and hedging: MAPS_TIMEOUT_SECONDS, MAPS_HEDGE_DELAY_MS, SMS_TIMEOUT_SECONDS)
+    BREAKER_WINDOW_CALLS = int(os.getenv("BREAKER_WINDOW_CALLS", "20"))
+    BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "5"))
+    BREAKER_FAILURE_RATIO = float(os.getenv("BREAKER_FAILURE_RATIO", "0.5"))
+    BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+    MAPS_SLOW_CALL_SECONDS = float(os.getenv("MAPS_SLOW_CALL_SECONDS", "2.5"))
+    SMS_SLOW_CALL_SECONDS = float(os.getenv("SMS_SLOW_CALL_SECONDS", "4"))
+
+    # Local gazetteer for /api/locations/suggest
+    GAZETTEER_PLACES_PATH = os.getenv("GAZETTEER_PLACES_PATH", str(base_dir / "data" / "places.csv"))
+    GAZETTEER_TTL_SECONDS = int(os.getenv("GAZETTEER_TTL_SECONDS", "3600"))
+
+    # Opt-in request profiling (samples stacks; see /api/admin/profiles)
+    PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "false").lower() == "true"
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    PROFILE_HEADER = os.getenv("PROFILE_HEADER", "X-Profile")  # value must be ADMIN_API_TOKEN
+    PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+    PROFILE_KEEP_PER_ENDPOINT = int(os.getenv("PROFILE_KEEP_PER_ENDPOINT", "10"))
+
+    # Supabase query tracing
+    QUERY_TRACE_ENABLED = os.getenv("QUERY_TRACE_ENABLED", "true").lower() == "true"
+    SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "300"))
+    N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "3"))
+
+    # Response compression (br needs the optional brotli package)
+    COMPRESS_ENABLED = os.getenv("COMPRESS_ENABLED", "true").lower() == "true"
+    COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+    COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+    COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "5"))
+    COMPRESS_CACHE_MAX_BYTES = int(os.getenv("COMPRESS_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+
+    # Opening hours: working_hours are venue-local times in this zone
+    VENUE_TIMEZONE = os.getenv("VENUE_TIMEZONE", "Africa/Kampala")
+
+    # Batched tier/boost resolution (cached until the boost or period ends, at most the TTL)
+    TIER_CACHE_TTL_SECONDS = float(os.getenv("TIER_CACHE_TTL_SECONDS", "300"))
+    TIER_BATCH_SIZE = int(os.getenv("TIER_BATCH_SIZE", "200"))
+
+    # Hourly analytics rollups (migration 29)
+    ANALYTICS_ROLLUP_ENABLED = os.getenv("ANALYTICS_ROLLUP_ENABLED", "true").lower() == "true"
+    ANALYTICS_ROLLUP_INTERVAL_SECONDS = int(os.getenv("ANALYTICS_ROLLUP_INTERVAL_SECONDS", "300"))
+    ANALYTICS_MAX_RANGE_DAYS = int(os.getenv("ANALYTICS_MAX_RANGE_DAYS", "92"))
+
+    # Buffered users.last_login_at writes
+    LAST_LOGIN_FLUSH_SECONDS = float(os.getenv("LAST_LOGIN_FLUSH_SECONDS", "5"))
+
+    # Two-tier cache: process-local LRU + host-shared SQLite (WAL) file
+    CACHE_LOCAL_MAX_ENTRIES = int(os.getenv("CACHE_LOCAL_MAX_ENTRIES", "10000"))
+    CACHE_LOCAL_TTL_SECONDS = float(os.getenv("CACHE_LOCAL_TTL_SECONDS", "5"))
+    CACHE_SHARED_BACKEND = os.getenv("CACHE_SHARED_BACKEND", "sqlite")
+    CACHE_SHARED_PATH = os.getenv("CACHE_SHARED_PATH", "")
+    CACHE_SHARED_MAX_BYTES = int(os.getenv("CACHE_SHARED_MAX_BYTES", str(64 * 1024 * 1024)))
+
+    # Operational endpoints (/api/metrics, /api/admin/*); closed when unset outside debug
+    ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN", "")
+
+    # Per-city feed snapshots
+    FEED_SNAPSHOT_ENABLED = os.getenv("FEED_SNAPSHOT_ENABLED", "true").lower() == "true"
+    FEED_SNAPSHOT_INTERVAL_SECONDS = int(os.getenv("FEED_SNAPSHOT_INTERVAL_SECONDS", "60"))
+    FEED_SNAPSHOT_MAX_AGE_SECONDS = int(os.getenv("FEED_SNAPSHOT_MAX_AGE_SECONDS", "180"))
+    FEED_SNAPSHOT_MAX_CITIES = int(os.getenv("FEED_SNAPSHOT_MAX_CITIES", "10"))
+
+    # Proximity walk-ins
+    WALKIN_GEOFENCE_RADIUS_M = float(os.getenv("WALKIN_GEOFENCE_RADIUS_M", "75"))
+    WALKIN_GEOFENCE_TTL_SECONDS = int(os.getenv("WALKIN_GEOFENCE_TTL_SECONDS", "300"))
+    WALKIN_BATCH_MAX_PINGS = int(os.getenv("WALKIN_BATCH_MAX_PINGS", "50"))
+    # A venue counts only after this many pings inside it spanning this long
+    WALKIN_MIN_DWELL_PINGS = int(os.getenv("WALKIN_MIN_DWELL_PINGS", "2"))
+    WALKIN_MIN_DWELL_MINUTES = float(os.getenv("WALKIN_MIN_DWELL_MINUTES", "5"))
+
+    # Trending (sliding-window engagement)
+    TRENDING_WINDOW_MINUTES = int(os.getenv("TRENDING_WINDOW_MINUTES", "60"))
+    TRENDING_BUCKET_SECONDS = int(os.getenv("TRENDING_BUCKET_SECONDS", "300"))
+    TRENDING_TOP_K = int(os.getenv("TRENDING_TOP_K", "20"))
+    TRENDING_DIRECTORY_TTL_SECONDS = int(os.getenv("TRENDING_DIRECTORY_TTL_SECONDS", "300"))
+
+    # Per-user liked-post cache
+    LIKED_CACHE_TTL_SECONDS = int(os.getenv("LIKED_CACHE_TTL_SECONDS", "300"))
+
+    # Venue/user row cache (stale-while-revalidate)
+    ENTITY_CACHE_TTL_SECONDS = float(os.getenv("ENTITY_CACHE_TTL_SECONDS", "60"))
+    ENTITY_CACHE_STALE_SECONDS = float(os.getenv("ENTITY_CACHE_STALE_SECONDS", "300"))
+
 
 class DevelopmentConfig(Config):
     DEBUG = True
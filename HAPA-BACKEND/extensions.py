@@ -1,15 +1,96 @@
+import importlib.util
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
 from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+import httpx
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from supabase import Client, create_client
+from supabase import Client, ClientOptions, create_client
+
+logger = logging.getLogger(__name__)
 
 jwt = JWTManager()
 cors = CORS()
 limiter = Limiter(key_func=get_remote_address, default_limits=[])
 supabase_client: Client | None = None
+supabase_transport: "PooledTransport | None" = None
+
+
+class PooledTransport(httpx.HTTPTransport):
+    """
+    httpx transport that records pool utilization.
+
+    `observers` are called as observer(request, response_or_None, seconds)
+    after every request (see services.query_trace).
+
+    httpx.Client and its connection pool are safe to share between threads,
+    so one transport per worker process serves every request thread. It must
+    be created after gunicorn forks (the default without --preload), never
+    inherited across a fork.
+    """
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._stats_lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests_total = 0
+        self.errors_total = 0
+        self.seconds_total = 0.0
+        self.observers: list = []
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        with self._stats_lock:
+            self.in_flight += 1
+            self.requests_total += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        start = time.perf_counter()
+        response = None
+        try:
+            response = super().handle_request(request)
+            return response
+        except Exception:
+            with self._stats_lock:
+                self.errors_total += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._stats_lock:
+                self.in_flight -= 1
+                self.seconds_total += elapsed
+            for observer in self.observers:
+                try:
+                    observer(request, response, elapsed)
+                except Exception as exc:  # tracing must never break a query
+                    logger.debug("Transport observer failed: %s", exc)
+
+    def stats(self) -> Dict[str, Any]:
+        connections = list(getattr(self._pool, "connections", []))
+        idle = sum(1 for c in connections if c.is_idle())
+        with self._stats_lock:
+            return {
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "requests_total": self.requests_total,
+                "errors_total": self.errors_total,
+                "avg_ms": round(1000 * self.seconds_total / self.requests_total, 2)
+                if self.requests_total
+                else 0.0,
+                "connections_open": len(connections),
+                "connections_idle": idle,
+                "connections_active": len(connections) - idle,
+            }
 
 
 def init_supabase(app) -> None:
@@ -17,13 +98,43 @@ def init_supabase(app) -> None:
     Initialize the Supabase client.
 
     Uses the SUPABASE_URL and SUPABASE_SERVICE_KEY values from app config.
+    PostgREST, Auth and Storage share one pooled httpx client tuned by the
+    SUPABASE_POOL_* / SUPABASE_*_TIMEOUT settings.
     """
-    global supabase_client
+    global supabase_client, supabase_transport
     url = app.config.get("SUPABASE_URL")
     key = app.config.get("SUPABASE_SERVICE_KEY")
     if not url or not key:
         raise RuntimeError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be configured")
-    supabase_client = create_client(url, key)
+
+    http2 = app.config.get("SUPABASE_HTTP2", True) and importlib.util.find_spec("h2") is not None
+    supabase_transport = PooledTransport(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=app.config.get("SUPABASE_POOL_MAX_CONNECTIONS", 20),
+            max_keepalive_connections=app.config.get("SUPABASE_POOL_MAX_KEEPALIVE", 10),
+            keepalive_expiry=app.config.get("SUPABASE_POOL_KEEPALIVE_EXPIRY", 30.0),
+        ),
+    )
+    timeout = httpx.Timeout(
+        connect=app.config.get("SUPABASE_CONNECT_TIMEOUT", 5.0),
+        read=app.config.get("SUPABASE_READ_TIMEOUT", 10.0),
+        write=app.config.get("SUPABASE_WRITE_TIMEOUT", 10.0),
+        pool=app.config.get("SUPABASE_POOL_TIMEOUT", 2.0),
+    )
+    http_client = httpx.Client(
+        transport=supabase_transport,
+        timeout=timeout,
+        follow_redirects=True,
+    )
+    supabase_client = create_client(url, key, options=ClientOptions(httpx_client=http_client))
+
+
+def supabase_pool_stats() -> Dict[str, Any]:
+    """Connection pool utilization for the Supabase transport."""
+    if supabase_transport is None:
+        return {}
+    return supabase_transport.stats()
 
 
 def get_supabase() -> Client:
@@ -33,6 +144,35 @@ def get_supabase() -> Client:
     return supabase_client
 
 
+# Must not exceed the project's PostgREST max_rows (Supabase default: 1000)
+SUPABASE_PAGE_SIZE = 1000
+
+
+def fetch_all(
+    build_query: Callable[[], Any], key: str = "id", page_size: int = SUPABASE_PAGE_SIZE
+) -> List[Dict[str, Any]]:
+    """
+    Every row of a select, read in pages ordered by `key`.
+
+    PostgREST truncates a response at max_rows without an error, so large
+    reads go page by page, each one starting after the last `key` seen
+    (keyset, so rows written meanwhile cannot shift a page). `build_query`
+    returns a fresh filtered select that includes `key`; `key` must be
+    unique within it.
+    """
+    rows: List[Dict[str, Any]] = []
+    last: Any = None
+    while True:
+        query = build_query()
+        if last is not None:
+            query = query.gt(key, last)
+        page = query.order(key).limit(page_size).execute().data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        last = page[-1][key]
+
+
 def init_jwt(app) -> None:
     access_minutes = app.config["JWT_ACCESS_TOKEN_EXPIRES_MINUTES"]
     refresh_days = app.config["JWT_REFRESH_TOKEN_EXPIRES_DAYS"]
@@ -55,3 +195,271 @@ def init_rate_limiter(app) -> None:
         limiter.default_limits = [default_limit]
     limiter.init_app(app)
 
+
+
+class CacheBackend(ABC):
+    """
+    Minimal key/value cache interface. Values must be JSON-native (dict,
+    list, str, int, float, bool, None): convert datetimes and the like
+    before caching, since a shared tier raises TypeError on anything else.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class LocalLRUCache(CacheBackend):
+    """
+    Process-local tier. Holds live Python objects, so a hit costs a dict
+    lookup and no serialization. Entries are shared: treat them as read-only.
+    """
+
+    def __init__(self, max_entries: int = 10000) -> None:
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[1] <= time.time():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl_seconds)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+class SQLiteSharedCache(CacheBackend):
+    """
+    Host-shared tier: one SQLite file in WAL mode that every gunicorn worker
+    on the machine reads and writes, and that survives worker restarts.
+
+    Values are stored as compact JSON. Total payload size is bounded by
+    `max_bytes`; expired rows go first, then the least recently read.
+    A read refreshes `accessed_at` at most once per `_TOUCH_SECONDS`, so hits
+    rarely take the file's write lock.
+    """
+
+    _EVICT_EVERY = 64
+    _TOUCH_SECONDS = 60.0
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._writes = 0
+        self._counter_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._connect().execute(
+            "CREATE INDEX IF NOT EXISTS cache_accessed_idx ON cache (accessed_at)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections must not cross threads or a fork.
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, accessed_at FROM cache WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+            if row is None:
+                with self._counter_lock:
+                    self.misses += 1
+                return None
+            if now - row[1] > self._TOUCH_SECONDS:
+                conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as exc:
+            logger.warning("Shared cache read failed for %s: %s", key, exc)
+            return None
+        with self._counter_lock:
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        try:
+            payload = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        except TypeError as exc:
+            # A value that would come back as something else is a bug in the caller
+            raise TypeError(f"Cache value for {key} is not JSON-native: {exc}") from exc
+        now = time.time()
+        try:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), now + ttl_seconds, now),
+            )
+        except sqlite3.Error as exc:
+            logger.warning("Shared cache write failed for %s: %s", key, exc)
+            return
+        with self._counter_lock:
+            self._writes += 1
+            evict = self._writes % self._EVICT_EVERY == 0
+        if evict:
+            self.evict()
+
+    def delete(self, key: str) -> None:
+        try:
+            self._connect().execute("DELETE FROM cache WHERE key = ?", (key,))
+        except sqlite3.Error as exc:
+            logger.warning("Shared cache delete failed for %s: %s", key, exc)
+
+    def evict(self) -> None:
+        try:
+            conn = self._connect()
+            conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+            total, count = conn.execute("SELECT COALESCE(SUM(size), 0), COUNT(*) FROM cache").fetchone()
+            if total <= self.max_bytes or not count:
+                return
+            # Drop the least recently read rows, roughly enough to get 10% under budget.
+            avg = total / count
+            excess = int((total - self.max_bytes * 0.9) / avg) + 1
+            conn.execute(
+                "DELETE FROM cache WHERE key IN"
+                " (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
+        except sqlite3.Error as exc:
+            logger.warning("Shared cache eviction failed: %s", exc)
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            total, count = self._connect().execute(
+                "SELECT COALESCE(SUM(size), 0), COUNT(*) FROM cache"
+            ).fetchone()
+        except sqlite3.Error:
+            total, count = None, None
+        with self._counter_lock:
+            hits, misses = self.hits, self.misses
+        return {
+            "entries": count,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "hits": hits,
+            "misses": misses,
+        }
+
+
+class TieredCache(CacheBackend):
+    """
+    Process-local LRU in front of an optional host-shared tier.
+
+    Local copies live at most `local_ttl_seconds`, which bounds how long a
+    delete issued by one worker can go unseen by the others.
+    """
+
+    def __init__(
+        self,
+        local: LocalLRUCache,
+        shared: Optional[CacheBackend] = None,
+        local_ttl_seconds: float = 5.0,
+    ) -> None:
+        self.local = local
+        self.shared = shared
+        self.local_ttl_seconds = local_ttl_seconds
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is not None or self.shared is None:
+            return value
+        value = self.shared.get(key)
+        if value is not None:
+            self.local.set(key, value, self.local_ttl_seconds)
+        return value
+
+    def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        # Shared first: a value it rejects is not left behind in the local tier
+        if self.shared is not None:
+            self.shared.set(key, value, ttl_seconds)
+        self.local.set(key, value, min(ttl_seconds, self.local_ttl_seconds))
+
+    def delete(self, key: str) -> None:
+        self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "local": self.local.stats(),
+            "shared": self.shared.stats() if self.shared is not None else None,
+        }
+
+
+cache = TieredCache(LocalLRUCache())
+
+
+def init_cache(app) -> None:
+    """
+    Configure the global two-tier cache.
+
+    CACHE_SHARED_BACKEND selects the host-shared tier: "sqlite" (default) or
+    "none" for a process-local cache only.
+    """
+    cache.local = LocalLRUCache(app.config.get("CACHE_LOCAL_MAX_ENTRIES", 10000))
+    cache.local_ttl_seconds = app.config.get("CACHE_LOCAL_TTL_SECONDS", 5.0)
+
+    backend = app.config.get("CACHE_SHARED_BACKEND", "sqlite").lower()
+    if backend == "sqlite":
+        path = app.config.get("CACHE_SHARED_PATH") or os.path.join(
+            tempfile.gettempdir(), "hapa-cache.sqlite3"
+        )
+        try:
+            cache.shared = SQLiteSharedCache(
+                path, app.config.get("CACHE_SHARED_MAX_BYTES", 64 * 1024 * 1024)
+            )
+        except sqlite3.Error as exc:
+            logger.warning("Shared cache at %s unavailable, using local only: %s", path, exc)
+            cache.shared = None
+    else:
+        cache.shared = None
@@ -0,0 +1,21 @@
+"""
+Gunicorn settings, picked up automatically by `gunicorn wsgi:app`.
+
+Default worker: gthread, GUNICORN_THREADS threads per process. Each open
+SSE stream (/api/discover/stream) holds one of them until it closes after
+SSE_MAX_STREAM_SECONDS; the app caps open streams at SSE_MAX_STREAMS per
+worker (a quarter of the threads by default) and answers 503 beyond that.
+
+GUNICORN_WORKER_CLASS=gevent serves requests and streams on greenlets
+instead (up to GUNICORN_WORKER_CONNECTIONS each). Only use it with
+CACHE_SHARED_BACKEND=none: the SQLite shared cache keeps one connection
+per thread, which under gevent means one per greenlet, and its blocking
+calls stall the event loop.
+"""
+import os
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "8"))  # only used by gthread
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "2000"))  # only used by gevent
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
@@ -3,13 +3,28 @@ from __future__ import annotations
 from datetime import datetime, timedelta
 from typing import Any, Dict
 
+from models.record import SlottedRecord
+
+POST_TTL_HOURS = 24
+
+
+class Post(SlottedRecord):
+    """Compact, read-only `posts` row for in-memory snapshots and indexes."""
+
+    FIELDS = (
+        "id", "venue_id", "media_type", "media_url", "caption",
+        "created_at", "expires_at", "metrics", "is_deleted",
+    )
+    INTERNED = frozenset({"venue_id", "media_type"})
+    __slots__ = FIELDS
+
 
 def create_post(
     venue_id: str,
     media_type: str,
     media_url: str,
     caption: str | None = None,
-    ttl_hours: int = 24,
+    ttl_hours: int = POST_TTL_HOURS,
 ) -> Dict[str, Any]:
     """
     Build a new post row for insertion into Supabase.
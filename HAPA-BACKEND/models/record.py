@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import sys
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+_MISSING = object()
+
+
+class SlottedRecord(Mapping):
+    """
+    Row with one slot per known column instead of a per-row dict.
+
+    Subclasses list their columns in FIELDS and set `__slots__ = FIELDS`.
+    Columns outside FIELDS land in `_extra`, so nothing a Supabase row
+    carries is lost. Low-cardinality text columns named in INTERNED share
+    one string object across rows.
+
+    Records are Mappings: `row.get(...)`, `row["id"]`, `{**row}` and the
+    `*_to_dict` serializers work on them unchanged. Like every cached row
+    they are shared, so treat them as read-only. They are not JSON
+    serializable as-is; use `to_row()` for that.
+    """
+
+    __slots__ = ("_extra",)
+
+    FIELDS: Tuple[str, ...] = ()
+    INTERNED: frozenset = frozenset()
+    _field_set: frozenset = frozenset()
+    # (slot setter, column, intern?) per column, resolved once per subclass
+    _columns: Tuple[Tuple[Callable[[Any, Any], None], str, bool], ...] = ()
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._field_set = frozenset(cls.FIELDS)
+        cls._columns = tuple(
+            (getattr(cls, name).__set__, name, name in cls.INTERNED) for name in cls.FIELDS
+        )
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "SlottedRecord":
+        """Build a record from a Supabase row dict."""
+        # Slot setters bound up front keep this loop cheap: snapshot builds
+        # run it for every venue and post of a city.
+        record = object.__new__(cls)
+        get = row.get
+        for set_slot, name, interned in cls._columns:
+            value = get(name, _MISSING)
+            if interned and type(value) is str:
+                value = sys.intern(value)
+            set_slot(record, value)
+        unknown = row.keys() - cls._field_set
+        record._extra = {k: row[k] for k in unknown} if unknown else None
+        return record
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._field_set:
+            value = getattr(self, key)
+            if value is not _MISSING:
+                return value
+        elif self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        # Hot path for the serializers; Mapping.get would go through KeyError
+        if key in self._field_set:
+            value = getattr(self, key)
+            return default if value is _MISSING else value
+        extra = self._extra
+        return extra.get(key, default) if extra is not None else default
+
+    def __iter__(self) -> Iterator[str]:
+        for name in self.FIELDS:
+            if getattr(self, name) is not _MISSING:
+                yield name
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def to_row(self) -> Dict[str, Any]:
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_row()!r})"
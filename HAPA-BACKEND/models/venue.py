@@ -3,6 +3,21 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
+from models.record import SlottedRecord
+
+
+class Venue(SlottedRecord):
+    """Compact, read-only `venues` row for in-memory snapshots and indexes."""
+
+    FIELDS = (
+        "id", "owner_id", "name", "type", "city", "area", "address", "contact_phone",
+        "categories", "images", "working_hours", "open_intervals", "lat", "lng",
+        "tier", "post_shares", "walkins_count", "metrics", "is_deleted",
+        "created_at", "updated_at",
+    )
+    INTERNED = frozenset({"owner_id", "type", "city", "area", "tier"})
+    __slots__ = FIELDS
+
 
 def create_venue(
     owner_id: str,
@@ -39,10 +54,12 @@ def create_venue(
     }
 
 
-def venue_to_dict(doc: Dict[str, Any]) -> Dict[str, Any]:
+def venue_to_dict(doc: Dict[str, Any], state: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     Map a Supabase `venues` row to the public API payload.
+    `state` is the venue's entry from services.tiers.tier_resolver, when resolved.
     """
+    state = state or {}
     return {
         "id": str(doc.get("id")),
         "owner_id": str(doc.get("owner_id")) if doc.get("owner_id") else None,
@@ -56,7 +73,8 @@ def venue_to_dict(doc: Dict[str, Any]) -> Dict[str, Any]:
         "address": doc.get("address"),
         "lat": doc.get("lat"),
         "lng": doc.get("lng"),
-        "tier": doc.get("tier", "free"),
+        "tier": state.get("tier", doc.get("tier", "free")),
+        "is_boosted": state.get("is_boosted", doc.get("is_boosted", False)),
         "post_shares": doc.get("post_shares", 0),
         "walkins_count": doc.get("walkins_count", 0),
         "created_at": doc.get("created_at"),
@@ -0,0 +1,100 @@
+"""
+Memory and build time of snapshot rows: plain dicts vs SlottedRecord.
+
+Generates a synthetic city (synthetic_data.py), round-trips its venues and
+posts through JSON so every row owns its strings the way a PostgREST
+response does, then measures with tracemalloc what each form keeps alive.
+
+    python record_benchmark.py --venues 2000 --days 3
+
+Posts save roughly a quarter; venues less, since most of their bytes are
+nested JSON (hours, categories, intervals) that both forms hold the same
+way. Exits non-zero when either table saves less than --min-saving of the
+dict size, so it can guard changes to models/record.py.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from models.post import Post
+from models.venue import Venue
+from synthetic_data import SyntheticCity, load_into_memory
+
+
+def _retained_bytes(build: Callable[[], Any]) -> int:
+    """Bytes still allocated after `build()`, while its result is alive."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = build()
+        gc.collect()
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return retained
+
+
+def measure(table: str, rows: List[Dict[str, Any]], record_cls: Any) -> Dict[str, Any]:
+    payload = json.dumps(rows)
+    as_dicts = _retained_bytes(lambda: json.loads(payload))
+    as_records = _retained_bytes(lambda: [record_cls.from_row(r) for r in json.loads(payload)])
+
+    parsed = json.loads(payload)
+    started = time.perf_counter()
+    for row in parsed:
+        record_cls.from_row(row)
+    build_us = (time.perf_counter() - started) * 1e6 / max(len(parsed), 1)
+    return {
+        "table": table,
+        "rows": len(rows),
+        "dict_bytes": as_dicts,
+        "record_bytes": as_records,
+        "saving": 1 - as_records / as_dicts if as_dicts else 0.0,
+        "from_row_us": build_us,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare dict and SlottedRecord row memory.")
+    parser.add_argument("--venues", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--min-saving", type=float, default=0.05, help="fail below this fraction")
+    args = parser.parse_args(argv)
+
+    city = SyntheticCity(
+        venues=args.venues,
+        users=max(args.venues * 5, 100),
+        days=args.days,
+        seed=args.seed,
+        now=datetime(2026, 1, 5, 22, tzinfo=timezone.utc),
+        views_per_post=0.0,
+        venue_views_per_day=0.0,
+        walkins_per_day=0.0,
+    )
+    tables = load_into_memory(city)
+
+    ok = True
+    for table, record_cls in (("venues", Venue), ("posts", Post)):
+        result = measure(table, tables[table], record_cls)
+        print(
+            f"{result['table']:>7}: {result['rows']:>8,} rows"
+            f"  dicts {result['dict_bytes'] / 1e6:7.1f} MB"
+            f"  records {result['record_bytes'] / 1e6:7.1f} MB"
+            f"  saving {result['saving']:6.1%}"
+            f"  from_row {result['from_row_us']:.2f} us/row"
+        )
+        ok = ok and result["saving"] >= args.min_saving
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
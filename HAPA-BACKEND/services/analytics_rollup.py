@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import logging
+import threading
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Any, Dict, List, Optional
+
+from extensions import fetch_all, get_supabase
+from services.feed_snapshot import parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+VENUE_SERIES = ("venue_views", "post_views", "post_likes", "walkins")
+POST_SERIES = ("views", "likes")
+
+
+class AnalyticsRollup:
+    """
+    Keeps the hourly rollup tables (migration 29) current.
+
+    A background thread calls `rollup_hourly_analytics` every
+    `interval_seconds`; the function only counts complete hours and locks its
+    watermark row, so every worker can run the thread without double counting.
+    """
+
+    def __init__(self) -> None:
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.interval_seconds = 300.0
+        self.rolled_up_to: Optional[datetime] = None
+
+    def init_app(self, app) -> None:
+        self.interval_seconds = app.config.get("ANALYTICS_ROLLUP_INTERVAL_SECONDS", 300)
+        if not app.config.get("ANALYTICS_ROLLUP_ENABLED", True):
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name="analytics-rollup", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            self.run_once()
+
+    def run_once(self) -> None:
+        try:
+            resp = get_supabase().rpc("rollup_hourly_analytics", {}).execute()
+            self.rolled_up_to = parse_timestamp(resp.data)
+        except Exception as exc:
+            logger.warning("Hourly analytics rollup failed: %s", exc)
+
+
+def _bucket_bounds(start: datetime, end: datetime, granularity: str, tz: tzinfo) -> List[datetime]:
+    """
+    Bucket starts covering [start, end), plus the end of the last bucket.
+    Hours are UTC hours (the rollup grain); days run from midnight to
+    midnight in `tz`, so day totals match the owner's local day.
+    """
+    if granularity == "day":
+        cursor = start.astimezone(tz).replace(hour=0, minute=0, second=0, microsecond=0)
+        step = timedelta(days=1)  # same-zone arithmetic keeps local midnights
+    else:
+        cursor = start.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        step = timedelta(hours=1)
+    bounds = [cursor]
+    while cursor < end:
+        cursor = cursor + step
+        bounds.append(cursor)
+    return bounds
+
+
+def _zero_filled(
+    rows: List[Dict[str, Any]], bounds: List[datetime], series
+) -> List[Dict[str, Any]]:
+    """Sum hourly rows into the buckets between `bounds`, including empty ones."""
+    points = [dict.fromkeys(series, 0) for _ in range(len(bounds) - 1)]
+    for row in rows:
+        ts = parse_timestamp(row.get("bucket"))
+        if ts is None:
+            continue
+        i = bisect_right(bounds, ts) - 1
+        if 0 <= i < len(points):
+            for name in series:
+                points[i][name] += row.get(name) or 0
+    return [
+        {"bucket": bounds[i].isoformat(), **counts}
+        for i, counts in enumerate(points)
+    ]
+
+
+def venue_timeseries(
+    venue_id: str,
+    start: datetime,
+    end: datetime,
+    granularity: str = "hour",
+    post_id: Optional[str] = None,
+    tz: tzinfo = timezone.utc,
+) -> Dict[str, Any]:
+    """
+    Read the rollup buckets of a venue (or one of its posts) in [start, end).
+
+    The range is widened to whole hours, or whole days in `tz`; only rows
+    with a bucket inside it are read, page by page. `rolled_up_to` is the
+    end of the last complete hour counted, so later points are still being
+    filled in.
+    """
+    granularity = "day" if granularity == "day" else "hour"
+    bounds = _bucket_bounds(start, end, granularity, tz)
+    start, end = bounds[0], bounds[-1]
+
+    supabase = get_supabase()
+    if post_id:
+        series = POST_SERIES
+        table = "post_stats_hourly"
+        filters = {"venue_id": venue_id, "post_id": post_id}
+    else:
+        series = VENUE_SERIES
+        table = "venue_stats_hourly"
+        filters = {"venue_id": venue_id}
+
+    def build_query():
+        query = supabase.table(table).select("bucket, " + ", ".join(series))
+        for column, value in filters.items():
+            query = query.eq(column, value)
+        return query.gte("bucket", start.astimezone(timezone.utc).isoformat()).lt(
+            "bucket", end.astimezone(timezone.utc).isoformat()
+        )
+
+    # 92 days of hours is over PostgREST's max_rows; bucket is unique per venue/post
+    rows = fetch_all(build_query, key="bucket")
+    state = (
+        supabase.table("analytics_rollup_state")
+        .select("rolled_up_to")
+        .eq("id", 1)
+        .limit(1)
+        .execute()
+    )
+
+    points = _zero_filled(rows, bounds, series)
+    state_rows = state.data or []
+    return {
+        "granularity": granularity,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "rolled_up_to": state_rows[0]["rolled_up_to"] if state_rows else None,
+        "series": points,
+        "totals": {name: sum(p[name] for p in points) for name in series},
+    }
+
+
+analytics_rollup = AnalyticsRollup()
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import gzip
+import importlib.util
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from flask import Response, g, request
+
+if importlib.util.find_spec("brotli") is not None:
+    import brotli
+else:  # brotli is optional; gzip is always available
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "text/",
+)
+
+
+class CachedBody:
+    """
+    A serialized JSON body shared by many requests, with its compressed
+    variants filled in on first use. `meta` is whatever the caller needs to
+    decide whether the body fits a request (e.g. the post ids in a feed).
+    """
+
+    __slots__ = ("key", "body", "meta", "encoded")
+
+    def __init__(self, key: Hashable, body: bytes, meta: Any = None) -> None:
+        self.key = key
+        self.body = body
+        self.meta = meta
+        self.encoded: Dict[str, bytes] = {}
+
+    def size(self) -> int:
+        return len(self.body) + sum(len(v) for v in self.encoded.values())
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    accepted: Dict[str, float] = {}
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+    return accepted
+
+
+class ResponseCompressor:
+    """
+    gzip/brotli for JSON and text responses above `min_bytes`.
+
+    The encoding is negotiated from Accept-Encoding (br preferred when the
+    brotli package is installed, honouring q-values). Streamed responses
+    (SSE, exports) are left alone. Routes whose body only depends on a
+    cache generation (feed snapshot) keep it here under their own key via
+    `cache_body` / `cached_body` and answer with `respond`: the body is
+    serialized once, each encoding is compressed once at a higher level,
+    and later requests are a dict lookup.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[Hashable, CachedBody]" = OrderedDict()
+        self._cache_bytes = 0
+        self.enabled = True
+        self.min_bytes = 1024
+        self.gzip_level = 6
+        self.brotli_quality = 5
+        self.cache_max_bytes = 8 * 1024 * 1024
+        self.compressed = 0
+        self.cache_hits = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def init_app(self, app) -> None:
+        self.enabled = app.config.get("COMPRESS_ENABLED", True)
+        self.min_bytes = app.config.get("COMPRESS_MIN_BYTES", 1024)
+        self.gzip_level = app.config.get("COMPRESS_GZIP_LEVEL", 6)
+        self.brotli_quality = app.config.get("COMPRESS_BROTLI_QUALITY", 5)
+        self.cache_max_bytes = app.config.get("COMPRESS_CACHE_MAX_BYTES", 8 * 1024 * 1024)
+        if self.enabled:
+            app.after_request(self._after_request)
+
+    def _choose(self) -> Optional[str]:
+        accepted = _accepted_encodings(request.headers.get("Accept-Encoding", ""))
+        candidates = (("br", "gzip") if brotli is not None else ("gzip",))
+        best, best_q = None, 0.0
+        for encoding in candidates:
+            q = accepted.get(encoding, accepted.get("*", 0.0))
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def _compress(self, body: bytes, encoding: str, cached: bool) -> bytes:
+        if encoding == "br":
+            quality = 9 if cached else self.brotli_quality
+            return brotli.compress(body, quality=quality)
+        return gzip.compress(body, compresslevel=9 if cached else self.gzip_level, mtime=0)
+
+    # ── Shared bodies ──────────────────────────────────────────────────────
+
+    def cached_body(self, key: Hashable) -> Optional[CachedBody]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+            return entry
+
+    def cache_body(self, key: Hashable, body: bytes, meta: Any = None) -> CachedBody:
+        entry = CachedBody(key, body, meta)
+        with self._lock:
+            old = self._cache.pop(key, None)
+            if old is not None:
+                self._cache_bytes -= old.size()
+            self._cache[key] = entry
+            self._cache_bytes += entry.size()
+            self._evict()
+        return entry
+
+    def _evict(self) -> None:
+        # Caller holds the lock.
+        while self._cache_bytes > self.cache_max_bytes and self._cache:
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_bytes -= evicted.size()
+
+    @staticmethod
+    def respond(entry: CachedBody, status: int = 200) -> Response:
+        """JSON response for a shared body; compression reuses its variants."""
+        g.cached_body = entry
+        return Response(entry.body, status=status, mimetype="application/json")
+
+    def _encoded(self, entry: CachedBody, encoding: str) -> bytes:
+        with self._lock:
+            hit = entry.encoded.get(encoding)
+        if hit is not None:
+            return hit
+        compressed = self._compress(entry.body, encoding, cached=True)
+        with self._lock:
+            if encoding not in entry.encoded:
+                entry.encoded[encoding] = compressed
+                if self._cache.get(entry.key) is entry:  # still counted in the LRU
+                    self._cache_bytes += len(compressed)
+                    self._evict()
+        return compressed
+
+    def _after_request(self, response):
+        if (
+            response.direct_passthrough
+            or response.is_streamed
+            or response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or "Content-Encoding" in response.headers
+            or not response.mimetype.startswith(COMPRESSIBLE_TYPES)
+        ):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        body = response.get_data()
+        if len(body) < self.min_bytes:
+            return response
+        encoding = self._choose()
+        if encoding is None:
+            return response
+
+        entry = g.get("cached_body")
+        if entry is not None and len(entry.body) == len(body):
+            compressed = self._encoded(entry, encoding)
+        else:
+            compressed = self._compress(body, encoding, cached=False)
+        if len(compressed) >= len(body):
+            return response
+
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        with self._lock:
+            self.compressed += 1
+            self.bytes_in += len(body)
+            self.bytes_out += len(compressed)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "brotli_available": brotli is not None,
+                "compressed": self.compressed,
+                "cache_hits": self.cache_hits,
+                "cache_entries": len(self._cache),
+                "cache_bytes": self._cache_bytes,
+                "ratio": round(self.bytes_out / self.bytes_in, 3) if self.bytes_in else None,
+            }
+
+
+response_compressor = ResponseCompressor()
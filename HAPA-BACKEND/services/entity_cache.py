@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from extensions import cache, get_supabase
+from services.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+Row = Dict[str, Any]
+Loader = Callable[[str], Optional[Row]]
+
+# Shared by every cache; background refreshes are short single-row reads.
+_refresh_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="entity-refresh")
+
+
+class EntityCache:
+    """
+    Read-through cache of single rows keyed by id, stored in the shared
+    two-tier `extensions.cache` so workers on one host reuse each other's loads.
+
+    - Fresh (younger than `ttl_seconds`): served from memory.
+    - Stale (within a further `stale_seconds`): served from memory while one
+      background refresh reloads the row.
+    - Missing or expired: loaded inline; concurrent misses for the same key
+      wait for the first caller's load instead of issuing their own.
+
+    Rows that do not exist are not cached, so a newly created row is visible
+    on the next read. A load that overlaps an invalidation is returned to its
+    callers but not stored. Cached rows are shared: treat them as read-only.
+    """
+
+    def __init__(self, name: str, loader: Loader) -> None:
+        self.name = name
+        self._loader = loader
+        self._flights = SingleFlight(name)
+        self._refreshing: set = set()
+        self._invalidations = 0
+        self._lock = threading.Lock()
+        self.ttl_seconds = 60.0
+        self.stale_seconds = 300.0
+
+    def configure(self, ttl_seconds: float, stale_seconds: float) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+
+    def _cache_key(self, key: str) -> str:
+        return f"{self.name}:{key}"
+
+    def _store(self, key: str, value: Optional[Row], generation: int) -> None:
+        """
+        Write `value` unless an invalidation happened since `generation`.
+        The shared-cache I/O runs outside the lock; a write that an
+        invalidation overtook is deleted again, so the next read reloads.
+        """
+        with self._lock:
+            if generation != self._invalidations:
+                return
+        cache_key = self._cache_key(key)
+        if value is None:
+            cache.delete(cache_key)
+        else:
+            cache.set(
+                cache_key,
+                {"row": value, "loaded_at": time.time()},
+                self.ttl_seconds + self.stale_seconds,
+            )
+        with self._lock:
+            raced = generation != self._invalidations
+        if raced:
+            cache.delete(cache_key)
+
+    def get(self, key: str) -> Optional[Row]:
+        key = str(key)
+        entry = cache.get(self._cache_key(key))
+        with self._lock:
+            if entry is not None:
+                age = time.time() - entry["loaded_at"]
+                if age < self.ttl_seconds:
+                    return entry["row"]
+                if age < self.ttl_seconds + self.stale_seconds:
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        _refresh_pool.submit(self._refresh, key, self._invalidations)
+                    return entry["row"]
+
+        return self._flights.do(key, lambda: self._load(key))
+
+    def _load(self, key: str) -> Optional[Row]:
+        with self._lock:
+            generation = self._invalidations
+        value = self._loader(key)
+        self._store(key, value, generation)
+        return value
+
+    def _refresh(self, key: str, generation: int) -> None:
+        try:
+            self._store(key, self._loader(key), generation)
+        except Exception as exc:
+            logger.warning("Background refresh of %s %s failed: %s", self.name, key, exc)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def set(self, key: str, value: Optional[Row]) -> None:
+        with self._lock:
+            self._invalidations += 1
+            generation = self._invalidations
+        self._store(str(key), value, generation)
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._invalidations += 1
+        cache.delete(self._cache_key(str(key)))
+
+
+def _load_row(table: str) -> Loader:
+    def load(key: str) -> Optional[Row]:
+        resp = get_supabase().table(table).select("*").eq("id", key).limit(1).execute()
+        rows = resp.data or []
+        return rows[0] if rows else None
+
+    return load
+
+
+venue_cache = EntityCache("venue", _load_row("venues"))
+user_cache = EntityCache("user", _load_row("users"))
+
+
+def init_entity_caches(app) -> None:
+    ttl = app.config.get("ENTITY_CACHE_TTL_SECONDS", 60)
+    stale = app.config.get("ENTITY_CACHE_STALE_SECONDS", 300)
+    for entity_cache in (venue_cache, user_cache):
+        entity_cache.configure(ttl, stale)
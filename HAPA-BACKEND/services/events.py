@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import deque
+from math import floor
+from typing import Any, Deque, Dict, Iterable, Iterator, Optional, Set
+
+# ~5.5 km at the equator; a subscriber listens to its cell and the 8 around it.
+CELL_DEG = 0.05
+
+
+def cell_for(lat: float, lng: float) -> str:
+    return f"{floor(lat / CELL_DEG)}:{floor(lng / CELL_DEG)}"
+
+
+def cells_around(lat: float, lng: float) -> Set[str]:
+    row, col = floor(lat / CELL_DEG), floor(lng / CELL_DEG)
+    return {f"{row + dr}:{col + dc}" for dr in (-1, 0, 1) for dc in (-1, 0, 1)}
+
+
+class Subscription:
+    """A bounded mailbox for one SSE client."""
+
+    def __init__(self, cells: Set[str], venue_ids: Set[str], max_pending: int) -> None:
+        self.cells = cells
+        self.venue_ids = venue_ids
+        self._queue: Deque[str] = deque(maxlen=max_pending)
+        self._ready = threading.Event()
+        self.dropped = 0
+
+    def push(self, message: str) -> None:
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+        self._queue.append(message)
+        self._ready.set()
+
+    def drain(self, timeout: float) -> Iterable[str]:
+        """Wait up to `timeout` for messages and return whatever is queued."""
+        if not self._queue:
+            self._ready.wait(timeout)
+        self._ready.clear()
+        messages = []
+        while self._queue:
+            messages.append(self._queue.popleft())
+        return messages
+
+
+class EventBroker:
+    """
+    In-process pub/sub for feed events (new_post, post_deleted, metrics_changed).
+
+    Subscribers are indexed by location cell and by venue id, so publishing
+    touches only the mailboxes that care about the event. Events are not
+    shared between worker processes.
+
+    An open stream occupies a worker thread (a greenlet under gevent, see
+    gunicorn.conf.py), so at most `max_streams` are open per worker; past
+    that `subscribe` refuses and the client is told to retry later.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._by_cell: Dict[str, Set[Subscription]] = {}
+        self._by_venue: Dict[str, Set[Subscription]] = {}
+        self._subscribers = 0
+        self.published = 0
+        self.rejected = 0
+        self.max_pending = 100
+        self.max_streams = 2
+
+    def init_app(self, app) -> None:
+        self.max_pending = app.config.get("SSE_MAX_PENDING_EVENTS", 100)
+        self.max_streams = app.config.get("SSE_MAX_STREAMS", 2)
+
+    def subscribe(self, cells: Set[str], venue_ids: Set[str]) -> Optional[Subscription]:
+        """A new mailbox, or None when this worker already holds `max_streams`."""
+        sub = Subscription(cells, venue_ids, self.max_pending)
+        with self._lock:
+            if self._subscribers >= self.max_streams:
+                self.rejected += 1
+                return None
+            for cell in cells:
+                self._by_cell.setdefault(cell, set()).add(sub)
+            for venue_id in venue_ids:
+                self._by_venue.setdefault(venue_id, set()).add(sub)
+            self._subscribers += 1
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            for index, keys in ((self._by_cell, sub.cells), (self._by_venue, sub.venue_ids)):
+                for key in keys:
+                    subs = index.get(key)
+                    if subs is None:
+                        continue
+                    subs.discard(sub)
+                    if not subs:
+                        del index[key]
+            self._subscribers -= 1
+
+    def publish(
+        self,
+        event: str,
+        data: Dict[str, Any],
+        venue_id: Optional[str] = None,
+        lat: Optional[float] = None,
+        lng: Optional[float] = None,
+    ) -> None:
+        message = f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+        with self._lock:
+            targets: Set[Subscription] = set()
+            if venue_id is not None:
+                targets |= self._by_venue.get(str(venue_id), set())
+            if lat is not None and lng is not None:
+                targets |= self._by_cell.get(cell_for(lat, lng), set())
+            self.published += 1
+        for sub in targets:
+            sub.push(message)
+
+    def stream(
+        self, sub: Subscription, heartbeat_seconds: float, max_seconds: float
+    ) -> Iterator[str]:
+        """SSE body: queued events, a comment line as heartbeat, then close."""
+        deadline = time.monotonic() + max_seconds
+        try:
+            yield "retry: 3000\n\n"
+            while time.monotonic() < deadline:
+                messages = sub.drain(heartbeat_seconds)
+                if messages:
+                    yield "".join(messages)
+                else:
+                    yield ": keepalive\n\n"
+        finally:
+            self.unsubscribe(sub)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "subscribers": self._subscribers,
+                "max_streams": self.max_streams,
+                "rejected": self.rejected,
+                "cells": len(self._by_cell),
+                "venues": len(self._by_venue),
+                "published": self.published,
+            }
+
+
+feed_events = EventBroker()
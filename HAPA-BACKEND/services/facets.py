@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Facet name -> venue column. `categories` is an array column, `type` a scalar.
+FACET_FIELDS = {"categories": "categories", "types": "type"}
+
+
+def _key(value: Any) -> str:
+    return str(value).strip().lower()
+
+
+def _values(venue: Dict[str, Any], column: str) -> List[Any]:
+    raw = venue.get(column)
+    if raw is None:
+        return []
+    return raw if isinstance(raw, list) else [raw]
+
+
+def _positions(mask: int) -> List[int]:
+    # One pass over the binary string; peeling bits off a big int is quadratic
+    return [i for i, bit in enumerate(reversed(bin(mask)[2:])) if bit == "1"]
+
+
+def _bitset(positions: List[int], size: int) -> int:
+    buf = bytearray((size + 7) // 8)
+    for i in positions:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, "little")
+
+
+class FacetIndex:
+    """
+    Inverted index of bitsets over a fixed list of venues.
+
+    Bit i stands for venues[i]. Every category and type value maps to an int
+    whose set bits are the venues carrying it, so filtering is OR within a
+    facet and AND across facets, and a facet count is one popcount. Venues
+    come back in the order the index was built with (snapshot ranking).
+    """
+
+    def __init__(self, venues: List[Dict[str, Any]]) -> None:
+        self.venues = venues
+        self.all = (1 << len(venues)) - 1
+        self._position = {str(v.get("id")): i for i, v in enumerate(venues)}
+        self._labels: Dict[str, Dict[str, str]] = {facet: {} for facet in FACET_FIELDS}
+        postings: Dict[str, Dict[str, List[int]]] = {facet: {} for facet in FACET_FIELDS}
+        for i, venue in enumerate(venues):
+            for facet, column in FACET_FIELDS.items():
+                for value in _values(venue, column):
+                    key = _key(value)
+                    if not key:
+                        continue
+                    positions = postings[facet].setdefault(key, [])
+                    if not positions or positions[-1] != i:
+                        positions.append(i)
+                    self._labels[facet].setdefault(key, str(value).strip())
+        self._bits: Dict[str, Dict[str, int]] = {
+            facet: {key: _bitset(positions, len(venues)) for key, positions in by_key.items()}
+            for facet, by_key in postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.venues)
+
+    def mask_for(self, venues: Iterable[Dict[str, Any]]) -> int:
+        """Bitset of the given rows (e.g. what survived text or open-hours filters)."""
+        positions = [self._position.get(str(venue.get("id"))) for venue in venues]
+        return _bitset([i for i in positions if i is not None], len(self.venues))
+
+    def _facet_mask(self, facet: str, selected: Iterable[str]) -> int:
+        keys = {_key(s) for s in selected if _key(s)}
+        if not keys:
+            return self.all
+        bits = self._bits[facet]
+        mask = 0
+        for key in keys:
+            mask |= bits.get(key, 0)
+        return mask
+
+    def search(
+        self,
+        selected: Dict[str, List[str]],
+        base: Optional[int] = None,
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, List[Dict[str, Any]]]]:
+        """
+        Venues matching every selected facet within `base`, plus facet counts.
+
+        Counts are disjunctive: a facet's counts apply the other facets'
+        selections but not its own, so the UI can show what picking another
+        value of the same facet would add.
+        """
+        base = self.all if base is None else base
+        masks = {facet: self._facet_mask(facet, selected.get(facet, [])) for facet in FACET_FIELDS}
+        matched = base
+        for mask in masks.values():
+            matched &= mask
+
+        counts: Dict[str, List[Dict[str, Any]]] = {}
+        for facet in FACET_FIELDS:
+            others = base
+            for other, mask in masks.items():
+                if other != facet:
+                    others &= mask
+            chosen = {_key(s) for s in selected.get(facet, [])}
+            values = []
+            for key, bits in self._bits[facet].items():
+                count = (bits & others).bit_count()
+                if count or key in chosen:
+                    values.append({"value": self._labels[facet][key], "count": count})
+            values.sort(key=lambda item: (-item["count"], item["value"].lower()))
+            counts[facet] = values
+
+        return [self.venues[i] for i in _positions(matched)], counts
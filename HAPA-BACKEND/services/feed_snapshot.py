@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from extensions import fetch_all, get_supabase
+from models.post import Post
+from models.venue import Venue
+from services.facets import FacetIndex
+
+logger = logging.getLogger(__name__)
+
+SnapshotKey = Tuple[str, Optional[str]]
+
+
+def parse_timestamp(value: Any) -> Optional[datetime]:
+    """Parse a Supabase ISO timestamp into an aware UTC datetime."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        try:
+            dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+@dataclass
+class CitySnapshot:
+    """Ranked venues and their active posts for one city (or city/area)."""
+
+    city: str
+    area: Optional[str]
+    built_at: float
+    # When the reads behind this snapshot started; rows changed later are not in it
+    as_of: Optional[datetime] = None
+    venues: List[Dict[str, Any]] = field(default_factory=list)
+    posts: List[Dict[str, Any]] = field(default_factory=list)
+    _facets: Optional[FacetIndex] = field(default=None, repr=False)
+
+    def age(self) -> float:
+        return time.monotonic() - self.built_at
+
+    def facet_index(self) -> FacetIndex:
+        """Category/type bitsets over `venues` (built with the snapshot)."""
+        if self._facets is None:
+            self._facets = FacetIndex(self.venues)
+        return self._facets
+
+    def posts_for(self, venue_ids: Iterable[str], limit: int = 100) -> List[Dict[str, Any]]:
+        """Active posts for the given venues, newest first (posts are stored pre-sorted)."""
+        wanted = {str(v) for v in venue_ids}
+        now = datetime.now(timezone.utc)
+        result: List[Dict[str, Any]] = []
+        for post in self.posts:
+            if str(post.get("venue_id")) not in wanted:
+                continue
+            expires_at = parse_timestamp(post.get("expires_at"))
+            if expires_at is not None and expires_at <= now:
+                continue
+            result.append(post)
+            if len(result) >= limit:
+                break
+        return result
+
+
+def _venue_score(venue_posts: List[Dict[str, Any]]) -> Tuple[int, int]:
+    engagement = 0
+    for post in venue_posts:
+        m = post.get("metrics") or {}
+        engagement += int(m.get("likes", 0) or 0) + int(m.get("views", 0) or 0)
+    return len(venue_posts), engagement
+
+
+def build_snapshots(
+    venues: List[Dict[str, Any]],
+    posts: List[Dict[str, Any]],
+    max_cities: int,
+    as_of: Optional[datetime] = None,
+) -> Dict[SnapshotKey, CitySnapshot]:
+    """
+    Group venues by city and area and rank them by live activity.
+
+    Only the `max_cities` cities with the most venues get a snapshot; every
+    other city keeps going through the live query path.
+    """
+    posts_by_venue: Dict[str, List[Dict[str, Any]]] = {}
+    for post in posts:
+        posts_by_venue.setdefault(str(post.get("venue_id")), []).append(post)
+
+    by_city: Dict[str, List[Dict[str, Any]]] = {}
+    for venue in venues:
+        city = venue.get("city")
+        if city:
+            by_city.setdefault(city, []).append(venue)
+
+    top_cities = sorted(by_city, key=lambda c: len(by_city[c]), reverse=True)[:max_cities]
+
+    built_at = time.monotonic()
+    snapshots: Dict[SnapshotKey, CitySnapshot] = {}
+
+    def make(city: str, area: Optional[str], group: List[Dict[str, Any]]) -> CitySnapshot:
+        ranked = sorted(
+            group,
+            key=lambda v: _venue_score(posts_by_venue.get(str(v["id"]), [])),
+            reverse=True,
+        )
+        group_posts: List[Dict[str, Any]] = []
+        for v in ranked:
+            group_posts.extend(posts_by_venue.get(str(v["id"]), []))
+        group_posts.sort(key=lambda p: p.get("created_at") or "", reverse=True)
+        # Facet bitsets are built here, off the request path
+        return CitySnapshot(
+            city=city,
+            area=area,
+            built_at=built_at,
+            as_of=as_of,
+            venues=ranked,
+            posts=group_posts,
+            _facets=FacetIndex(ranked),
+        )
+
+    for city in top_cities:
+        city_venues = by_city[city]
+        snapshots[(city, None)] = make(city, None, city_venues)
+
+        by_area: Dict[str, List[Dict[str, Any]]] = {}
+        for venue in city_venues:
+            area = venue.get("area")
+            if area:
+                by_area.setdefault(area, []).append(venue)
+        for area, area_venues in by_area.items():
+            snapshots[(city, area)] = make(city, area, area_venues)
+
+    return snapshots
+
+
+class FeedSnapshotStore:
+    """
+    In-memory per-city feed snapshots, rebuilt by a background thread.
+
+    The whole snapshot map is replaced by a single reference assignment, so
+    readers always see either the previous or the next complete build.
+    """
+
+    def __init__(self) -> None:
+        self._snapshots: Dict[SnapshotKey, CitySnapshot] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.interval_seconds = 60
+        self.max_age_seconds = 180
+        self.max_cities = 10
+
+    def init_app(self, app) -> None:
+        self.interval_seconds = app.config.get("FEED_SNAPSHOT_INTERVAL_SECONDS", 60)
+        self.max_age_seconds = app.config.get("FEED_SNAPSHOT_MAX_AGE_SECONDS", 180)
+        self.max_cities = app.config.get("FEED_SNAPSHOT_MAX_CITIES", 10)
+        if app.config.get("FEED_SNAPSHOT_ENABLED", False):
+            self.start()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="feed-snapshot-refresher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as exc:
+                logger.warning("Feed snapshot refresh failed: %s", exc)
+            self._stop.wait(self.interval_seconds)
+
+    def refresh(self) -> None:
+        supabase = get_supabase()
+        as_of = datetime.now(timezone.utc)
+        # Paged: a single select stops at PostgREST's max_rows
+        venue_rows = fetch_all(lambda: supabase.table("venues").select("*"))
+        now = datetime.utcnow().isoformat()
+        post_rows = fetch_all(
+            lambda: supabase.table("posts").select("*").gt("expires_at", now)
+        )
+        # Slotted records: the snapshot holds every venue and live post in memory
+        snapshots = build_snapshots(
+            [Venue.from_row(row) for row in venue_rows],
+            [Post.from_row(row) for row in post_rows],
+            self.max_cities,
+            as_of,
+        )
+        self._snapshots = snapshots
+        logger.info("Feed snapshots rebuilt for %d city/area keys", len(snapshots))
+
+    def get(self, city: str, area: Optional[str] = None) -> Optional[CitySnapshot]:
+        """
+        Return the snapshot for `city` (and optionally `area`), or None when
+        there is none yet or it is older than the staleness bound.
+        """
+        snapshot = self._snapshots.get((city, area or None))
+        if snapshot is None or snapshot.age() > self.max_age_seconds:
+            return None
+        return snapshot
+
+
+feed_snapshots = FeedSnapshotStore()
@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+import csv
+import logging
+import re
+import threading
+import time
+import unicodedata
+from math import log1p
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from extensions import fetch_all, get_supabase
+from services.geofence import haversine_m
+
+logger = logging.getLogger(__name__)
+
+# Candidates kept per trie node; ranking with location bias only looks at these.
+NODE_CANDIDATES = 32
+KIND_WEIGHT = {"city": 1.0, "area": 0.6, "place": 0.4, "address": 0.0}
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and punctuation: 'Kisémenti-Rd.' -> 'kisementi rd'."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _NON_WORD.sub(" ", stripped.lower()).strip()
+
+
+class Place:
+    __slots__ = ("name", "kind", "city", "context", "lat", "lng", "popularity", "key")
+
+    def __init__(
+        self,
+        name: str,
+        kind: str,
+        city: str,
+        context: str,
+        lat: Optional[float],
+        lng: Optional[float],
+        popularity: float,
+    ) -> None:
+        self.name = name
+        self.kind = kind
+        self.city = city  # "" for cities themselves
+        self.context = context  # e.g. "Kololo, Kampala" shown as the address line
+        self.lat = lat
+        self.lng = lng
+        self.popularity = popularity
+        self.key = normalize(name)
+
+    def to_suggestion(self) -> Dict[str, Any]:
+        # Same shape as GoogleMapsClient.search_places results
+        return {
+            "id": f"local:{self.kind}:{normalize(self.context).replace(' ', '-')}",
+            "name": self.name,
+            "address": self.context,
+            "lat": self.lat,
+            "lng": self.lng,
+        }
+
+
+class _Node:
+    __slots__ = ("children", "places")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_Node"] = {}
+        self.places: List[int] = []
+
+
+class PrefixIndex:
+    """
+    Character trie over place names. Every word start of a name is inserted,
+    so "hill" finds "Kololo Hill". Places are inserted most popular first and
+    each node keeps the first NODE_CANDIDATES, so a lookup is one walk down
+    the prefix plus a rerank of at most that many places.
+    """
+
+    def __init__(self, places: List[Place]) -> None:
+        self.places = sorted(places, key=lambda p: p.popularity, reverse=True)
+        self._root = _Node()
+        for i, place in enumerate(self.places):
+            words = place.key.split()
+            for start in range(len(words)):
+                if start and len(words[start]) < 3:
+                    continue  # "rd", "12" etc. are not useful entry points
+                self._insert(" ".join(words[start:]), i)
+
+    def __len__(self) -> int:
+        return len(self.places)
+
+    def _insert(self, key: str, idx: int) -> None:
+        node = self._root
+        for ch in key:
+            node = node.children.setdefault(ch, _Node())
+            if len(node.places) < NODE_CANDIDATES and (not node.places or node.places[-1] != idx):
+                node.places.append(idx)
+
+    def candidates(self, prefix: str) -> List[Place]:
+        node = self._root
+        for ch in prefix:
+            node = node.children.get(ch)
+            if node is None:
+                return []
+        return [self.places[i] for i in node.places]
+
+    def search(
+        self,
+        query: str,
+        lat: Optional[float] = None,
+        lng: Optional[float] = None,
+        limit: int = 5,
+    ) -> List[Place]:
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        scored: List[Tuple[float, Place]] = []
+        for place in self.candidates(prefix):
+            score = log1p(place.popularity) + KIND_WEIGHT.get(place.kind, 0.0)
+            if place.key == prefix:
+                score += 2.0
+            elif place.key.startswith(prefix):
+                score += 1.0
+            if lat is not None and lng is not None and place.lat is not None and place.lng is not None:
+                km = haversine_m(lat, lng, place.lat, place.lng) / 1000.0
+                score -= log1p(km / 10.0)
+            scored.append((score, place))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [place for _, place in scored[:limit]]
+
+
+def load_place_list(path: str) -> List[Place]:
+    """
+    Read an importable place list: CSV with columns
+    name, kind, city, country, lat, lng, popularity.
+    """
+    places: List[Place] = []
+    try:
+        with open(path, newline="", encoding="utf-8") as fh:
+            for row in csv.DictReader(fh):
+                name = (row.get("name") or "").strip()
+                if not name:
+                    continue
+                context = ", ".join(
+                    part for part in (name, row.get("city"), row.get("country")) if part
+                )
+                kind = (row.get("kind") or "place").strip()
+                places.append(
+                    Place(
+                        name=name,
+                        kind=kind,
+                        city="" if kind == "city" else (row.get("city") or "").strip(),
+                        context=context,
+                        lat=float(row["lat"]) if row.get("lat") else None,
+                        lng=float(row["lng"]) if row.get("lng") else None,
+                        popularity=float(row.get("popularity") or 0),
+                    )
+                )
+    except FileNotFoundError:
+        logger.warning("Gazetteer place list %s not found", path)
+    return places
+
+
+def places_from_venues(venues: Iterable[Dict[str, Any]]) -> List[Place]:
+    """Cities, areas and addresses of our venues; popularity is the venue count."""
+    groups: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+
+    def add(kind: str, name: Optional[str], city: str, venue: Dict[str, Any]) -> None:
+        if not name or not name.strip():
+            return
+        key = (kind, normalize(name), normalize(city))
+        group = groups.setdefault(
+            key, {"name": name.strip(), "city": city, "count": 0, "lat": 0.0, "lng": 0.0, "located": 0}
+        )
+        group["count"] += 1
+        if venue.get("lat") is not None and venue.get("lng") is not None:
+            group["lat"] += float(venue["lat"])
+            group["lng"] += float(venue["lng"])
+            group["located"] += 1
+
+    for venue in venues:
+        city = (venue.get("city") or "").strip()
+        area = (venue.get("area") or "").strip()
+        add("city", city, "", venue)
+        add("area", area, city, venue)
+        add("address", venue.get("address"), city, venue)
+
+    places = []
+    for (kind, _, _), g in groups.items():
+        located = g["located"]
+        places.append(
+            Place(
+                name=g["name"],
+                kind=kind,
+                city=g["city"],
+                context=", ".join(p for p in (g["name"], g["city"]) if p),
+                lat=g["lat"] / located if located else None,
+                lng=g["lng"] / located if located else None,
+                popularity=g["count"],
+            )
+        )
+    return places
+
+
+def _merge(imported: List[Place], local: List[Place]) -> List[Place]:
+    """Venue-derived places win over imported ones with the same name and city;
+    their popularities add up."""
+    merged: Dict[Tuple[str, str], Place] = {}
+    for place in imported + local:
+        key = (place.key, normalize(place.city))
+        existing = merged.get(key)
+        if existing is None:
+            merged[key] = place
+            continue
+        place.popularity += existing.popularity
+        if place.lat is None:
+            place.lat, place.lng = existing.lat, existing.lng
+        merged[key] = place
+    return list(merged.values())
+
+
+class Gazetteer:
+    """
+    Local suggestions for /api/locations/suggest.
+
+    Built from the importable place list (GAZETTEER_PLACES_PATH) plus the
+    cities, areas and addresses of our venues. The first lookup builds the
+    index; afterwards it is rebuilt in the background every `ttl_seconds`
+    while lookups keep using the previous one. If the first build fails,
+    lookups fall back to the Places API for `retry_seconds` before the next
+    attempt.
+    """
+
+    def __init__(self) -> None:
+        self._index: Optional[PrefixIndex] = None
+        self._built_at = 0.0
+        self._failed_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._rebuilding = False
+        self.places_path = ""
+        self.ttl_seconds = 3600
+        self.retry_seconds = 60.0
+        self.local_hits = 0
+        self.fallbacks = 0
+
+    def init_app(self, app) -> None:
+        self.places_path = app.config.get("GAZETTEER_PLACES_PATH", "")
+        self.ttl_seconds = app.config.get("GAZETTEER_TTL_SECONDS", 3600)
+
+    def _build(self) -> PrefixIndex:
+        imported = load_place_list(self.places_path) if self.places_path else []
+        supabase = get_supabase()
+        # Paged: a single select stops at PostgREST's max_rows
+        rows = fetch_all(
+            lambda: supabase.table("venues").select("id, city, area, address, lat, lng"),
+            key="id",
+        )
+        index = PrefixIndex(_merge(imported, places_from_venues(rows)))
+        logger.info("Gazetteer built with %d places", len(index))
+        return index
+
+    def _rebuild_in_background(self) -> None:
+        try:
+            index = self._build()
+            self._index, self._built_at = index, time.monotonic()
+        except Exception as exc:
+            logger.warning("Gazetteer rebuild failed: %s", exc)
+            self._built_at = time.monotonic()
+        finally:
+            self._rebuilding = False
+
+    def _current(self) -> PrefixIndex:
+        index = self._index
+        if index is None:
+            with self._lock:
+                if self._index is not None:
+                    return self._index
+                if self._failed_at is not None and time.monotonic() - self._failed_at < self.retry_seconds:
+                    return PrefixIndex([])  # Places API fallback until the retry
+                try:
+                    self._index, self._built_at = self._build(), time.monotonic()
+                except Exception:
+                    self._failed_at = time.monotonic()
+                    raise
+                return self._index
+        if time.monotonic() - self._built_at >= self.ttl_seconds:
+            with self._lock:
+                start = not self._rebuilding
+                self._rebuilding = True
+            if start:
+                threading.Thread(
+                    target=self._rebuild_in_background, name="gazetteer-rebuild", daemon=True
+                ).start()
+        return index
+
+    def suggest(
+        self,
+        query: str,
+        lat: Optional[float] = None,
+        lng: Optional[float] = None,
+        limit: int = 5,
+    ) -> List[Dict[str, Any]]:
+        """Local matches for a prefix query; empty when the gazetteer has none."""
+        places = self._current().search(query, lat, lng, limit)
+        if places:
+            self.local_hits += 1
+        else:
+            self.fallbacks += 1
+        return [place.to_suggestion() for place in places]
+
+    def stats(self) -> Dict[str, Any]:
+        index = self._index
+        return {
+            "places": len(index) if index is not None else 0,
+            "local_hits": self.local_hits,
+            "fallbacks": self.fallbacks,
+        }
+
+
+gazetteer = Gazetteer()
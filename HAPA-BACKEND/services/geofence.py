@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from math import asin, ceil, cos, floor, radians, sin, sqrt
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from extensions import fetch_all, get_supabase
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEGREE_LAT = 111320.0
+
+Cell = Tuple[int, int]
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance in meters."""
+    d_lat = radians(lat2 - lat1)
+    d_lng = radians(lng2 - lng1)
+    a = sin(d_lat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(d_lng / 2) ** 2
+    return 2 * EARTH_RADIUS_M * asin(sqrt(a))
+
+
+class GeofenceIndex:
+    """
+    Uniform lat/lng grid over venue locations.
+
+    Cells are as tall as the geofence radius, so a ping only has to look at
+    its own cell row plus one row either side, and a handful of columns
+    (more near the poles, where degrees of longitude get short). Lookup cost
+    depends on local venue density, not on the total number of venues.
+    """
+
+    def __init__(self, radius_m: float = 75.0) -> None:
+        self.radius_m = radius_m
+        self.cell_deg = radius_m / METERS_PER_DEGREE_LAT
+        self._cells: Dict[Cell, List[Tuple[str, float, float]]] = {}
+
+    def _cell(self, lat: float, lng: float) -> Cell:
+        return floor(lat / self.cell_deg), floor(lng / self.cell_deg)
+
+    def build(self, venues: List[Dict[str, Any]]) -> None:
+        cells: Dict[Cell, List[Tuple[str, float, float]]] = {}
+        for venue in venues:
+            v_lat = venue.get("lat")
+            v_lng = venue.get("lng")
+            if v_lat is None or v_lng is None:
+                continue
+            entry = (str(venue["id"]), float(v_lat), float(v_lng))
+            cells.setdefault(self._cell(entry[1], entry[2]), []).append(entry)
+        self._cells = cells
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._cells.values())
+
+    def match(self, lat: float, lng: float) -> List[str]:
+        """Venue ids whose geofence contains the point."""
+        row, col = self._cell(lat, lng)
+        lng_scale = max(cos(radians(lat)), 0.01)
+        col_span = ceil(1 / lng_scale)
+
+        cells = self._cells
+        hits: List[str] = []
+        for d_row in (-1, 0, 1):
+            for d_col in range(-col_span, col_span + 1):
+                for venue_id, v_lat, v_lng in cells.get((row + d_row, col + d_col), ()):
+                    if haversine_m(lat, lng, v_lat, v_lng) <= self.radius_m:
+                        hits.append(venue_id)
+        return hits
+
+
+class VenueGeofences:
+    """
+    Geofence index over all venues with coordinates. The first lookup builds
+    it; afterwards it is rebuilt in the background every `ttl_seconds` while
+    lookups keep using the previous one. After a failed first build, lookups
+    see an empty index for `retry_seconds` instead of each retrying the scan.
+    """
+
+    def __init__(self) -> None:
+        self._index: Optional[GeofenceIndex] = None
+        self._built_at = 0.0
+        self._failed_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._rebuilding = False
+        self.radius_m = 75.0
+        self.ttl_seconds = 300
+        self.retry_seconds = 30.0
+
+    def init_app(self, app) -> None:
+        self.radius_m = app.config.get("WALKIN_GEOFENCE_RADIUS_M", 75.0)
+        self.ttl_seconds = app.config.get("WALKIN_GEOFENCE_TTL_SECONDS", 300)
+
+    def _build(self) -> GeofenceIndex:
+        supabase = get_supabase()
+        # Paged: a single select stops at PostgREST's max_rows
+        rows = fetch_all(lambda: supabase.table("venues").select("id, lat, lng"))
+        fresh = GeofenceIndex(self.radius_m)
+        fresh.build(rows)
+        logger.info("Geofence index rebuilt with %d venues", len(fresh))
+        return fresh
+
+    def _rebuild_in_background(self) -> None:
+        try:
+            index = self._build()
+            self._index, self._built_at = index, time.monotonic()
+        except Exception as exc:
+            logger.warning("Geofence rebuild failed: %s", exc)
+            self._built_at = time.monotonic()
+        finally:
+            self._rebuilding = False
+
+    def _current(self) -> GeofenceIndex:
+        index = self._index
+        if index is None:
+            with self._lock:
+                if self._index is not None:
+                    return self._index
+                if self._failed_at is not None and time.monotonic() - self._failed_at < self.retry_seconds:
+                    return GeofenceIndex(self.radius_m)
+                try:
+                    self._index, self._built_at = self._build(), time.monotonic()
+                except Exception:
+                    self._failed_at = time.monotonic()
+                    raise
+                return self._index
+        if time.monotonic() - self._built_at >= self.ttl_seconds:
+            with self._lock:
+                start = not self._rebuilding
+                self._rebuilding = True
+            if start:
+                threading.Thread(
+                    target=self._rebuild_in_background, name="geofence-rebuild", daemon=True
+                ).start()
+        return index
+
+    def dwelled_venues(
+        self,
+        pings: List[Tuple[float, float, float]],
+        min_pings: int = 2,
+        min_seconds: float = 300.0,
+    ) -> Set[str]:
+        """
+        Venue ids the (lat, lng, epoch seconds) pings stayed inside: at least
+        `min_pings` pings within the geofence, first to last `min_seconds` apart.
+        """
+        index = self._current()
+        seen: Dict[str, List[float]] = {}
+        for lat, lng, at in pings:
+            for venue_id in index.match(lat, lng):
+                seen.setdefault(venue_id, []).append(at)
+        return {
+            venue_id
+            for venue_id, times in seen.items()
+            if len(times) >= min_pings and max(times) - min(times) >= min_seconds
+        }
+
+
+venue_geofences = VenueGeofences()
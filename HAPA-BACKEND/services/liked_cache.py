@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Set
+
+from extensions import cache, get_supabase
+from models.post import POST_TTL_HOURS
+
+
+class LikedPostsCache:
+    """
+    Per-user set of liked post ids, used to annotate `is_liked`.
+
+    A post lives for POST_TTL_HOURS, so any like on a still-active post is
+    younger than that; each user's set is loaded with one query over that
+    window and kept in the shared cache tier as {post_id: liked_at epoch},
+    so every worker on the host reads the same copy. A toggle deletes the
+    user's entry there and the next read reloads it; other workers can keep
+    their local copy for up to CACHE_LOCAL_TTL_SECONDS. Entries also expire
+    after `ttl_seconds` to pick up likes made through the Edge Functions.
+    """
+
+    def __init__(self) -> None:
+        self.ttl_seconds = 300
+        self.window_seconds = POST_TTL_HOURS * 3600
+
+    def init_app(self, app) -> None:
+        self.ttl_seconds = app.config.get("LIKED_CACHE_TTL_SECONDS", 300)
+
+    @staticmethod
+    def _cache_key(user_id: str) -> str:
+        return f"liked:{user_id}"
+
+    def _load(self, user_id: str) -> Dict[str, float]:
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.window_seconds)
+        resp = (
+            get_supabase()
+            .table("post_likes")
+            .select("post_id, created_at")
+            .eq("user_id", user_id)
+            .gte("created_at", cutoff.isoformat())
+            .execute()
+        )
+        liked_at: Dict[str, float] = {}
+        for row in resp.data or []:
+            created = row.get("created_at")
+            try:
+                ts = datetime.fromisoformat(str(created).replace("Z", "+00:00")).timestamp()
+            except ValueError:
+                ts = time.time()
+            liked_at[str(row["post_id"])] = ts
+        return liked_at
+
+    def liked_ids(self, user_id: str) -> Set[str]:
+        """Ids of active posts the user has liked."""
+        key = self._cache_key(str(user_id))
+        liked_at = cache.get(key)
+        if liked_at is None:
+            liked_at = self._load(str(user_id))
+            cache.set(key, liked_at, self.ttl_seconds)
+        # Cached values are shared between requests: filter, don't prune in place
+        cutoff = time.time() - self.window_seconds
+        return {pid for pid, ts in liked_at.items() if ts >= cutoff}
+
+    def invalidate(self, user_id: str) -> None:
+        """
+        Call after a successful toggle. The toggle is already committed, so
+        dropping the cached set is enough for every worker to reload it.
+        """
+        cache.delete(self._cache_key(str(user_id)))
+
+
+liked_posts = LikedPostsCache()
@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from flask import copy_current_request_context, current_app, g, jsonify, request
+
+logger = logging.getLogger(__name__)
+
+CRITICAL = "critical"    # auth flow: only shed at the hard ceiling
+NORMAL = "normal"        # feed, posts, venues (default for untagged routes)
+ANALYTICS = "analytics"  # fire-and-forget counters: deferred or shed first
+STREAM = "stream"        # long-lived responses: counted while open, kept out of latency
+PRIORITIES = (CRITICAL, NORMAL, ANALYTICS, STREAM)
+
+DEFERRED_ENVIRON_KEY = "hapa.deferred"
+
+
+def priority(level: str) -> Callable:
+    """Tag a view with its load-shedding class. Place it right under @bp.route."""
+    if level not in PRIORITIES:
+        raise ValueError(f"Unknown priority: {level}")
+
+    def decorator(fn):
+        fn.shed_priority = level
+        return fn
+
+    return decorator
+
+
+def _queue_latency_ms() -> Optional[float]:
+    """
+    Time the request waited before reaching the worker, from the proxy's
+    X-Request-Start header ("t=<microseconds>" or epoch milliseconds).
+    """
+    raw = request.headers.get("X-Request-Start")
+    if not raw:
+        return None
+    raw = raw.strip()
+    if raw.startswith("t="):
+        raw = raw[2:]
+    try:
+        value = float(raw)
+    except ValueError:
+        return None
+    if value > 1e14:  # microseconds
+        value /= 1000.0
+    elif value < 1e11:  # seconds
+        value *= 1000.0
+    return max(0.0, time.time() * 1000.0 - value)
+
+
+class AdaptiveLimiter:
+    """
+    Gradient concurrency limit with per-class admission.
+
+    The limit tracks how much concurrency the worker can take before latency
+    rises: each finished request is compared with the best recent latency of
+    its endpoint, the smoothed ratio (the gradient) scales the limit, and
+    sqrt(limit) of headroom lets it probe upwards while the worker is busy.
+    Queue latency above target shrinks it too.
+
+    The limit stays between `min_limit` and `max_limit`, both derived from
+    what one worker runs at once (threads, or gevent connections); a limit
+    above that could never be reached, so nothing would be shed.
+
+    Classes are admitted against different fractions of the limit: analytics
+    only up to `analytics_share` of it, normal and stream up to the limit,
+    critical up to `critical_headroom` times the limit. Analytics calls over
+    their share are deferred to a small background pool and answered 202;
+    when that is full they, like the other classes, get a fast 503.
+
+    Streams (SSE, exports) hold a thread for as long as they are open, so
+    they count as in flight until the response closes, but their duration
+    never moves the limit.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._deferred_pool: Optional[ThreadPoolExecutor] = None
+        self.enabled = True
+        self.min_limit = 2
+        self.max_limit = 8
+        self.limit = 8.0
+        self.analytics_share = 0.5
+        self.critical_headroom = 1.5
+        self.queue_target_ms = 100.0
+        self.defer_max = 1000
+        self.defer_max_wait_seconds = 30.0
+        self.in_flight = 0
+        self.deferred_pending = 0
+        self._gradient = 1.0
+        self._baselines: Dict[str, Tuple[float, float]] = {}  # endpoint -> (min ms, since)
+        self.baseline_window_seconds = 60.0
+        self.counts: Dict[str, Dict[str, int]] = {
+            level: {"admitted": 0, "deferred": 0, "shed": 0}
+            for level in PRIORITIES
+        }
+
+    def init_app(self, app) -> None:
+        from extensions import limiter
+
+        self.enabled = app.config.get("LOAD_SHED_ENABLED", True)
+        self.max_limit = max(1, app.config.get("LOAD_SHED_MAX_LIMIT", 8))
+        self.min_limit = max(
+            1, math.ceil(self.max_limit * app.config.get("LOAD_SHED_MIN_FRACTION", 0.25))
+        )
+        self.limit = float(
+            max(self.min_limit, min(self.max_limit, app.config.get("LOAD_SHED_INITIAL_LIMIT", 8)))
+        )
+        self.analytics_share = app.config.get("LOAD_SHED_ANALYTICS_SHARE", 0.5)
+        self.queue_target_ms = app.config.get("LOAD_SHED_QUEUE_TARGET_MS", 100)
+        self.defer_max = app.config.get("LOAD_SHED_DEFER_MAX", 1000)
+        self._deferred_pool = ThreadPoolExecutor(
+            max_workers=app.config.get("LOAD_SHED_DEFER_WORKERS", 2),
+            thread_name_prefix="deferred-analytics",
+        )
+        if not self.enabled:
+            return
+
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+        # A deferred replay was already counted when it first arrived.
+        limiter.request_filter(lambda: bool(request.environ.get(DEFERRED_ENVIRON_KEY)))
+
+    # ── Limit maintenance ──────────────────────────────────────────────────
+
+    def _observe(self, endpoint: str, latency_ms: float) -> None:
+        # Caller holds the lock.
+        now = time.monotonic()
+        baseline = self._baselines.get(endpoint)
+        if (
+            baseline is None
+            or latency_ms < baseline[0]
+            or now - baseline[1] > self.baseline_window_seconds
+        ):
+            # Re-baseline now and then so a lasting slowdown is not read as overload.
+            baseline = self._baselines[endpoint] = (latency_ms, now)
+        ratio = max(0.5, min(1.0, baseline[0] / max(latency_ms, 1e-3)))
+        self._gradient = 0.9 * self._gradient + 0.1 * ratio
+        target = self.limit * self._gradient + math.sqrt(self.limit)
+        if self.in_flight * 2 < self.limit:
+            # Mostly idle: low latency says nothing about a higher limit.
+            target = min(target, self.limit)
+        self.limit = max(self.min_limit, min(self.max_limit, 0.8 * self.limit + 0.2 * target))
+
+    def _ceiling(self, level: str) -> float:
+        if level == ANALYTICS:
+            return self.limit * self.analytics_share
+        if level == CRITICAL:
+            return self.limit * self.critical_headroom
+        return self.limit
+
+    # ── Request hooks ──────────────────────────────────────────────────────
+
+    def _level(self) -> str:
+        view = current_app.view_functions.get(request.endpoint or "")
+        return getattr(view, "shed_priority", NORMAL)
+
+    def _before_request(self):
+        if request.environ.get(DEFERRED_ENVIRON_KEY) or request.endpoint is None:
+            return None
+
+        level = self._level()
+        queue_ms = _queue_latency_ms()
+        with self._lock:
+            if queue_ms is not None and queue_ms > self.queue_target_ms:
+                self.limit = max(self.min_limit, self.limit * 0.9)
+            congested = queue_ms is not None and queue_ms > 2 * self.queue_target_ms
+            if self.in_flight < self._ceiling(level) and not (congested and level == ANALYTICS):
+                self.in_flight += 1
+                self.counts[level]["admitted"] += 1
+                g.shed_started = time.monotonic()
+                g.shed_level = level
+                return None
+            defer = level == ANALYTICS and self.deferred_pending < self.defer_max
+            if defer:
+                self.deferred_pending += 1
+            self.counts[level]["deferred" if defer else "shed"] += 1
+
+        if defer:
+            self._defer()
+            return jsonify({"success": True, "deferred": True}), 202
+        resp = jsonify({"error": "Server busy, try again shortly"})
+        resp.headers["Retry-After"] = "1"
+        return resp, 503
+
+    def _teardown_request(self, exc: Optional[BaseException]) -> None:
+        started = g.pop("shed_started", None)
+        if started is None:
+            return
+        latency_ms = (time.monotonic() - started) * 1000.0
+        with self._lock:
+            self.in_flight -= 1
+            if g.pop("shed_level", NORMAL) != STREAM:
+                self._observe(request.endpoint or "", latency_ms)
+
+    # ── Deferred analytics ─────────────────────────────────────────────────
+
+    def _defer(self) -> None:
+        request.environ[DEFERRED_ENVIRON_KEY] = True
+        request.get_data()  # buffer the body; the socket is gone by replay time
+        endpoint, view_args = request.endpoint, dict(request.view_args or {})
+        deadline = time.monotonic() + self.defer_max_wait_seconds
+
+        @copy_current_request_context
+        def replay() -> None:
+            try:
+                # Wait for analytics headroom, but do not hold work forever.
+                while time.monotonic() < deadline:
+                    with self._lock:
+                        if self.in_flight < self._ceiling(ANALYTICS):
+                            break
+                    time.sleep(0.05)
+                current_app.view_functions[endpoint](**view_args)
+            except Exception as exc:
+                logger.warning("Deferred %s failed: %s", endpoint, exc)
+            finally:
+                with self._lock:
+                    self.deferred_pending -= 1
+
+        self._deferred_pool.submit(replay)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "limit": round(self.limit, 1),
+                "in_flight": self.in_flight,
+                "deferred_pending": self.deferred_pending,
+                "gradient": round(self._gradient, 3),
+                "classes": {level: dict(c) for level, c in self.counts.items()},
+            }
+
+
+load_shedder = AdaptiveLimiter()
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from extensions import get_supabase
+
+logger = logging.getLogger(__name__)
+
+
+class LastLoginBuffer:
+    """
+    Coalesces `users.last_login_at` writes.
+
+    Logins only record the timestamp in memory; a background thread flushes
+    the latest timestamp per user every `flush_seconds` through the
+    `touch_last_logins` RPC (one round trip per batch). A failed batch is
+    merged back and retried on the next tick.
+    """
+
+    def __init__(self) -> None:
+        self._pending: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.flush_seconds = 5.0
+
+    def init_app(self, app) -> None:
+        self.flush_seconds = app.config.get("LAST_LOGIN_FLUSH_SECONDS", 5.0)
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name="last-login-flusher", daemon=True
+            )
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def touch(self, user_id: str, when: Optional[datetime] = None) -> None:
+        when = when or datetime.now(timezone.utc)
+        user_id = str(user_id)
+        with self._lock:
+            current = self._pending.get(user_id)
+            if current is None or when > current:
+                self._pending[user_id] = when
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_seconds):
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        entries = [
+            {"id": user_id, "last_login_at": when.isoformat()}
+            for user_id, when in batch.items()
+        ]
+        try:
+            get_supabase().rpc("touch_last_logins", {"p_entries": entries}).execute()
+        except Exception as exc:
+            logger.warning("Flushing %d last-login timestamps failed: %s", len(entries), exc)
+            for user_id, when in batch.items():
+                self.touch(user_id, when)
+
+
+last_logins = LastLoginBuffer()
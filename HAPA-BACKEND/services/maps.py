@@ -6,36 +6,70 @@ from typing import Any, Dict, List, Optional
 
 import requests
 
+from extensions import cache
+from services.resilience import CircuitOpenError, hedged, maps_breaker
+
 GOOGLE_GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
 GOOGLE_PLACES_TEXT_URL = "https://maps.googleapis.com/maps/api/place/textsearch/json"
 
+# Geocodes and place searches change rarely; share them across workers.
+MAPS_CACHE_TTL_SECONDS = 6 * 3600
+
+# Statuses that mean Google itself is struggling (not "no results").
+PROVIDER_FAILURE_STATUSES = {"OVER_QUERY_LIMIT", "UNKNOWN_ERROR"}
+
 logger = logging.getLogger(__name__)
 
 
 class GoogleMapsClient:
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key or os.getenv("GOOGLE_MAPS_API_KEY", "")
+        self.timeout_seconds = float(os.getenv("MAPS_TIMEOUT_SECONDS", "4"))
+        # 0 disables hedging; otherwise a second identical request is sent
+        # when the first has not answered within this many milliseconds.
+        self.hedge_delay_seconds = float(os.getenv("MAPS_HEDGE_DELAY_MS", "0")) / 1000.0
+
+    def _get_json(self, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """GET through the Maps circuit breaker, hedged when enabled."""
+
+        def attempt() -> Dict[str, Any]:
+            resp = requests.get(url, params=params, timeout=self.timeout_seconds)
+            resp.raise_for_status()
+            data = resp.json()
+            if data.get("status") in PROVIDER_FAILURE_STATUSES:
+                raise RuntimeError(f"Google Maps status {data.get('status')}")
+            return data
+
+        return maps_breaker.call(hedged, attempt, self.hedge_delay_seconds)
 
     def geocode_address(self, address: str) -> Optional[Dict[str, Any]]:
         if not self.api_key:
             return None
 
+        cache_key = f"geocode:{address.strip().lower()}"
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         params = {
             "address": address,
             "key": self.api_key,
         }
-        resp = requests.get(GOOGLE_GEOCODE_URL, params=params, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
+        try:
+            data = self._get_json(GOOGLE_GEOCODE_URL, params)
+        except CircuitOpenError:
+            return None
         if data.get("status") != "OK" or not data.get("results"):
             return None
         result = data["results"][0]
         loc = result["geometry"]["location"]
-        return {
+        geocoded = {
             "lat": loc["lat"],
             "lng": loc["lng"],
             "formatted_address": result.get("formatted_address"),
         }
+        cache.set(cache_key, geocoded, MAPS_CACHE_TTL_SECONDS)
+        return geocoded
 
     def search_places(
         self,
@@ -52,6 +86,13 @@ class GoogleMapsClient:
             logger.warning("GoogleMapsClient.search_places called without API key configured.")
             return []
 
+        # ~1 km location buckets keep nearby users on the same cache entry
+        bias = f"{round(lat, 2)},{round(lng, 2)}" if lat is not None and lng is not None else ""
+        cache_key = f"places:{query.strip().lower()}:{bias}:{limit}"
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         params: Dict[str, Any] = {
             "query": query,
             "key": self.api_key,
@@ -61,9 +102,9 @@ class GoogleMapsClient:
             params["radius"] = 5000
 
         try:
-            resp = requests.get(GOOGLE_PLACES_TEXT_URL, params=params, timeout=15)
-            resp.raise_for_status()
-            data = resp.json()
+            data = self._get_json(GOOGLE_PLACES_TEXT_URL, params)
+        except CircuitOpenError:
+            return []
         except Exception as exc:  # network / HTTP errors
             logger.warning("Error calling Google Places Text Search: %s", exc)
             return []
@@ -90,5 +131,6 @@ class GoogleMapsClient:
                 }
             )
 
+        cache.set(cache_key, suggestions, MAPS_CACHE_TTL_SECONDS)
         return suggestions
 
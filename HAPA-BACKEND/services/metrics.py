@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import hmac
+from typing import Any, Callable, Dict
+
+from flask import current_app, request
+
+MetricsProvider = Callable[[], Dict[str, Any]]
+
+_providers: Dict[str, MetricsProvider] = {}
+
+
+def register_metrics(name: str, provider: MetricsProvider) -> None:
+    """Register a callable whose dict is reported under `name` by /api/metrics."""
+    _providers[name] = provider
+
+
+def collect_metrics() -> Dict[str, Any]:
+    snapshot: Dict[str, Any] = {}
+    for name, provider in _providers.items():
+        try:
+            snapshot[name] = provider()
+        except Exception as exc:  # a broken provider must not hide the others
+            snapshot[name] = {"error": str(exc)}
+    return snapshot
+
+
+def admin_token_ok() -> bool:
+    """
+    True when the X-Admin-Token header matches ADMIN_API_TOKEN. Without a
+    token the admin endpoints are closed, except in debug mode.
+    """
+    expected = current_app.config.get("ADMIN_API_TOKEN", "")
+    if not expected:
+        return current_app.debug
+    supplied = request.headers.get("X-Admin-Token", "")
+    return hmac.compare_digest(supplied, expected)
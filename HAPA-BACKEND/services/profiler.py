@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import hmac
+import itertools
+import logging
+import os
+import random
+import sys
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from flask import current_app, g, request
+
+logger = logging.getLogger(__name__)
+
+MAX_STACK_DEPTH = 64
+
+try:  # Under the gevent worker the sampler must be a real OS thread.
+    import greenlet
+    from gevent import monkey as _gevent_monkey
+
+    _GEVENT = _gevent_monkey.is_module_patched("threading")
+except ImportError:  # pragma: no cover - gevent is optional outside gunicorn
+    _GEVENT = False
+
+if _GEVENT:
+    _start_thread = _gevent_monkey.get_original("_thread", "start_new_thread")
+    _get_ident = _gevent_monkey.get_original("_thread", "get_ident")
+    _allocate_lock = _gevent_monkey.get_original("_thread", "allocate_lock")
+    _sleep = _gevent_monkey.get_original("time", "sleep")
+else:
+    import _thread
+
+    _start_thread = _thread.start_new_thread
+    _get_ident = _thread.get_ident
+    _allocate_lock = _thread.allocate_lock
+    _sleep = time.sleep
+
+
+def _folded(frame) -> str:
+    """Root-first 'func (file:line);...' key, the collapsed-stack format."""
+    parts: List[str] = []
+    while frame is not None and len(parts) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+class Profile:
+    """Samples of one request."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, endpoint: str, method: str, path: str, frame_source: Callable) -> None:
+        self.id = next(self._ids)
+        self.endpoint = endpoint
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self.duration_ms = 0.0
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._frame_source = frame_source
+
+    def sample(self) -> None:
+        frame = self._frame_source()
+        if frame is not None:
+            self.stacks[_folded(frame)] += 1
+            self.samples += 1
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "endpoint": self.endpoint,
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 1),
+            "samples": self.samples,
+        }
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RequestProfiler:
+    """
+    Opt-in wall-clock sampling profiler for individual requests.
+
+    A request is profiled when it wins the PROFILE_SAMPLE_RATE draw or sends
+    the admin token in the PROFILE_HEADER header. While it runs, one shared
+    sampler thread records its Python stack every `interval_seconds`
+    (including where it waits on I/O); nothing runs per line or call. The
+    last `keep_per_endpoint` profiles per endpoint are kept in memory and
+    downloadable in collapsed-stack format (flamegraph.pl, speedscope).
+
+    When PROFILE_ENABLED is off no hooks are installed at all.
+    """
+
+    def __init__(self) -> None:
+        self._lock = _allocate_lock()  # shared with the OS-level sampler thread
+        self._active: Dict[int, Profile] = {}
+        self._profiles: Dict[str, Deque[Profile]] = {}
+        self._sampler_started = False
+        self.enabled = False
+        self.sample_rate = 0.0
+        self.interval_seconds = 0.005
+        self.keep_per_endpoint = 10
+        self.header = "X-Profile"
+
+    def init_app(self, app) -> None:
+        self.enabled = app.config.get("PROFILE_ENABLED", False)
+        self.sample_rate = app.config.get("PROFILE_SAMPLE_RATE", 0.0)
+        self.interval_seconds = app.config.get("PROFILE_INTERVAL_MS", 5) / 1000.0
+        self.keep_per_endpoint = app.config.get("PROFILE_KEEP_PER_ENDPOINT", 10)
+        self.header = app.config.get("PROFILE_HEADER", "X-Profile")
+        if not self.enabled:
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    # ── Request hooks ──────────────────────────────────────────────────────
+
+    def _wanted(self) -> bool:
+        token = current_app.config.get("ADMIN_API_TOKEN", "")
+        supplied = request.headers.get(self.header)
+        if supplied and token and hmac.compare_digest(supplied, token):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _before_request(self) -> None:
+        if request.endpoint is None or not self._wanted():
+            return
+        if _GEVENT:
+            target = greenlet.getcurrent()
+            os_thread = _get_ident()
+            # A parked greenlet exposes its frame; the running one is the thread's frame.
+            frame_source = lambda: target.gr_frame or sys._current_frames().get(os_thread)  # noqa: E731
+        else:
+            os_thread = _get_ident()
+            frame_source = lambda: sys._current_frames().get(os_thread)  # noqa: E731
+
+        profile = Profile(request.endpoint, request.method, request.path, frame_source)
+        with self._lock:
+            self._active[profile.id] = profile
+            if not self._sampler_started:
+                self._sampler_started = True
+                _start_thread(self._run, ())
+        g.profile = profile
+
+    def _after_request(self, response):
+        profile = g.get("profile")
+        if profile is not None:
+            response.headers["X-Profile-Id"] = str(profile.id)
+        return response
+
+    def _teardown_request(self, exc: Optional[BaseException]) -> None:
+        profile = g.pop("profile", None)
+        if profile is None:
+            return
+        profile.duration_ms = (time.time() - profile.started_at) * 1000.0
+        with self._lock:
+            self._active.pop(profile.id, None)
+            kept = self._profiles.get(profile.endpoint)
+            if kept is None:
+                kept = self._profiles[profile.endpoint] = deque(maxlen=self.keep_per_endpoint)
+            kept.append(profile)
+
+    # ── Sampler ────────────────────────────────────────────────────────────
+
+    def _run(self) -> None:
+        while True:
+            # Back off while nothing is being profiled
+            _sleep(self.interval_seconds if self._active else 0.05)
+            with self._lock:
+                active = list(self._active.values())
+            for profile in active:
+                try:
+                    profile.sample()
+                except Exception as exc:  # never let the sampler die
+                    logger.debug("Profile sample failed: %s", exc)
+
+    # ── Admin access ───────────────────────────────────────────────────────
+
+    def list_profiles(self) -> Dict[str, List[Dict[str, Any]]]:
+        with self._lock:
+            return {
+                endpoint: [p.summary() for p in reversed(kept)]
+                for endpoint, kept in self._profiles.items()
+            }
+
+    def get_profile(self, profile_id: int) -> Optional[Profile]:
+        with self._lock:
+            for kept in self._profiles.values():
+                for profile in kept:
+                    if profile.id == profile_id:
+                        return profile
+        return None
+
+
+request_profiler = RequestProfiler()
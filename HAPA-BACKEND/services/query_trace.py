@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import httpx
+from flask import g, has_request_context, request
+
+import extensions
+
+logger = logging.getLogger(__name__)
+slow_query_log = logging.getLogger("hapa.slow_query")
+
+REST_PREFIX = "/rest/v1/"
+MODIFIER_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+MAX_SHAPES = 500
+
+
+def describe(req: httpx.Request) -> Optional[Dict[str, Any]]:
+    """
+    Table, columns and filter shape of a PostgREST request. Filter values are
+    left out: they vary per call (and may be personal data), the shape does not.
+    """
+    path = urlsplit(str(req.url)).path
+    if not path.startswith(REST_PREFIX):
+        return None
+    target = path[len(REST_PREFIX):]
+    table = f"rpc:{target[4:]}" if target.startswith("rpc/") else target
+
+    columns = "*"
+    filters: List[str] = []
+    modifiers: List[str] = []
+    for name, value in parse_qsl(req.url.query.decode(), keep_blank_values=True):
+        if name == "select":
+            columns = value
+        elif name in MODIFIER_PARAMS:
+            modifiers.append(name)
+        elif name in ("or", "and"):
+            filters.append(name)
+        else:
+            filters.append(f"{name}:{value.split('.', 1)[0]}")
+    filters.sort()
+    shape = " ".join([req.method, table, f"select={columns}", *filters, *sorted(modifiers)])
+    return {
+        "method": req.method,
+        "table": table,
+        "columns": columns,
+        "filters": filters,
+        "shape": shape,
+    }
+
+
+def _row_count(resp: httpx.Response) -> Optional[int]:
+    """Rows returned, from PostgREST's Content-Range ("0-24/*"), without reading the body."""
+    content_range = resp.headers.get("content-range", "")
+    span = content_range.split("/", 1)[0]
+    if "-" not in span:
+        return 0 if span == "*" else None
+    start, _, end = span.partition("-")
+    try:
+        return int(end) - int(start) + 1
+    except ValueError:
+        return None
+
+
+class QueryTracer:
+    """
+    Records every PostgREST call made through the pooled Supabase transport.
+
+    - Per shape (method, table, columns, filter columns/operators): call
+      count, total/max latency and rows, reported under /api/metrics.
+    - Per request: a shape issued `n_plus_one_threshold` or more times is
+      flagged once as an N+1 candidate.
+    - Calls slower than `slow_query_ms` are written to the `hapa.slow_query`
+      logger as one JSON object per line.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._shapes: Dict[str, Dict[str, Any]] = {}
+        self._n_plus_one: Counter = Counter()
+        self.enabled = True
+        self.slow_query_ms = 300.0
+        self.n_plus_one_threshold = 3
+        self.slow_queries = 0
+
+    def init_app(self, app) -> None:
+        self.enabled = app.config.get("QUERY_TRACE_ENABLED", True)
+        self.slow_query_ms = app.config.get("SLOW_QUERY_MS", 300)
+        self.n_plus_one_threshold = app.config.get("N_PLUS_ONE_THRESHOLD", 3)
+        transport = extensions.supabase_transport
+        if self.enabled and transport is not None and self.record not in transport.observers:
+            transport.observers.append(self.record)
+
+    def record(self, req: httpx.Request, resp: Optional[httpx.Response], elapsed: float) -> None:
+        info = describe(req)
+        if info is None:
+            return
+        latency_ms = elapsed * 1000.0
+        rows = _row_count(resp) if resp is not None else None
+        status = resp.status_code if resp is not None else None
+        shape = info["shape"]
+
+        with self._lock:
+            stats = self._shapes.get(shape)
+            if stats is None and len(self._shapes) < MAX_SHAPES:
+                stats = self._shapes[shape] = {
+                    "table": info["table"],
+                    "calls": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "rows": 0,
+                    "errors": 0,
+                }
+            if stats is not None:
+                stats["calls"] += 1
+                stats["total_ms"] += latency_ms
+                stats["max_ms"] = max(stats["max_ms"], latency_ms)
+                stats["rows"] += rows or 0
+                if status is None or status >= 400:
+                    stats["errors"] += 1
+
+        endpoint = request.endpoint if has_request_context() else None
+        if has_request_context():
+            self._track_request(shape, endpoint)
+
+        if latency_ms >= self.slow_query_ms:
+            self.slow_queries += 1
+            slow_query_log.warning(json.dumps({
+                "event": "slow_query",
+                "latency_ms": round(latency_ms, 1),
+                "rows": rows,
+                "status": status,
+                "endpoint": endpoint,
+                **info,
+            }))
+
+    def _track_request(self, shape: str, endpoint: Optional[str]) -> None:
+        seen = g.get("query_shapes")
+        if seen is None:
+            seen = g.query_shapes = Counter()
+        seen[shape] += 1
+        if seen[shape] == self.n_plus_one_threshold:
+            with self._lock:
+                self._n_plus_one[(endpoint, shape)] += 1
+            logger.warning(
+                "Possible N+1: %s issued %d+ times by %s", shape, self.n_plus_one_threshold, endpoint
+            )
+
+    def stats(self, top: int = 20) -> Dict[str, Any]:
+        with self._lock:
+            shapes: List[Tuple[str, Dict[str, Any]]] = sorted(
+                self._shapes.items(), key=lambda item: item[1]["total_ms"], reverse=True
+            )[:top]
+            n_plus_one = [
+                {"endpoint": endpoint, "shape": shape, "requests": count}
+                for (endpoint, shape), count in self._n_plus_one.most_common(top)
+            ]
+        return {
+            "slow_queries": self.slow_queries,
+            "top_shapes": [
+                {
+                    "shape": shape,
+                    **{k: round(v, 1) if isinstance(v, float) else v for k, v in s.items()},
+                    "avg_ms": round(s["total_ms"] / s["calls"], 1) if s["calls"] else 0.0,
+                }
+                for shape, s in shapes
+            ],
+            "n_plus_one": n_plus_one,
+        }
+
+
+query_tracer = QueryTracer()
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Hedged attempts are short HTTP GETs; a small shared pool is enough.
+_hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hedge")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker.
+
+    The outcomes of the last `window` calls are kept; a call that raised or
+    took longer than `slow_call_seconds` counts as a failure. Once at least
+    `min_calls` are recorded and the failure ratio reaches `failure_ratio`,
+    the breaker opens and calls fail fast for `open_seconds`. After that a
+    single probe call is let through (half-open): success closes the breaker,
+    failure opens it again.
+    """
+
+    def __init__(self, name: str, slow_call_seconds: float = 5.0) -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self._outcomes: Deque[bool] = deque(maxlen=20)  # True = failed
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self.window = 20
+        self.min_calls = 5
+        self.failure_ratio = 0.5
+        self.open_seconds = 30.0
+        self.slow_call_seconds = slow_call_seconds
+        self.rejected = 0
+        self.times_opened = 0
+
+    def configure(
+        self,
+        window: int,
+        min_calls: int,
+        failure_ratio: float,
+        open_seconds: float,
+        slow_call_seconds: Optional[float] = None,
+    ) -> None:
+        with self._lock:
+            self.window = window
+            self._outcomes = deque(self._outcomes, maxlen=window)
+            self.min_calls = min_calls
+            self.failure_ratio = failure_ratio
+            self.open_seconds = open_seconds
+            if slow_call_seconds is not None:
+                self.slow_call_seconds = slow_call_seconds
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        # Caller holds the lock.
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probing = False
+        return self._state
+
+    def _acquire(self) -> bool:
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def _record(self, failed: bool) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probing = False
+                if failed:
+                    self._open()
+                else:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                return
+            self._outcomes.append(failed)
+            if (
+                self._state == CLOSED
+                and len(self._outcomes) >= self.min_calls
+                and sum(self._outcomes) / len(self._outcomes) >= self.failure_ratio
+            ):
+                self._open()
+
+    def _open(self) -> None:
+        # Caller holds the lock.
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.times_opened += 1
+        logger.warning("Circuit breaker %s opened", self.name)
+
+    def call(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run `fn` through the breaker; raises CircuitOpenError when open."""
+        if not self._acquire():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        started = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException:
+            self._record(True)
+            raise
+        self._record(time.monotonic() - started > self.slow_call_seconds)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "recent_calls": len(self._outcomes),
+                "recent_failures": sum(self._outcomes),
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
+
+
+class _HedgeStats:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+
+hedge_stats = _HedgeStats()
+
+
+def hedged(fn: Callable[[], T], delay_seconds: float) -> T:
+    """
+    Run an idempotent call and, if it has not finished after `delay_seconds`,
+    start an identical second attempt; return whichever succeeds first.
+    The slower attempt is left to finish in the background.
+    """
+    hedge_stats.calls += 1
+    if delay_seconds <= 0:
+        return fn()
+
+    first = _hedge_pool.submit(fn)
+    done, _ = wait([first], timeout=delay_seconds)
+    if done:
+        return first.result()
+
+    hedge_stats.hedged += 1
+    second = _hedge_pool.submit(fn)
+    pending = {first, second}
+    error: Optional[BaseException] = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is second:
+                    hedge_stats.hedge_wins += 1
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+maps_breaker = CircuitBreaker("google_maps", slow_call_seconds=2.5)
+sms_breaker = CircuitBreaker("africastalking", slow_call_seconds=5.0)
+
+
+def init_breakers(app) -> None:
+    window = app.config.get("BREAKER_WINDOW_CALLS", 20)
+    min_calls = app.config.get("BREAKER_MIN_CALLS", 5)
+    failure_ratio = app.config.get("BREAKER_FAILURE_RATIO", 0.5)
+    open_seconds = app.config.get("BREAKER_OPEN_SECONDS", 30)
+    maps_breaker.configure(
+        window, min_calls, failure_ratio, open_seconds,
+        app.config.get("MAPS_SLOW_CALL_SECONDS", 2.5),
+    )
+    sms_breaker.configure(
+        window, min_calls, failure_ratio, open_seconds,
+        app.config.get("SMS_SLOW_CALL_SECONDS", 5.0),
+    )
+
+
+def resilience_stats() -> Dict[str, Any]:
+    return {
+        "breakers": {b.name: b.stats() for b in (maps_breaker, sms_breaker)},
+        "maps_hedging": {
+            "calls": hedge_stats.calls,
+            "hedged": hedge_stats.hedged,
+            "hedge_wins": hedge_stats.hedge_wins,
+        },
+    }
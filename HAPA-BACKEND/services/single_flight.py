@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class _Flight:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one execution.
+
+    The first caller for a key runs `fn`; callers arriving while it runs
+    wait and receive the same result (or exception). Nothing is cached once
+    the call finishes. Results are shared between requests: treat them as
+    read-only.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+        _groups.append(self)
+
+    def do(self, key: str, fn: Callable[[], T]) -> T:
+        with self._lock:
+            self.calls += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = fn()
+            return flight.value
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls, coalesced, in_flight = self.calls, self.coalesced, len(self._flights)
+        return {
+            "calls": calls,
+            "executions": calls - coalesced,
+            "coalesced": coalesced,
+            "coalescing_ratio": round(coalesced / calls, 4) if calls else 0.0,
+            "in_flight": in_flight,
+        }
+
+
+_groups: List[SingleFlight] = []
+
+
+def single_flight_stats() -> Dict[str, Any]:
+    return {group.name: group.stats() for group in _groups}
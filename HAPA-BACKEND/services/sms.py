@@ -4,6 +4,8 @@ import random
 import secrets
 import requests
 
+from services.resilience import CircuitOpenError, sms_breaker
+
 logger = logging.getLogger(__name__)
 
 
@@ -55,10 +57,17 @@ def _send_otp_via_africastalking(phone_number: str, code: str) -> None:
             "message": f"Your HAPA verification code is {code}",
         }
         
-        response = requests.post(url, headers=headers, data=payload)
-        response.raise_for_status()
-        
+        timeout = float(os.getenv("SMS_TIMEOUT_SECONDS", "5"))
+
+        def post():
+            response = requests.post(url, headers=headers, data=payload, timeout=timeout)
+            response.raise_for_status()
+
+        sms_breaker.call(post)
         logger.info("Sent OTP via Africa's Talking to %s", phone_number)
+    except CircuitOpenError:
+        logger.warning("Africa's Talking circuit open; OTP for %s sent to log provider", phone_number)
+        _send_otp_via_log(phone_number, code)
     except Exception as exc:
         logger.exception("Failed to send OTP via Africa's Talking: %s", exc)
         # Fallback to logging so devs can still see the code
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import jwt
+from jwt.algorithms import has_crypto
+
+from extensions import get_supabase
+
+logger = logging.getLogger(__name__)
+
+ASYMMETRIC_ALGORITHMS = ("RS256", "ES256", "EdDSA")
+
+
+class InvalidSupabaseToken(Exception):
+    """The token was checked and rejected (bad signature, expired, wrong audience)."""
+
+
+@dataclass(frozen=True)
+class SupabaseUser:
+    """The fields of a Supabase Auth user that the API relies on."""
+
+    id: str
+    is_anonymous: bool
+    phone: Optional[str]
+
+
+class SupabaseTokenVerifier:
+    """
+    Verifies Supabase Auth access tokens without a round trip when possible.
+
+    - HS256 tokens are checked against SUPABASE_JWT_SECRET.
+    - Asymmetric tokens are checked against the project's JWKS, fetched from
+      Auth and cached; an unknown `kid` triggers a refetch (key rotation).
+    - Verified tokens are cached by SHA-256 hash until they expire.
+    - When neither applies (no secret, no crypto backend, JWKS unreachable)
+      the token is sent to `supabase.auth.get_user` as before.
+    """
+
+    def __init__(self) -> None:
+        self._secret = ""
+        self._audience = "authenticated"
+        self._jwks: Optional[jwt.PyJWKClient] = None
+        self._verified: "OrderedDict[str, Tuple[SupabaseUser, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_cached_tokens = 10000
+        self.local_hits = 0
+        self.remote_calls = 0
+
+    def init_app(self, app) -> None:
+        self._secret = app.config.get("SUPABASE_JWT_SECRET", "")
+        self._audience = app.config.get("SUPABASE_JWT_AUDIENCE", "authenticated")
+        self.max_cached_tokens = app.config.get("SUPABASE_TOKEN_CACHE_MAX", 10000)
+        url = (app.config.get("SUPABASE_URL") or "").rstrip("/")
+        if url and has_crypto:
+            self._jwks = jwt.PyJWKClient(
+                f"{url}/auth/v1/.well-known/jwks.json",
+                cache_jwk_set=True,
+                lifespan=app.config.get("SUPABASE_JWKS_TTL_SECONDS", 3600),
+                headers={"apikey": app.config.get("SUPABASE_SERVICE_KEY", "")},
+                timeout=5,
+            )
+
+    @staticmethod
+    def _token_key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def _cached(self, key: str) -> Optional[SupabaseUser]:
+        with self._lock:
+            item = self._verified.get(key)
+            if item is None:
+                return None
+            if item[1] <= time.time():
+                del self._verified[key]
+                return None
+            self._verified.move_to_end(key)
+            return item[0]
+
+    def _remember(self, key: str, user: SupabaseUser, expires_at: float) -> None:
+        with self._lock:
+            self._verified[key] = (user, expires_at)
+            self._verified.move_to_end(key)
+            while len(self._verified) > self.max_cached_tokens:
+                self._verified.popitem(last=False)
+
+    def _signing_key(self, token: str, alg: str) -> Optional[Any]:
+        if alg == "HS256":
+            return self._secret or None
+        if alg in ASYMMETRIC_ALGORITHMS and self._jwks is not None:
+            try:
+                return self._jwks.get_signing_key_from_jwt(token).key
+            except jwt.PyJWKClientError as exc:
+                logger.warning("Supabase JWKS lookup failed: %s", exc)
+        return None
+
+    def _verify_locally(self, token: str) -> Optional[Dict[str, Any]]:
+        """Decoded claims, None if this token cannot be checked locally."""
+        try:
+            alg = jwt.get_unverified_header(token).get("alg", "")
+        except jwt.InvalidTokenError as exc:
+            raise InvalidSupabaseToken(str(exc)) from exc
+
+        key = self._signing_key(token, alg)
+        if key is None:
+            return None
+        try:
+            return jwt.decode(
+                token,
+                key,
+                algorithms=[alg],
+                audience=self._audience,
+                options={"require": ["exp", "sub"]},
+            )
+        except jwt.InvalidTokenError as exc:
+            raise InvalidSupabaseToken(str(exc)) from exc
+
+    def _verify_remotely(self, token: str) -> SupabaseUser:
+        self.remote_calls += 1
+        try:
+            sb_user = get_supabase().auth.get_user(token).user
+        except Exception as exc:
+            raise InvalidSupabaseToken(str(exc)) from exc
+        if not sb_user:
+            raise InvalidSupabaseToken("Supabase returned no user")
+        return SupabaseUser(
+            id=str(sb_user.id),
+            is_anonymous=bool(sb_user.is_anonymous),
+            phone=sb_user.phone or None,
+        )
+
+    def verify(self, token: Any) -> SupabaseUser:
+        """Return the token's user or raise InvalidSupabaseToken."""
+        if not isinstance(token, str):
+            raise InvalidSupabaseToken("access token must be a string")
+        key = self._token_key(token)
+        cached = self._cached(key)
+        if cached is not None:
+            self.local_hits += 1
+            return cached
+
+        claims = self._verify_locally(token)
+        if claims is None:
+            return self._verify_remotely(token)
+
+        self.local_hits += 1
+        user = SupabaseUser(
+            id=str(claims["sub"]),
+            is_anonymous=bool(claims.get("is_anonymous", False)),
+            phone=claims.get("phone") or None,
+        )
+        self._remember(key, user, float(claims["exp"]))
+        return user
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            cached = len(self._verified)
+        return {
+            "cached_tokens": cached,
+            "local_hits": self.local_hits,
+            "remote_calls": self.remote_calls,
+            "jwks_enabled": self._jwks is not None,
+            "secret_configured": bool(self._secret),
+        }
+
+
+supabase_tokens = SupabaseTokenVerifier()
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from extensions import cache, get_supabase
+from services.feed_snapshot import parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+FREE_STATE: Dict[str, Any] = {"tier": "free", "is_boosted": False, "boost_ends_at": None}
+
+
+def _first(embedded: Any) -> Optional[Dict[str, Any]]:
+    # PostgREST embeds one-to-one relations as an object, others as a list
+    if isinstance(embedded, list):
+        return embedded[0] if embedded else None
+    return embedded
+
+
+def tier_state(row: Dict[str, Any], now: float, ttl_seconds: float) -> Dict[str, Any]:
+    """
+    Tier and boost of one venue from its embedded subscription and boosts,
+    with the same rules as get_venue_tier / is_venue_boosted, plus how long
+    that answer holds: until the boost or subscription period ends, a
+    scheduled boost starts, or `ttl_seconds` pass.
+    """
+    valid_until = now + ttl_seconds
+    tier = "free"
+    subscription = _first(row.get("venue_subscriptions"))
+    if subscription and subscription.get("status") == "active":
+        period_end = parse_timestamp(subscription.get("current_period_end"))
+        if period_end is None or period_end.timestamp() > now:
+            tier = subscription.get("tier") or "free"
+            if period_end is not None:
+                valid_until = min(valid_until, period_end.timestamp())
+
+    boost_end: Optional[float] = None
+    for boost in row.get("post_boosts") or []:
+        starts_at = parse_timestamp(boost.get("starts_at"))
+        ends_at = parse_timestamp(boost.get("ends_at"))
+        if starts_at is None or ends_at is None or ends_at.timestamp() <= now:
+            continue
+        if starts_at.timestamp() <= now:
+            boost_end = max(boost_end or 0.0, ends_at.timestamp())
+        else:
+            valid_until = min(valid_until, starts_at.timestamp())
+    if boost_end is not None:
+        valid_until = min(valid_until, boost_end)
+
+    return {
+        "tier": tier,
+        "is_boosted": boost_end is not None,
+        "boost_ends_at": (
+            datetime.fromtimestamp(boost_end, tz=timezone.utc).isoformat() if boost_end else None
+        ),
+        "valid_until": valid_until,
+    }
+
+
+class TierResolver:
+    """
+    Subscription tier and boost status for many venues at once.
+
+    Cache misses for a whole candidate set are fetched in one PostgREST
+    request per `batch_size` venues (venues with their subscription and
+    unexpired boosts embedded) instead of a get_venue_tier/is_venue_boosted
+    RPC per venue. Each answer is cached in the shared two-tier cache until
+    it can change by itself (boost end, period end, scheduled boost start),
+    capped at `ttl_seconds` so payments picked up elsewhere show up.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.ttl_seconds = 300.0
+        self.batch_size = 200
+        self.hits = 0
+        self.misses = 0
+        self.queries = 0
+        self.failures = 0
+
+    def init_app(self, app) -> None:
+        self.ttl_seconds = app.config.get("TIER_CACHE_TTL_SECONDS", 300)
+        self.batch_size = app.config.get("TIER_BATCH_SIZE", 200)
+
+    @staticmethod
+    def _cache_key(venue_id: str) -> str:
+        return f"tier:{venue_id}"
+
+    def resolve(self, venue_ids: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+        """venue id -> {"tier", "is_boosted", "boost_ends_at"}; unknown venues are free."""
+        now = time.time()
+        states: Dict[str, Dict[str, Any]] = {}
+        missing: List[str] = []
+        for venue_id in dict.fromkeys(str(v) for v in venue_ids):
+            entry = cache.get(self._cache_key(venue_id))
+            if entry is not None and entry["valid_until"] > now:
+                states[venue_id] = entry
+            else:
+                missing.append(venue_id)
+        with self._lock:
+            self.hits += len(states)
+            self.misses += len(missing)
+
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            try:
+                states.update(self._load(batch, now))
+            except Exception as exc:
+                # Serve free for this request without caching it
+                with self._lock:
+                    self.failures += 1
+                logger.warning("Tier lookup for %d venues failed: %s", len(batch), exc)
+                states.update({venue_id: FREE_STATE for venue_id in batch})
+        return states
+
+    def _load(self, venue_ids: List[str], now: float) -> Dict[str, Dict[str, Any]]:
+        now_iso = datetime.fromtimestamp(now, tz=timezone.utc).isoformat()
+        resp = (
+            get_supabase()
+            .table("venues")
+            .select("id, venue_subscriptions(tier, status, current_period_end), post_boosts(starts_at, ends_at)")
+            .in_("id", venue_ids)
+            .gt("post_boosts.ends_at", now_iso)
+            .execute()
+        )
+        with self._lock:
+            self.queries += 1
+        rows = {str(row.get("id")): row for row in resp.data or []}
+        states: Dict[str, Dict[str, Any]] = {}
+        for venue_id in venue_ids:
+            state = tier_state(rows.get(venue_id, {}), now, self.ttl_seconds)
+            cache.set(self._cache_key(venue_id), state, max(state["valid_until"] - now, 1.0))
+            states[venue_id] = state
+        return states
+
+    def invalidate(self, venue_id: Any) -> None:
+        cache.delete(self._cache_key(str(venue_id)))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "queries": self.queries,
+                "failures": self.failures,
+            }
+
+
+tier_resolver = TierResolver()
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from extensions import fetch_all, get_supabase
+
+logger = logging.getLogger(__name__)
+
+EVENT_TYPES = ("views", "likes", "shares", "walkins")
+EVENT_WEIGHTS = {"views": 1, "likes": 3, "shares": 5, "walkins": 8}
+ALL_CITIES = "*"
+
+EntityKey = Tuple[str, str]  # (kind, id) where kind is "venue" or "post"
+
+
+class _Series:
+    """Ring buffer of per-bucket event counts for one venue or post."""
+
+    __slots__ = ("key", "venue_id", "slots", "last_bucket", "score")
+
+    def __init__(self, key: EntityKey, venue_id: Optional[str], n_buckets: int, bucket: int) -> None:
+        self.key = key
+        self.venue_id = venue_id
+        self.slots: List[List[int]] = [[0] * len(EVENT_TYPES) for _ in range(n_buckets)]
+        self.last_bucket = bucket
+        self.score = 0
+
+    def advance(self, bucket: int) -> None:
+        """Zero out the slots that fell out of the window since the last touch."""
+        n = len(self.slots)
+        gap = bucket - self.last_bucket
+        if gap <= 0:
+            return
+        for b in range(self.last_bucket + 1, self.last_bucket + 1 + min(gap, n)):
+            slot = self.slots[b % n]
+            self.score -= sum(c * EVENT_WEIGHTS[e] for c, e in zip(slot, EVENT_TYPES))
+            for i in range(len(slot)):
+                slot[i] = 0
+        self.last_bucket = bucket
+
+    def add(self, bucket: int, event: str, count: int = 1) -> None:
+        self.advance(bucket)
+        self.slots[bucket % len(self.slots)][EVENT_TYPES.index(event)] += count
+        self.score += count * EVENT_WEIGHTS[event]
+
+    def counts(self) -> Dict[str, int]:
+        totals = [0] * len(EVENT_TYPES)
+        for slot in self.slots:
+            for i, c in enumerate(slot):
+                totals[i] += c
+        return dict(zip(EVENT_TYPES, totals))
+
+
+class _TopK:
+    """
+    Bounded leader set. Scores only grow between bucket rotations, so an
+    outsider can only enter by beating the current minimum.
+    """
+
+    def __init__(self, k: int) -> None:
+        self.k = k
+        self.scores: Dict[EntityKey, int] = {}
+        self._min_key: Optional[EntityKey] = None
+
+    def _refresh_min(self) -> None:
+        self._min_key = min(self.scores, key=self.scores.__getitem__) if self.scores else None
+
+    def offer(self, key: EntityKey, score: int) -> None:
+        if key in self.scores:
+            self.scores[key] = score
+            if key == self._min_key:
+                self._refresh_min()
+            return
+        if len(self.scores) < self.k:
+            self.scores[key] = score
+            if self._min_key is None or score < self.scores[self._min_key]:
+                self._min_key = key
+            return
+        if self._min_key is not None and score > self.scores[self._min_key]:
+            del self.scores[self._min_key]
+            self.scores[key] = score
+            self._refresh_min()
+
+    def ranked(self) -> List[Tuple[EntityKey, int]]:
+        return sorted(self.scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class TrendingTracker:
+    """
+    Sliding-window engagement counters with per-city top-K leaders.
+
+    Events land in the current time bucket of a ring buffer per venue/post.
+    Each city (plus ALL_CITIES) keeps a top-K per kind that is updated on
+    every event; when the window slides into a new bucket the leaders are
+    rebuilt once from the surviving series.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._series: Dict[EntityKey, _Series] = {}
+        self._leaders: Dict[Tuple[str, str], _TopK] = {}
+        self._bucket = 0
+        self._venue_city: Dict[str, str] = {}
+        self._post_venue: Dict[str, str] = {}
+        self._directory_at = 0.0
+        self._directory_refreshing = False
+        self.bucket_seconds = 300
+        self.n_buckets = 12
+        self.top_k = 20
+        self.directory_ttl_seconds = 300
+
+    def init_app(self, app) -> None:
+        window_minutes = app.config.get("TRENDING_WINDOW_MINUTES", 60)
+        self.bucket_seconds = app.config.get("TRENDING_BUCKET_SECONDS", 300)
+        self.n_buckets = max(1, (window_minutes * 60) // self.bucket_seconds)
+        self.top_k = app.config.get("TRENDING_TOP_K", 20)
+        self.directory_ttl_seconds = app.config.get("TRENDING_DIRECTORY_TTL_SECONDS", 300)
+
+    # ── Venue/post → city directory ────────────────────────────────────────
+
+    def register_post(self, post_id: str, venue_id: str) -> None:
+        self._post_venue[str(post_id)] = str(venue_id)
+
+    def venue_for_post(self, post_id: str) -> Optional[str]:
+        return self._post_venue.get(str(post_id))
+
+    def _maybe_refresh_directory(self) -> None:
+        if time.monotonic() - self._directory_at < self.directory_ttl_seconds:
+            return
+        with self._lock:
+            if self._directory_refreshing:
+                return
+            self._directory_refreshing = True
+        # Two full-table reads: keep them off the view/like request that noticed
+        threading.Thread(
+            target=self._refresh_directory, name="trending-directory", daemon=True
+        ).start()
+
+    def _refresh_directory(self) -> None:
+        try:
+            supabase = get_supabase()
+            venue_rows = fetch_all(lambda: supabase.table("venues").select("id, city"))
+            now = datetime.utcnow().isoformat()
+            post_rows = fetch_all(
+                lambda: supabase.table("posts").select("id, venue_id").gt("expires_at", now)
+            )
+            self._venue_city = {str(v["id"]): v["city"] for v in venue_rows if v.get("city")}
+            self._post_venue = {str(p["id"]): str(p["venue_id"]) for p in post_rows}
+        except Exception as exc:
+            logger.warning("Trending directory refresh failed: %s", exc)
+        finally:
+            self._directory_at = time.monotonic()
+            self._directory_refreshing = False
+
+    # ── Window maintenance ─────────────────────────────────────────────────
+
+    def _current_bucket(self) -> int:
+        return int(time.time() // self.bucket_seconds)
+
+    def _rotate(self, bucket: int) -> None:
+        """Slide every series to `bucket`, drop empty ones and rebuild leaders."""
+        self._bucket = bucket
+        leaders: Dict[Tuple[str, str], _TopK] = {}
+        for key in list(self._series):
+            series = self._series[key]
+            series.advance(bucket)
+            if series.score <= 0:
+                del self._series[key]
+                continue
+            for city in self._cities_for(series):
+                self._leaders_for(leaders, city, key[0]).offer(key, series.score)
+        self._leaders = leaders
+
+    def _cities_for(self, series: _Series) -> Tuple[str, ...]:
+        city = self._venue_city.get(series.venue_id) if series.venue_id else None
+        return (ALL_CITIES, city) if city else (ALL_CITIES,)
+
+    def _leaders_for(self, leaders: Dict[Tuple[str, str], _TopK], city: str, kind: str) -> _TopK:
+        top = leaders.get((city, kind))
+        if top is None:
+            top = leaders[(city, kind)] = _TopK(self.top_k)
+        return top
+
+    def _bump(self, key: EntityKey, venue_id: Optional[str], event: str, bucket: int) -> None:
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _Series(key, venue_id, self.n_buckets, bucket)
+        elif venue_id and not series.venue_id:
+            series.venue_id = venue_id
+        series.add(bucket, event)
+        for city in self._cities_for(series):
+            self._leaders_for(self._leaders, city, key[0]).offer(key, series.score)
+
+    # ── Public API ─────────────────────────────────────────────────────────
+
+    def record_venue(self, venue_id: str, event: str) -> None:
+        self._record(None, str(venue_id), event)
+
+    def record_post(self, post_id: str, event: str, venue_id: Optional[str] = None) -> None:
+        if venue_id:
+            self.register_post(post_id, venue_id)
+        self._record(str(post_id), None, event)
+
+    def _record(self, post_id: Optional[str], venue_id: Optional[str], event: str) -> None:
+        if event not in EVENT_WEIGHTS:
+            raise ValueError(f"Unknown trending event: {event}")
+        self._maybe_refresh_directory()
+        bucket = self._current_bucket()
+        with self._lock:
+            if bucket != self._bucket:
+                self._rotate(bucket)
+            if post_id is not None:
+                venue_id = self._post_venue.get(post_id)
+                self._bump(("post", post_id), venue_id, event, bucket)
+            if venue_id is not None:
+                self._bump(("venue", venue_id), venue_id, event, bucket)
+
+    def leaders(self, city: Optional[str], kind: str, limit: int) -> List[Dict[str, Any]]:
+        """Current top entities of `kind` for `city` (all cities when None)."""
+        self._maybe_refresh_directory()
+        bucket = self._current_bucket()
+        with self._lock:
+            if bucket != self._bucket:
+                self._rotate(bucket)
+            top = self._leaders.get((city or ALL_CITIES, kind))
+            if top is None:
+                return []
+            result = []
+            for key, score in top.ranked()[:limit]:
+                series = self._series[key]
+                result.append(
+                    {
+                        "id": key[1],
+                        "venue_id": series.venue_id,
+                        "score": score,
+                        "counts": series.counts(),
+                    }
+                )
+            return result
+
+
+trending = TrendingTracker()
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import logging
+from bisect import bisect_right
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+# Monday first, matching datetime.weekday()
+DAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+DAY_MINUTES = 24 * 60
+WEEK_MINUTES = 7 * DAY_MINUTES
+
+_compiled_cache: Dict[Tuple, Optional[Tuple[int, ...]]] = {}
+_COMPILED_CACHE_MAX = 10_000
+
+
+def parse_hhmm(value: Any) -> int:
+    """'22:30' -> 1350. '24:00' is accepted as end of day."""
+    hours, sep, minutes = str(value).strip().partition(":")
+    if not sep:
+        raise ValueError(f"invalid time {value!r}")
+    h, m = int(hours), int(minutes)
+    if not (0 <= h <= 24 and 0 <= m < 60) or (h == 24 and m):
+        raise ValueError(f"invalid time {value!r}")
+    return h * 60 + m
+
+
+def compile_working_hours(working_hours: Any) -> Optional[List[int]]:
+    """
+    Turn the stored `working_hours` JSON ({"monday": {"open": "09:00",
+    "close": "22:00"}, ..., null = closed}) into sorted, merged boundaries in
+    minutes from Monday 00:00: [open, close, open, close, ...].
+
+    A close earlier than the open is an overnight span and runs into the next
+    day (Sunday wraps to Monday); close == open means open around the clock,
+    the same rule as isVenueOpen in HAPA-FRONTEND/lib/venue.ts.
+    Returns None when no hours are set. Raises ValueError on malformed input.
+    """
+    if not working_hours:
+        return None
+    if not isinstance(working_hours, dict):
+        raise ValueError("working_hours must be an object keyed by day")
+
+    spans: List[Tuple[int, int]] = []
+    for day, hours in working_hours.items():
+        day_key = str(day).strip().lower()
+        if day_key not in DAYS:
+            raise ValueError(f"unknown day {day!r}")
+        if not hours:
+            continue
+        if not isinstance(hours, dict) or not hours.get("open") or not hours.get("close"):
+            raise ValueError(f"{day_key} needs open and close times")
+        opens, closes = parse_hhmm(hours["open"]), parse_hhmm(hours["close"])
+        base = DAYS.index(day_key) * DAY_MINUTES
+        start = base + opens
+        end = base + closes if closes > opens else base + closes + DAY_MINUTES
+        if end > WEEK_MINUTES:
+            spans.append((start, WEEK_MINUTES))
+            spans.append((0, end - WEEK_MINUTES))
+        else:
+            spans.append((start, end))
+
+    spans.sort()
+    merged: List[List[int]] = []
+    for start, end in spans:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [minute for span in merged for minute in span]
+
+
+def stored_intervals(working_hours: Any) -> Optional[List[int]]:
+    """
+    `open_intervals` to write next to `working_hours`. Hours that don't parse
+    (onboarding accepts free text) are still saved, with NULL intervals and a
+    warning; such venues are left out of open-now filters.
+    """
+    try:
+        return compile_working_hours(working_hours)
+    except (ValueError, TypeError) as exc:
+        logger.warning("Saving working_hours without open intervals: %s", exc)
+        return None
+
+
+def _cache_key(working_hours: Dict[str, Any]) -> Tuple:
+    return tuple(
+        sorted(
+            (str(day), (h or {}).get("open"), (h or {}).get("close"))
+            if isinstance(h, dict) or h is None
+            else (str(day), repr(h), None)
+            for day, h in working_hours.items()
+        )
+    )
+
+
+def venue_hours(venue: Dict[str, Any]) -> Optional[Tuple[int, ...]]:
+    """
+    Compiled boundaries of a venue row. Rows written since migration 30 carry
+    them in `open_intervals`; older rows are compiled once and memoized.
+    """
+    stored = venue.get("open_intervals")
+    if stored is not None:
+        return tuple(stored)
+    working_hours = venue.get("working_hours")
+    if not working_hours or not isinstance(working_hours, dict):
+        return None
+    key = _cache_key(working_hours)
+    if key in _compiled_cache:
+        return _compiled_cache[key]
+    try:
+        compiled = compile_working_hours(working_hours)
+    except (ValueError, TypeError):
+        compiled = None
+    if len(_compiled_cache) >= _COMPILED_CACHE_MAX:
+        _compiled_cache.clear()
+    _compiled_cache[key] = tuple(compiled) if compiled is not None else None
+    return _compiled_cache[key]
+
+
+def is_open(bounds: Optional[Tuple[int, ...]], minute_of_week: int) -> bool:
+    """Inside a span when an odd number of boundaries are <= the minute."""
+    return bool(bounds) and bisect_right(bounds, minute_of_week) % 2 == 1
+
+
+def minute_of_week(at: datetime, tz: ZoneInfo) -> int:
+    """Venue-local minute from Monday 00:00. Naive datetimes are taken as local time."""
+    local = at.astimezone(tz) if at.tzinfo is not None else at
+    return local.weekday() * DAY_MINUTES + local.hour * 60 + local.minute
+
+
+def filter_open(venues: List[Dict[str, Any]], minute: int) -> List[Dict[str, Any]]:
+    """Venues open at `minute`; venues without hours are left out."""
+    return [v for v in venues if is_open(venue_hours(v), minute)]
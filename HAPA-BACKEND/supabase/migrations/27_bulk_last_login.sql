@@ -0,0 +1,30 @@
+-- =============================================================================
+-- Migration 27: Bulk last-login updates
+-- The Flask API buffers last_login_at per user and flushes the batch with one
+-- call instead of one UPDATE per login.
+-- Apply via: Supabase Dashboard > SQL Editor, or supabase db push
+-- =============================================================================
+
+-- p_entries: [{"id": "<uuid>", "last_login_at": "<timestamptz>"}, ...]
+-- Only moves last_login_at forward and never creates rows.
+CREATE OR REPLACE FUNCTION touch_last_logins(p_entries JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_updated INTEGER;
+BEGIN
+  UPDATE users u
+  SET last_login_at = e.last_login_at
+  FROM jsonb_to_recordset(p_entries) AS e(id UUID, last_login_at TIMESTAMPTZ)
+  WHERE u.id = e.id
+    AND (u.last_login_at IS NULL OR u.last_login_at < e.last_login_at);
+
+  GET DIAGNOSTICS v_updated = ROW_COUNT;
+  RETURN v_updated;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION touch_last_logins(JSONB) FROM PUBLIC, anon, authenticated;
@@ -0,0 +1,70 @@
+-- =============================================================================
+-- Migration 28: Post tombstones for delta feeds
+-- Records every hard-deleted (or soft-deleted) post so clients that cache the
+-- discovery feed can ask "what changed since <watermark>?" and drop it locally.
+-- Expired posts need no tombstone: they are derived from posts.expires_at.
+-- Apply via: Supabase Dashboard > SQL Editor, or supabase db push
+-- =============================================================================
+
+CREATE TABLE IF NOT EXISTS post_tombstones (
+  post_id    UUID        PRIMARY KEY,
+  venue_id   UUID        NOT NULL,
+  deleted_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_post_tombstones_venue_time
+  ON post_tombstones (venue_id, deleted_at DESC);
+
+ALTER TABLE post_tombstones ENABLE ROW LEVEL SECURITY;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_policies WHERE policyname = 'post_tombstones_service_role_all' AND tablename = 'post_tombstones'
+    ) THEN
+        CREATE POLICY "post_tombstones_service_role_all"
+          ON post_tombstones FOR ALL
+          TO service_role
+          USING (true)
+          WITH CHECK (true);
+    END IF;
+END $$;
+
+-- Trigger: write a tombstone whenever a post disappears, whichever client deleted it
+CREATE OR REPLACE FUNCTION record_post_tombstone()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    INSERT INTO post_tombstones (post_id, venue_id)
+    VALUES (OLD.id, OLD.venue_id)
+    ON CONFLICT (post_id) DO UPDATE SET deleted_at = now();
+    RETURN OLD;
+  END IF;
+
+  -- Soft delete
+  INSERT INTO post_tombstones (post_id, venue_id)
+  VALUES (NEW.id, NEW.venue_id)
+  ON CONFLICT (post_id) DO UPDATE SET deleted_at = now();
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS on_post_deleted_tombstone ON posts;
+CREATE TRIGGER on_post_deleted_tombstone
+  AFTER DELETE ON posts
+  FOR EACH ROW EXECUTE FUNCTION record_post_tombstone();
+
+DROP TRIGGER IF EXISTS on_post_soft_deleted_tombstone ON posts;
+CREATE TRIGGER on_post_soft_deleted_tombstone
+  AFTER UPDATE OF is_deleted ON posts
+  FOR EACH ROW
+  WHEN (NEW.is_deleted IS TRUE AND OLD.is_deleted IS DISTINCT FROM TRUE)
+  EXECUTE FUNCTION record_post_tombstone();
+
+-- Tombstones are only useful while a client could still hold the post
+-- (posts live 24h). Purge older ones periodically, e.g. from pg_cron:
+--   DELETE FROM post_tombstones WHERE deleted_at < now() - interval '48 hours';
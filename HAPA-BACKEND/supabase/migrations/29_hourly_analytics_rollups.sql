@@ -0,0 +1,160 @@
+-- =============================================================================
+-- Migration 29: Hourly analytics rollups
+-- Aggregates the raw event tables (venue_views, post_views, post_likes,
+-- walkin_logs) into one row per venue/post per hour, so the owner dashboard
+-- reads a few dozen buckets instead of scanning raw events.
+-- Apply via: Supabase Dashboard > SQL Editor, or supabase db push
+-- =============================================================================
+
+-- ─── 1. Rollup tables ─────────────────────────────────────────────────────────
+CREATE TABLE IF NOT EXISTS venue_stats_hourly (
+  venue_id    UUID        NOT NULL REFERENCES venues(id) ON DELETE CASCADE,
+  bucket      TIMESTAMPTZ NOT NULL,  -- start of the hour (UTC)
+  venue_views INTEGER     NOT NULL DEFAULT 0,
+  post_views  INTEGER     NOT NULL DEFAULT 0,  -- summed over the venue's posts
+  post_likes  INTEGER     NOT NULL DEFAULT 0,
+  walkins     INTEGER     NOT NULL DEFAULT 0,
+  PRIMARY KEY (venue_id, bucket)
+);
+
+CREATE TABLE IF NOT EXISTS post_stats_hourly (
+  post_id  UUID        NOT NULL REFERENCES posts(id) ON DELETE CASCADE,
+  venue_id UUID        NOT NULL REFERENCES venues(id) ON DELETE CASCADE,
+  bucket   TIMESTAMPTZ NOT NULL,
+  views    INTEGER     NOT NULL DEFAULT 0,
+  likes    INTEGER     NOT NULL DEFAULT 0,
+  PRIMARY KEY (post_id, bucket)
+);
+
+CREATE INDEX IF NOT EXISTS idx_post_stats_hourly_venue_bucket
+  ON post_stats_hourly (venue_id, bucket);
+
+-- Single-row watermark: every event before rolled_up_to has been counted.
+CREATE TABLE IF NOT EXISTS analytics_rollup_state (
+  id           INTEGER     PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+  rolled_up_to TIMESTAMPTZ NOT NULL
+);
+
+-- Start from the oldest raw event so the first run backfills history.
+INSERT INTO analytics_rollup_state (id, rolled_up_to)
+SELECT 1, date_trunc('hour', COALESCE(MIN(t), now()))
+FROM (
+  SELECT MIN(created_at) AS t FROM venue_views
+  UNION ALL SELECT MIN(created_at) FROM post_views
+  UNION ALL SELECT MIN(created_at) FROM post_likes
+  UNION ALL SELECT MIN(created_at) FROM walkin_logs
+) AS oldest
+ON CONFLICT (id) DO NOTHING;
+
+-- Event time indexes so each run reads only the new hour(s)
+CREATE INDEX IF NOT EXISTS idx_venue_views_created_at ON venue_views (created_at);
+CREATE INDEX IF NOT EXISTS idx_post_views_created_at  ON post_views (created_at);
+CREATE INDEX IF NOT EXISTS idx_post_likes_created_at  ON post_likes (created_at);
+CREATE INDEX IF NOT EXISTS idx_walkin_logs_created_at ON walkin_logs (created_at);
+
+-- ─── 2. Row Level Security ────────────────────────────────────────────────────
+ALTER TABLE venue_stats_hourly     ENABLE ROW LEVEL SECURITY;
+ALTER TABLE post_stats_hourly      ENABLE ROW LEVEL SECURITY;
+ALTER TABLE analytics_rollup_state ENABLE ROW LEVEL SECURITY;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_policies WHERE policyname = 'venue_stats_hourly_owner_select' AND tablename = 'venue_stats_hourly'
+    ) THEN
+        CREATE POLICY "venue_stats_hourly_owner_select"
+          ON venue_stats_hourly FOR SELECT
+          TO authenticated
+          USING (venue_id IN (SELECT id FROM venues WHERE owner_id = auth.uid()));
+    END IF;
+
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_policies WHERE policyname = 'post_stats_hourly_owner_select' AND tablename = 'post_stats_hourly'
+    ) THEN
+        CREATE POLICY "post_stats_hourly_owner_select"
+          ON post_stats_hourly FOR SELECT
+          TO authenticated
+          USING (venue_id IN (SELECT id FROM venues WHERE owner_id = auth.uid()));
+    END IF;
+END $$;
+
+-- ─── 3. Rollup function ───────────────────────────────────────────────────────
+-- Counts events in [rolled_up_to, date_trunc('hour', p_until)) — complete hours
+-- only — adds them to the buckets and advances the watermark in the same
+-- transaction. Safe to call from several workers or pg_cron: the state row
+-- lock serialises runs, and a run with nothing new is a no-op.
+-- Likes are counted when given; a later unlike does not reduce the bucket.
+CREATE OR REPLACE FUNCTION rollup_hourly_analytics(p_until TIMESTAMPTZ DEFAULT now())
+RETURNS TIMESTAMPTZ
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_from TIMESTAMPTZ;
+  v_to   TIMESTAMPTZ := date_trunc('hour', p_until);
+BEGIN
+  SELECT rolled_up_to INTO v_from
+  FROM analytics_rollup_state
+  WHERE id = 1
+  FOR UPDATE;
+
+  IF v_from IS NULL OR v_from >= v_to THEN
+    RETURN v_from;
+  END IF;
+
+  INSERT INTO post_stats_hourly AS s (post_id, venue_id, bucket, views, likes)
+  SELECT e.post_id, p.venue_id, e.bucket, SUM(e.views), SUM(e.likes)
+  FROM (
+    SELECT post_id, date_trunc('hour', created_at) AS bucket, 1 AS views, 0 AS likes
+    FROM post_views
+    WHERE created_at >= v_from AND created_at < v_to
+    UNION ALL
+    SELECT post_id, date_trunc('hour', created_at), 0, 1
+    FROM post_likes
+    WHERE created_at >= v_from AND created_at < v_to
+  ) AS e
+  JOIN posts p ON p.id = e.post_id
+  GROUP BY e.post_id, p.venue_id, e.bucket
+  ON CONFLICT (post_id, bucket) DO UPDATE
+    SET views = s.views + EXCLUDED.views,
+        likes = s.likes + EXCLUDED.likes;
+
+  INSERT INTO venue_stats_hourly AS s (venue_id, bucket, venue_views, post_views, post_likes, walkins)
+  SELECT e.venue_id, e.bucket, SUM(e.venue_views), SUM(e.post_views), SUM(e.post_likes), SUM(e.walkins)
+  FROM (
+    SELECT venue_id, date_trunc('hour', created_at) AS bucket,
+           1 AS venue_views, 0 AS post_views, 0 AS post_likes, 0 AS walkins
+    FROM venue_views
+    WHERE created_at >= v_from AND created_at < v_to
+    UNION ALL
+    SELECT venue_id, date_trunc('hour', created_at), 0, 0, 0, 1
+    FROM walkin_logs
+    WHERE created_at >= v_from AND created_at < v_to
+    UNION ALL
+    SELECT p.venue_id, date_trunc('hour', v.created_at), 0, 1, 0, 0
+    FROM post_views v JOIN posts p ON p.id = v.post_id
+    WHERE v.created_at >= v_from AND v.created_at < v_to
+    UNION ALL
+    SELECT p.venue_id, date_trunc('hour', l.created_at), 0, 0, 1, 0
+    FROM post_likes l JOIN posts p ON p.id = l.post_id
+    WHERE l.created_at >= v_from AND l.created_at < v_to
+  ) AS e
+  GROUP BY e.venue_id, e.bucket
+  ON CONFLICT (venue_id, bucket) DO UPDATE
+    SET venue_views = s.venue_views + EXCLUDED.venue_views,
+        post_views  = s.post_views  + EXCLUDED.post_views,
+        post_likes  = s.post_likes  + EXCLUDED.post_likes,
+        walkins     = s.walkins     + EXCLUDED.walkins;
+
+  UPDATE analytics_rollup_state SET rolled_up_to = v_to WHERE id = 1;
+  RETURN v_to;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION rollup_hourly_analytics(TIMESTAMPTZ) FROM PUBLIC, anon, authenticated;
+
+-- The Flask API calls this every ANALYTICS_ROLLUP_INTERVAL_SECONDS. With
+-- pg_cron available it can run in the database instead:
+--   SELECT cron.schedule('rollup-hourly-analytics', '5 * * * *',
+--                        'SELECT rollup_hourly_analytics()');
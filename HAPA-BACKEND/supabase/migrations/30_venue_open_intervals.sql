@@ -0,0 +1,16 @@
+-- =============================================================================
+-- Migration 30: Precompiled opening hours
+-- working_hours stays the source of truth (free-form JSON edited by owners).
+-- open_intervals is derived from it by the API on every venue write: sorted
+-- boundaries in minutes from Monday 00:00 venue-local time,
+-- [open, close, open, close, ...], with overnight spans already carried into
+-- the next day. The discover feed/search open_now and open_at filters read it
+-- instead of reparsing working_hours. Rows written before this migration keep
+-- NULL and are compiled by the API on read.
+-- Apply via: Supabase Dashboard > SQL Editor, or supabase db push
+-- =============================================================================
+
+ALTER TABLE venues
+ADD COLUMN IF NOT EXISTS open_intervals INTEGER[] DEFAULT NULL;
+
+COMMENT ON COLUMN public.venues.open_intervals IS 'Derived from working_hours by the API: [open, close, ...] minutes from Monday 00:00, venue-local. NULL when no hours are set.';
@@ -0,0 +1,42 @@
+-- =============================================================================
+-- Migration 31: toggle_post_like reports the state it produced
+-- The API used to infer like/unlike from its own per-process cache, which can
+-- be stale or belong to another worker. The function now returns the post
+-- metrics plus `is_liked` (the state after the toggle) and `venue_id`, both
+-- decided in the same transaction as the insert/delete. posts.metrics itself
+-- is unchanged; the extra keys exist only in the return value.
+-- Apply via: Supabase Dashboard > SQL Editor, or supabase db push
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION toggle_post_like(target_post_id uuid, target_user_id uuid)
+RETURNS jsonb
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+  now_liked boolean;
+BEGIN
+  DELETE FROM public.post_likes
+  WHERE post_id = target_post_id AND user_id = target_user_id;
+  now_liked := NOT FOUND;
+
+  IF now_liked THEN
+    INSERT INTO public.post_likes (post_id, user_id) VALUES (target_post_id, target_user_id);
+  END IF;
+
+  UPDATE public.posts
+  SET metrics = jsonb_set(
+      coalesce(metrics, '{"likes": 0, "views": 0}'),
+      '{likes}',
+      (coalesce((metrics->>'likes')::int, 0) + CASE WHEN now_liked THEN 1 ELSE -1 END)::text::jsonb
+  )
+  WHERE id = target_post_id;
+
+  RETURN (
+    SELECT coalesce(metrics, '{"likes": 0, "views": 0}')
+           || jsonb_build_object('is_liked', now_liked, 'venue_id', venue_id)
+    FROM public.posts
+    WHERE id = target_post_id
+  );
+END;
+$$;
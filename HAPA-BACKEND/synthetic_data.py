@@ -0,0 +1,516 @@
+"""
+Synthetic city dataset for scale testing.
+
+Generates users, venues clustered around real city centres and areas
+(data/places.csv), posts with the normal 24h TTL, likes, post views, venue
+views, walk-ins, subscriptions and boosts. Rows match the Supabase schema, and
+everything is streamed, so 10k venues and millions of events run in constant
+memory.
+
+    # CSV per table plus load.sql, for a local Postgres/Supabase:
+    python synthetic_data.py --venues 10000 --days 7 --out /tmp/hapa-synthetic
+    psql "$DATABASE_URL" -f /tmp/hapa-synthetic/load.sql
+
+    # In-process, e.g. as the tables of a fake PostgREST:
+    from synthetic_data import SyntheticCity, load_into_memory
+    tables = load_into_memory(SyntheticCity(venues=2000, seed=7))
+
+The same seed and --now always give the same dataset.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from models.post import POST_TTL_HOURS, create_post
+from models.user import create_user
+from models.venue import create_venue
+from services.gazetteer import Place, load_place_list
+from services.working_hours import compile_working_hours, is_open, minute_of_week
+
+base_dir = Path(__file__).resolve().parent
+
+# Load order: parents before the rows that reference them
+TABLE_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "users": ("id", "phone_number", "role", "status", "created_at", "last_login_at"),
+    "venues": (
+        "id", "owner_id", "name", "type", "city", "area", "contact_phone", "categories",
+        "images", "address", "lat", "lng", "working_hours", "open_intervals", "post_shares",
+        "walkins_count", "metrics", "created_at", "updated_at",
+    ),
+    "venue_subscriptions": (
+        "venue_id", "tier", "status", "current_period_start", "current_period_end",
+        "created_at", "updated_at",
+    ),
+    "posts": ("id", "venue_id", "media_type", "media_url", "caption", "created_at", "expires_at", "metrics"),
+    "post_boosts": ("venue_id", "post_id", "duration_hours", "starts_at", "ends_at", "is_free", "created_at"),
+    "post_likes": ("post_id", "user_id", "created_at"),
+    "post_views": ("post_id", "user_id", "created_at"),
+    "venue_views": ("venue_id", "user_id", "created_at"),
+    "walkin_logs": ("venue_id", "user_id", "source", "created_at"),
+}
+
+# type -> (share of venues, categories to draw from)
+VENUE_TYPES: Dict[str, Tuple[float, Tuple[str, ...]]] = {
+    "Bar": (0.30, ("Bar", "Live Music", "Outdoor", "Lounge")),
+    "Lounge": (0.20, ("Lounge", "Bar", "Rooftop", "Live Music")),
+    "Club": (0.15, ("Club", "Bar", "Live Music")),
+    "Restaurant": (0.20, ("Restaurant", "Outdoor", "Bar", "Cafe")),
+    "Cafe": (0.10, ("Cafe", "Restaurant", "Outdoor")),
+    "Rooftop": (0.05, ("Rooftop", "Lounge", "Bar", "Restaurant")),
+}
+NAME_WORDS = (
+    "Skyline", "Copper", "Velvet", "Savannah", "Neon", "Acacia", "Lakeview", "Ember",
+    "Baobab", "Jazz", "Crown", "Sunset", "Mango", "Cedar", "Pearl", "Drum", "Zebra", "Ivory",
+)
+CAPTIONS = (None, "Tonight!", "Happy hour till 8", "Live band from 9pm", "New menu", "DJ set", "Ladies night")
+DAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+# Relative activity per local hour: quiet mornings, peak late evening
+HOUR_WEIGHTS = (3, 2, 1, 1, 1, 1, 1, 2, 3, 3, 3, 4, 5, 5, 4, 4, 5, 7, 9, 11, 12, 12, 10, 6)
+
+AREA_SPREAD_KM = 0.8
+CITY_SPREAD_KM = 4.0
+
+
+def _poisson(rng: random.Random, lam: float) -> int:
+    if lam <= 0:
+        return 0
+    if lam > 50:  # normal approximation; exact sampling is O(lam)
+        return max(0, int(round(rng.gauss(lam, math.sqrt(lam)))))
+    limit, k, p = math.exp(-lam), 0, 1.0
+    while True:
+        p *= rng.random()
+        if p <= limit:
+            return k
+        k += 1
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat()
+
+
+def _jitter(rng: random.Random, lat: float, lng: float, km: float) -> Tuple[float, float]:
+    d_lat = rng.gauss(0, km) / 111.0
+    d_lng = rng.gauss(0, km) / (111.0 * max(math.cos(math.radians(lat)), 0.1))
+    return round(lat + d_lat, 6), round(lng + d_lng, 6)
+
+
+def _hhmm(minutes: int) -> str:
+    minutes %= 24 * 60
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _working_hours(rng: random.Random, venue_type: str) -> Optional[Dict[str, Any]]:
+    """Typical hours per type; nightlife spans past midnight. ~10% list no hours."""
+    if rng.random() < 0.10:
+        return None
+    shift = 30 * rng.randint(-2, 2)
+    hours: Dict[str, Any] = {}
+    for i, day in enumerate(DAYS):
+        weekend = day in ("friday", "saturday")
+        if venue_type == "Club":
+            span = (21 * 60, 5 * 60) if i >= 2 else None  # Wednesday to Sunday
+        elif venue_type in ("Bar", "Lounge", "Rooftop"):
+            span = (16 * 60, (4 if weekend else 1) * 60)
+            if day == "monday" and rng.random() < 0.5:
+                span = None
+        elif venue_type == "Cafe":
+            span = (7 * 60, 19 * 60)
+        else:
+            span = (10 * 60, (23 if weekend else 22) * 60)
+        hours[day] = None if span is None else {"open": _hhmm(span[0] + shift), "close": _hhmm(span[1] + shift)}
+    return hours
+
+
+class SyntheticCity:
+    """
+    Deterministic synthetic dataset. `rows()` yields (table, row) pairs in
+    load order per venue; rows are plain dicts shaped like Supabase rows.
+
+    Scale knobs are per venue and multiplied by a log-normal popularity, so a
+    few venues get most of the traffic as in production.
+    """
+
+    def __init__(
+        self,
+        venues: int = 10_000,
+        users: int = 50_000,
+        days: int = 7,
+        seed: int = 42,
+        now: Optional[datetime] = None,
+        posts_per_venue_day: float = 1.5,
+        views_per_post: float = 10.0,
+        like_rate: float = 0.08,
+        venue_views_per_day: float = 6.0,
+        walkins_per_day: float = 1.0,
+        places_path: Optional[str] = None,
+    ) -> None:
+        self.venues = venues
+        self.users = users
+        self.days = days
+        self.seed = seed
+        self.now = (now or datetime.now(timezone.utc)).timestamp()
+        self.posts_per_venue_day = posts_per_venue_day
+        self.views_per_post = views_per_post
+        self.like_rate = like_rate
+        self.venue_views_per_day = venue_views_per_day
+        self.walkins_per_day = walkins_per_day
+        self.tz = ZoneInfo(os.getenv("VENUE_TIMEZONE", "Africa/Kampala"))
+        places = load_place_list(places_path or str(base_dir / "data" / "places.csv"))
+        self._cities = [p for p in places if p.kind == "city" and p.lat is not None]
+        self._areas: Dict[str, List[Place]] = {}
+        for place in places:
+            if place.kind == "area" and place.lat is not None:
+                self._areas.setdefault(place.city, []).append(place)
+        if not self._cities:
+            raise ValueError("place list has no cities with coordinates")
+
+    # ── Sampling helpers ───────────────────────────────────────────────────
+
+    def _event_time(self, rng: random.Random, start: float, end: float) -> float:
+        """A time in [start, end), weighted towards busy local hours."""
+        for _ in range(4):
+            t = start + rng.random() * (end - start)
+            hour = datetime.fromtimestamp(t, tz=self.tz).hour
+            if rng.random() * 12 < HOUR_WEIGHTS[hour]:
+                return t
+        return t
+
+    def _open_time(self, rng: random.Random, bounds: Optional[Tuple[int, ...]], start: float, end: float) -> float:
+        """Like _event_time, but inside opening hours when the venue has them."""
+        t = self._event_time(rng, start, end)
+        for _ in range(8):
+            if not bounds or is_open(bounds, minute_of_week(datetime.fromtimestamp(t, tz=self.tz), self.tz)):
+                break
+            t = self._event_time(rng, start, end)
+        return t
+
+    def _location(self, rng: random.Random, city: Place) -> Tuple[str, float, float]:
+        areas = self._areas.get(city.name)
+        if areas and rng.random() < 0.85:
+            area = rng.choices(areas, weights=[a.popularity or 1 for a in areas])[0]
+            lat, lng = _jitter(rng, area.lat, area.lng, AREA_SPREAD_KM)
+            return area.name, lat, lng
+        # Cities without a known area list get compass-point districts
+        lat, lng = _jitter(rng, city.lat, city.lng, CITY_SPREAD_KM)
+        d_lat, d_lng = lat - city.lat, lng - city.lng
+        if max(abs(d_lat), abs(d_lng)) < 0.01:
+            return "Central", lat, lng
+        if abs(d_lat) > abs(d_lng):
+            return ("North" if d_lat > 0 else "South"), lat, lng
+        return ("East" if d_lng > 0 else "West"), lat, lng
+
+    # ── Rows ───────────────────────────────────────────────────────────────
+
+    def _users(self, rng: random.Random) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        joined = _iso(self.now - 90 * 86400)
+
+        def user(role: str, i: int) -> Dict[str, Any]:
+            row = create_user(phone_number=f"+256{700000000 + i:09d}", role=role)
+            row.update(id=_uuid(rng), created_at=joined, last_login_at=joined)
+            return row
+
+        owners = [user("venue_owner", i) for i in range(self.venues)]
+        consumers = [user("authenticated", self.venues + i) for i in range(self.users)]
+        return owners, consumers
+
+    def rows(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        rng = random.Random(self.seed)
+        owners, consumers = self._users(rng)
+        consumer_ids = [u["id"] for u in consumers]
+        for row in owners + consumers:
+            yield "users", row
+        del consumers
+
+        window_start = self.now - self.days * 86400
+        city_weights = [c.popularity or 1 for c in self._cities]
+        type_names = list(VENUE_TYPES)
+        type_weights = [VENUE_TYPES[t][0] for t in type_names]
+        ttl = POST_TTL_HOURS * 3600
+
+        for i, owner in enumerate(owners):
+            popularity = rng.lognormvariate(0, 1)
+            city = rng.choices(self._cities, weights=city_weights)[0]
+            venue_type = rng.choices(type_names, weights=type_weights)[0]
+            area, lat, lng = self._location(rng, city)
+            categories = sorted({venue_type, *rng.sample(VENUE_TYPES[venue_type][1], 2)})
+            working_hours = _working_hours(rng, venue_type)
+            bounds = compile_working_hours(working_hours)
+            venue_id = _uuid(rng)
+            created = _iso(window_start - rng.uniform(7, 365) * 86400)
+
+            venue = create_venue(
+                owner_id=owner["id"],
+                name=f"{rng.choice(NAME_WORDS)} {rng.choice(NAME_WORDS)} {venue_type}",
+                venue_type=venue_type,
+                city=city.name,
+                area=area,
+                contact_phone=owner["phone_number"],
+                categories=categories,
+                images=[f"https://cdn.example.com/venues/{venue_id}/{n}.jpg" for n in range(rng.randint(1, 4))],
+                address=f"{rng.randint(1, 400)} {rng.choice(NAME_WORDS)} Road, {area}",
+            )
+            venue.update(
+                id=venue_id,
+                lat=lat,
+                lng=lng,
+                working_hours=working_hours,
+                open_intervals=bounds,
+                created_at=created,
+                updated_at=created,
+            )
+
+            tier = rng.choices(("free", "pro", "elite"), weights=(80, 15, 5))[0]
+            period_start = self.now - rng.uniform(0, 30) * 86400
+            subscription = {
+                "venue_id": venue_id,
+                "tier": tier,
+                "status": "active",
+                "current_period_start": _iso(period_start) if tier != "free" else None,
+                "current_period_end": _iso(period_start + 30 * 86400) if tier != "free" else None,
+                "created_at": created,
+                "updated_at": created,
+            }
+
+            # Posts and their events, so counters on the rows match the event tables
+            posts: List[Dict[str, Any]] = []
+            events: List[Tuple[str, Dict[str, Any]]] = []
+            total_likes = total_views = 0
+            for _ in range(_poisson(rng, self.days * self.posts_per_venue_day * popularity)):
+                post_created = self._open_time(rng, bounds, window_start, self.now)
+                post = create_post(
+                    venue_id=venue_id,
+                    media_type="video" if rng.random() < 0.3 else "image",
+                    media_url=f"https://cdn.example.com/posts/{venue_id}/{len(posts)}.jpg",
+                    caption=rng.choice(CAPTIONS),
+                )
+                # Keep create_post's TTL, move the post into the synthetic window
+                post.update(
+                    id=_uuid(rng),
+                    created_at=_iso(post_created),
+                    expires_at=_iso(post_created + ttl),
+                )
+                live_until = min(post_created + ttl, self.now)
+                # Popular venues post more often *and* get more views per post;
+                # the square root keeps the product from exploding in the tail
+                views = _poisson(rng, self.views_per_post * math.sqrt(popularity))
+                likes = min(_poisson(rng, views * self.like_rate), len(consumer_ids))
+                for user_id in rng.sample(consumer_ids, likes):
+                    events.append(("post_likes", {
+                        "post_id": post["id"],
+                        "user_id": user_id,
+                        "created_at": _iso(self._event_time(rng, post_created, live_until)),
+                    }))
+                for _ in range(views):
+                    events.append(("post_views", {
+                        "post_id": post["id"],
+                        "user_id": rng.choice(consumer_ids) if rng.random() < 0.7 else None,
+                        "created_at": _iso(self._event_time(rng, post_created, live_until)),
+                    }))
+                post["metrics"] = {"views": views, "likes": likes}
+                total_likes += likes
+                total_views += views
+                posts.append(post)
+
+                if tier != "free" and rng.random() < 0.15:
+                    events.append(("post_boosts", {
+                        "venue_id": venue_id,
+                        "post_id": post["id"],
+                        "duration_hours": POST_TTL_HOURS,
+                        "starts_at": post["created_at"],
+                        "ends_at": post["expires_at"],
+                        "is_free": tier == "elite",
+                        "created_at": post["created_at"],
+                    }))
+
+            for _ in range(_poisson(rng, self.days * self.venue_views_per_day * popularity)):
+                events.append(("venue_views", {
+                    "venue_id": venue_id,
+                    "user_id": rng.choice(consumer_ids) if rng.random() < 0.6 else None,
+                    "created_at": _iso(self._event_time(rng, window_start, self.now)),
+                }))
+
+            walkins = _poisson(rng, self.days * self.walkins_per_day * popularity)
+            for _ in range(walkins):
+                events.append(("walkin_logs", {
+                    "venue_id": venue_id,
+                    "user_id": rng.choice(consumer_ids) if rng.random() < 0.5 else None,
+                    "source": "proximity" if rng.random() < 0.6 else "directions_tap",
+                    "created_at": _iso(self._open_time(rng, bounds, window_start, self.now)),
+                }))
+
+            venue.update(
+                post_shares=_poisson(rng, total_views * 0.02),
+                walkins_count=walkins,
+                metrics={"likes": total_likes, "views": total_views},
+            )
+            yield "venues", venue
+            yield "venue_subscriptions", subscription
+            for post in posts:
+                yield "posts", post
+            yield from events
+
+
+# ── Sinks ──────────────────────────────────────────────────────────────────
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""  # NULL for COPY ... CSV
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, dict):
+        return json.dumps(value, separators=(",", ":"))
+    if isinstance(value, list):
+        if value and isinstance(value[0], int):
+            return "{" + ",".join(str(v) for v in value) + "}"  # INTEGER[] literal
+        return json.dumps(value, separators=(",", ":"))  # JSONB arrays
+    return value
+
+
+LOAD_SQL_HEADER = """\
+-- Generated by synthetic_data.py. Run with psql from this directory.
+-- Triggers (default subscription, daily post counts) are skipped while loading;
+-- the generated subscription rows and counters already match the data.
+SET session_replication_role = replica;
+"""
+
+LOAD_SQL_FOOTER = """\
+SET session_replication_role = DEFAULT;
+
+-- Older schemas locate venues with a PostGIS column instead of lat/lng
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM information_schema.columns
+             WHERE table_name = 'venues' AND column_name = 'location') THEN
+    UPDATE venues SET location = ST_SetSRID(ST_Point(lng, lat), 4326)::geography
+    WHERE location IS NULL AND lat IS NOT NULL;
+  END IF;
+END $$;
+
+ANALYZE;
+"""
+
+
+class CsvSink:
+    """One CSV per table plus load.sql (`\\copy` in load order)."""
+
+    def __init__(self, out_dir: str) -> None:
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self._files: Dict[str, Any] = {}
+        self._writers: Dict[str, Any] = {}
+
+    def write(self, table: str, row: Dict[str, Any]) -> None:
+        writer = self._writers.get(table)
+        if writer is None:
+            fh = open(self.out_dir / f"{table}.csv", "w", newline="", encoding="utf-8")
+            self._files[table] = fh
+            writer = self._writers[table] = csv.writer(fh)
+            writer.writerow(TABLE_COLUMNS[table])
+        writer.writerow([_csv_value(row.get(column)) for column in TABLE_COLUMNS[table]])
+
+    def close(self) -> None:
+        for fh in self._files.values():
+            fh.close()
+        lines = [LOAD_SQL_HEADER]
+        for table, columns in TABLE_COLUMNS.items():
+            if table in self._files:
+                lines.append(f"\\copy {table} ({', '.join(columns)}) FROM '{table}.csv' WITH (FORMAT csv, HEADER true)\n")
+        lines.append(LOAD_SQL_FOOTER)
+        (self.out_dir / "load.sql").write_text("".join(lines), encoding="utf-8")
+
+
+class NdjsonSink:
+    """One JSON object per line per table, e.g. for PostgREST bulk inserts."""
+
+    def __init__(self, out_dir: str) -> None:
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self._files: Dict[str, Any] = {}
+
+    def write(self, table: str, row: Dict[str, Any]) -> None:
+        fh = self._files.get(table)
+        if fh is None:
+            fh = self._files[table] = open(self.out_dir / f"{table}.ndjson", "w", encoding="utf-8")
+        fh.write(json.dumps(row, separators=(",", ":")) + "\n")
+
+    def close(self) -> None:
+        for fh in self._files.values():
+            fh.close()
+
+
+class MemorySink:
+    """Table name -> list of rows, e.g. the tables of an in-memory fake."""
+
+    def __init__(self) -> None:
+        self.tables: Dict[str, List[Dict[str, Any]]] = {table: [] for table in TABLE_COLUMNS}
+
+    def write(self, table: str, row: Dict[str, Any]) -> None:
+        self.tables[table].append(row)
+
+    def close(self) -> None:
+        pass
+
+
+def generate(city: SyntheticCity, sink: Any) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    try:
+        for table, row in city.rows():
+            sink.write(table, row)
+            counts[table] = counts.get(table, 0) + 1
+    finally:
+        sink.close()
+    return counts
+
+
+def load_into_memory(city: SyntheticCity) -> Dict[str, List[Dict[str, Any]]]:
+    sink = MemorySink()
+    generate(city, sink)
+    return sink.tables
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate a synthetic HAPA dataset for scale testing.")
+    parser.add_argument("--venues", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--days", type=int, default=7, help="length of the activity window")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--now", help="ISO timestamp the window ends at (default: now)")
+    parser.add_argument("--format", choices=("csv", "ndjson"), default="csv")
+    parser.add_argument("--out", required=True, help="output directory")
+    args = parser.parse_args(argv)
+
+    now = None
+    if args.now:
+        now = datetime.fromisoformat(args.now.replace("Z", "+00:00"))
+        if now.tzinfo is None:
+            now = now.replace(tzinfo=timezone.utc)
+    city = SyntheticCity(venues=args.venues, users=args.users, days=args.days, seed=args.seed, now=now)
+    sink = CsvSink(args.out) if args.format == "csv" else NdjsonSink(args.out)
+
+    started = time.monotonic()
+    counts = generate(city, sink)
+    for table in TABLE_COLUMNS:
+        print(f"{table:>20}: {counts.get(table, 0):>10,}")
+    print(f"Wrote {sum(counts.values()):,} rows to {args.out} in {time.monotonic() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
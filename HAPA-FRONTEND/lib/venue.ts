@@ -40,6 +40,11 @@ export function isVenueOpen(
         return null; // Invalid time format
     }
 
+    // Same close and open time means open around the clock (as on the server)
+    if (closeMinutes === openMinutes) {
+        return true;
+    }
+
     // Handle venues that close after midnight
     if (closeMinutes < openMinutes) {
         // e.g., open 10:00 PM, close 2:00 AM
@@ -73,6 +78,9 @@ export function getVenueStatusText(
     }
 
     if (open) {
+        if (parseTime(todayHours.open) === parseTime(todayHours.close)) {
+            return 'Open 24 hours';
+        }
         const closeTime = formatTime(todayHours.close);
         return `Open • Closes ${closeTime}`;
     } else {
@@ -101,7 +109,7 @@ export function getVenueStatusText(
 }
 
 /**
- * Parse time string (HH:MM) to minutes since midnight
+ * Parse time string (HH:MM) to minutes since midnight. '24:00' is end of day.
  */
 function parseTime(timeStr: string): number | null {
     const match = timeStr.match(/^(\d{1,2}):(\d{2})$/);
@@ -110,11 +118,11 @@ function parseTime(timeStr: string): number | null {
     const hours = parseInt(match[1], 10);
     const minutes = parseInt(match[2], 10);
 
-    if (hours < 0 || hours > 23 || minutes < 0 || minutes > 59) {
+    if (hours < 0 || hours > 24 || minutes < 0 || minutes > 59 || (hours === 24 && minutes > 0)) {
         return null;
     }
 
-    return hours * 60 + minutes;
+    return (hours * 60 + minutes) % (24 * 60);
 }
 
 /**